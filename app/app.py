@@ -1,7 +1,5 @@
-import asyncio
-from typing import Any, Dict, List
-
-from aiohttp import ClientSession
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Set
 
 from config.logger_config import LoggerConfig
 from config.settings import Settings
@@ -20,6 +18,7 @@ class App:
         auth_service (AuthenticationService): Authentication service.
         sharepoint_service (SharePointFolderService): Service to interact with SharePoint.
         spreadsheet_service (SpreadsheetService): Service for spreadsheet manipulation.
+        run_metrics (RunMetrics): Stage timings and counters of the run.
     """
 
     def __init__(
@@ -37,45 +36,141 @@ class App:
         self.auth_service = self.factory.get_auth_service()
         self.sharepoint_service = self.factory.get_sharepoint_service()
         self.spreadsheet_service = self.factory.get_spreadsheet_service()
+        self.run_metrics = self.factory.run_metrics
 
     async def run(self) -> None:
         """
         Executes the main process of the application, which includes:
         - Fetching the SharePoint site ID.
         - Fetching the SharePoint drive ID.
-        - Fetching files from SharePoint.
-        - Processing the fetched files.
-        - Saving the centralized spreadsheet.
+        - Streaming files from SharePoint, or only the files changed since the
+          last run when incremental sync is enabled.
+        - Processing the files as they are listed, replaying the files completed
+          before a restart from the checkpoint journal.
+        - Saving the centralized spreadsheet, updating the query index with the
+          rows of the processed files, and clearing the checkpoint once no file
+          failed. A listing that fails partway raises before the save, so the
+          previous output and the checkpoint are kept.
+        - Writing the run report with the timings and counters of every stage,
+          whether the run succeeded or not, and the profiles when profiling is
+          enabled.
+        """
+        profiler = self.factory.stage_profiler
+        if profiler:
+            profiler.start()
+        try:
+            await self._consolidate()
+        finally:
+            if profiler:
+                await profiler.stop()
+            self.run_metrics.write()
+
+    async def _consolidate(self) -> None:
+        """
+        Resolves the drive, processes its files and saves the centralized
+        spreadsheet.
         """
-        async with ClientSession() as session:
+        with self.run_metrics.measure("resolve"):
             site_id: str = await self.sharepoint_service.get_site_id()
-            if not site_id:
-                return
-            logger.info(f"Site ID: {site_id}")
+        if not site_id:
+            return
+        logger.info(f"Site ID: {site_id}")
 
+        with self.run_metrics.measure("resolve"):
             drive_id: str = await self.sharepoint_service.get_drive_id(site_id)
-            if not drive_id:
-                return
-            logger.info(f"Drive ID: {drive_id}")
+        if not drive_id:
+            return
+        logger.info(f"Drive ID: {drive_id}")
 
-            files_data: Dict[str, Any] = await self.sharepoint_service.get_files(
+        scheduler = self.factory.get_file_processing_scheduler(drive_id)
+        query_index = self.factory.get_query_index()
+        if query_index:
+            await query_index.begin_run(self.factory.settings.output_filename)
+        if self.factory.incremental_sync:
+            sync_service = self.factory.get_incremental_sync_service()
+            with self.run_metrics.measure("listing"):
+                changed_files = await sync_service.get_changed_files(drive_id)
+            if changed_files is None:
+                return
+            if not sync_service.has_changes:
+                logger.info("No changes since the last run")
+                if query_index and not query_index.in_sync:
+                    await self._update_query_index(set())
+                sync_service.commit()
+                return
+            await scheduler.run(changed_files)
+        else:
+            files = self.sharepoint_service.iter_files(
                 drive_id, self.factory.settings.sharepoint_path
             )
-            files: List[Dict[str, Any]] = (
-                files_data.get("value", []) if files_data else []
-            )
-
-            if not files:
+            await scheduler.run(self._log_files(files))
+            if not scheduler.queued and not scheduler.skipped:
                 logger.warning("No files found in the specified SharePoint path")
             else:
                 logger.info(
-                    f"Found {len(files)} files in the specified SharePoint path"
+                    f"Found {scheduler.queued + scheduler.skipped} files in the specified SharePoint path"
                 )
-                for file in files:
-                    logger.info(f"Found file: {file['name']}")
-
-            file_processor = await self.factory.get_file_processor(session)
-            tasks = [file_processor.process_file(file) for file in files]
-            await asyncio.gather(*tasks)
 
+        with self.run_metrics.measure("save"):
             self.spreadsheet_service.save(self.factory.settings.output_filename)
+        if query_index:
+            await self._update_query_index(
+                sync_service.stale_origins if self.factory.incremental_sync else None
+            )
+        checkpoint_journal = self.factory.checkpoint_journal
+        if checkpoint_journal and not scheduler.failed:
+            await checkpoint_journal.run(checkpoint_journal.clear)
+
+        if self.factory.incremental_sync:
+            if scheduler.failed:
+                logger.warning(
+                    f"{scheduler.failed} files failed, keeping the previous delta link "
+                    "so they are retried on the next run"
+                )
+            else:
+                sync_service.commit()
+
+    async def _update_query_index(self, removed_origins: Optional[Set[str]]) -> None:
+        """
+        Updates the query index to match the saved output. A failed update is
+        logged by the index and does not fail the run.
+
+        Args:
+            removed_origins (Optional[Set[str]]): Origins dropped from the previous
+                output by an incremental run, or None after a full run.
+        """
+        output_filename = self.factory.settings.output_filename
+        with self.run_metrics.measure("index"):
+            await self.factory.get_query_index().finish(
+                output_filename,
+                removed_origins,
+                lambda: self.spreadsheet_service.iter_saved_rows(output_filename),
+            )
+
+    async def _log_files(
+        self, files: AsyncIterator[Dict[str, Any]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Logs each file as it is listed and passes it through, timing and
+        profiling the wait for each listing page.
+
+        Args:
+            files (AsyncIterator[dict]): Stream of file metadata items.
+
+        Yields:
+            dict: File metadata.
+        """
+        waited = 0.0
+        iterator = files.__aiter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                with self.run_metrics.profile("listing"):
+                    file = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                waited += time.perf_counter() - start
+            logger.info(f"Found file: {file['name']}")
+            yield file
+        self.run_metrics.record("listing", waited)
@@ -0,0 +1,213 @@
+import asyncio
+import signal
+from typing import Optional
+
+from aiohttp import web
+
+from app.app import App
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.factory.service_factory import ServiceFactory
+
+logger = LoggerConfig.get_logger(__name__)
+
+
+class Daemon:
+    """
+    Long-running mode that keeps the token, the HTTP session, the parse pool and
+    the caches warm, and runs an incremental consolidation on every trigger: the
+    poll interval elapsing, or a change notification posted to the local webhook.
+
+    The webhook mimics a Microsoft Graph change notification endpoint: it echoes
+    the validationToken of subscription validation requests and accepts
+    notifications with 202. Triggers arriving while a run is in progress are
+    coalesced into a single follow-up run.
+
+    Attributes:
+        settings (Settings): Application settings.
+        logger (LoggerConfig): Logger configuration.
+        factory (ServiceFactory): Service factory shared by every run.
+        poll_interval (float): Seconds between runs without a trigger; 0 disables
+            polling.
+        webhook_host (str): Host the webhook listens on.
+        webhook_port (int): Port the webhook listens on; 0 disables it.
+        client_state (str): Secret expected in the clientState of notifications;
+            empty accepts any.
+        triggered (asyncio.Event): Set when a run is requested.
+        stopping (asyncio.Event): Set when the daemon is asked to stop.
+        runs (int): Number of runs started.
+        runner (Optional[web.AppRunner]): Runner of the webhook server.
+    """
+
+    WEBHOOK_PATH = "/notifications"
+
+    def __init__(
+        self, settings: Settings, logger: LoggerConfig, factory: ServiceFactory
+    ) -> None:
+        """
+        Initializes the Daemon with the trigger settings. Incremental sync is
+        enabled on the factory, so each run only processes the files changed
+        since the last one.
+
+        Args:
+            settings (Settings): Application settings.
+            logger (LoggerConfig): Logger configuration.
+            factory (ServiceFactory): Service factory, shared by every run.
+        """
+        self.settings: Settings = settings
+        self.logger: LoggerConfig = logger
+        self.factory: ServiceFactory = factory
+        self.poll_interval: float = max(0.0, settings.daemon_poll_interval_s)
+        self.webhook_host: str = settings.webhook_host
+        self.webhook_port: int = settings.webhook_port
+        self.client_state: str = settings.webhook_client_state
+        self.triggered = asyncio.Event()
+        self.stopping = asyncio.Event()
+        self.runs: int = 0
+        self.runner: Optional[web.AppRunner] = None
+        if not factory.incremental_sync:
+            logger.get_logger(__name__).info(
+                "Enabling incremental sync for the daemon mode"
+            )
+            factory.incremental_sync = True
+
+    async def run_forever(self) -> None:
+        """
+        Runs a consolidation at startup and then on every trigger, until SIGTERM
+        or SIGINT is received. A run in progress is completed before stopping.
+        """
+        self._handle_signals()
+        await self._start_webhook()
+        try:
+            while not self.stopping.is_set():
+                await self._run_once()
+                await self._wait_for_trigger()
+        finally:
+            if self.runner:
+                await self.runner.cleanup()
+                self.runner = None
+        logger.info(f"Daemon stopped after {self.runs} runs")
+
+    def trigger(self, reason: str) -> None:
+        """
+        Requests a run. Requests made before the next run starts are coalesced.
+
+        Args:
+            reason (str): What requested the run, for the log.
+        """
+        if self.triggered.is_set():
+            logger.debug(f"Run already pending, coalescing trigger: {reason}")
+            return
+        logger.info(f"Run triggered: {reason}")
+        self.triggered.set()
+
+    def stop(self) -> None:
+        """
+        Asks the daemon to stop once the run in progress, if any, completes.
+        """
+        if not self.stopping.is_set():
+            logger.info("Stopping the daemon")
+            self.stopping.set()
+
+    async def _run_once(self) -> None:
+        """
+        Runs an incremental consolidation with the warm services, after resetting
+        the state left by the previous run. A failed run is logged and the daemon
+        keeps going.
+        """
+        self.triggered.clear()
+        self.runs += 1
+        self.factory.reset_run_state()
+        logger.info(f"Starting run {self.runs}")
+        try:
+            await App(self.settings, self.logger, self.factory).run()
+        except Exception as e:
+            logger.error(f"Run {self.runs} failed: {e}", exc_info=True)
+
+    async def _wait_for_trigger(self) -> None:
+        """
+        Waits until a run is triggered, the poll interval elapses or the daemon is
+        asked to stop.
+        """
+        waiters = [
+            asyncio.create_task(self.triggered.wait()),
+            asyncio.create_task(self.stopping.wait()),
+        ]
+        try:
+            done, _ = await asyncio.wait(
+                waiters,
+                timeout=self.poll_interval or None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if not done:
+            logger.info(f"Poll interval of {self.poll_interval:g}s elapsed")
+
+    def _handle_signals(self) -> None:
+        """
+        Stops the daemon gracefully on SIGTERM and SIGINT, where the event loop
+        supports signal handlers.
+        """
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):  # Not available on Windows
+                pass
+
+    async def _start_webhook(self) -> None:
+        """
+        Starts the local webhook server when a port is configured.
+        """
+        if not self.webhook_port:
+            return
+        app = web.Application()
+        app.router.add_post(self.WEBHOOK_PATH, self._handle_notification)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.webhook_host, self.webhook_port)
+        await site.start()
+        logger.info(
+            f"Listening for change notifications on "
+            f"http://{self.webhook_host}:{self.webhook_port}{self.WEBHOOK_PATH}"
+        )
+
+    async def _handle_notification(self, request: web.Request) -> web.Response:
+        """
+        Answers a subscription validation request by echoing its validationToken,
+        or accepts change notifications and triggers a run.
+
+        Args:
+            request (web.Request): The POST request from Microsoft Graph or a
+                local client.
+
+        Returns:
+            web.Response: The validation token, or 202 Accepted.
+        """
+        validation_token = request.query.get("validationToken")
+        if validation_token is not None:
+            return web.Response(text=validation_token, content_type="text/plain")
+        try:
+            body = await request.json()
+            notifications = body.get("value", [])
+        except (ValueError, AttributeError):
+            return web.Response(status=400, text="Invalid notification")
+        accepted = [
+            notification
+            for notification in notifications
+            if not self.client_state
+            or notification.get("clientState") == self.client_state
+        ]
+        if len(accepted) < len(notifications):
+            logger.warning(
+                f"Ignoring {len(notifications) - len(accepted)} notifications with "
+                "an unexpected clientState"
+            )
+        if accepted:
+            self.trigger(
+                f"{len(accepted)} change notifications for "
+                f"{accepted[0].get('resource', 'the drive')}"
+            )
+        return web.Response(status=202)
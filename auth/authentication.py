@@ -1,15 +1,23 @@
+import asyncio
+import os
 import time
-from typing import List
+from typing import Any, Dict, List, Optional
 
 import msal
 
 from config.logger_config import LoggerConfig
 from config.settings import Settings
+from services.metrics.run_metrics import RunMetrics
 
 
 class AuthenticationService:
     """
-    Authentication service to obtain access tokens from Microsoft Graph API.
+    Authentication service providing access tokens for Microsoft Graph API.
+
+    Tokens are acquired with MSAL off the event loop and refreshed in the
+    background before they expire, so services ask for the current token on every
+    request. MSAL's token cache is persisted to disk, so a run started while the
+    previous token is still valid skips the round trip to the identity endpoint.
 
     Attributes:
         client_id (str): Client ID.
@@ -17,55 +25,174 @@ class AuthenticationService:
         tenant_id (str): Tenant ID.
         authority (str): Authority URL for authentication.
         scope (List[str]): Scope of permissions for the token.
+        token_cache_file (str): Path of the persisted MSAL token cache, or an empty
+            string to keep it in memory.
+        refresh_margin (float): Seconds before expiry the token is refreshed.
+        token_cache (msal.SerializableTokenCache): MSAL token cache.
+        app (Optional[msal.ConfidentialClientApplication]): MSAL client, created on
+            the first acquisition.
         access_token (str): Access token.
         token_expires_at (float): Token expiration timestamp.
+        lock (asyncio.Lock): Ensures a single acquisition runs at a time.
+        refresh_task (Optional[asyncio.Task]): Background refresh task.
+        run_metrics (Optional[RunMetrics]): Metrics timing the acquisitions.
         logger (Logger): Logger instance.
     """
 
-    def __init__(self, settings: Settings, logger: LoggerConfig) -> None:
+    EXPIRY_SKEW = 60
+    MIN_REFRESH_DELAY = 30
+
+    def __init__(
+        self,
+        settings: Settings,
+        logger: LoggerConfig,
+        run_metrics: Optional[RunMetrics] = None,
+    ) -> None:
         """
-        Initializes the AuthenticationService class with settings and logger.
+        Initializes the AuthenticationService class with settings and logger,
+        loading the persisted token cache.
 
         Args:
             settings (Settings): Application settings.
             logger (LoggerConfig): Logger configuration.
+            run_metrics (Optional[RunMetrics]): Metrics timing the acquisitions.
         """
         self.client_id: str = settings.client_id
         self.client_secret: str = settings.client_secret
         self.tenant_id: str = settings.tenant_id
         self.authority: str = f"https://login.microsoftonline.com/{self.tenant_id}"
         self.scope: List[str] = ["https://graph.microsoft.com/.default"]
+        self.token_cache_file: str = settings.token_cache_file
+        self.refresh_margin: float = settings.token_refresh_margin_s
+        self.token_cache = msal.SerializableTokenCache()
+        self.app: Optional[msal.ConfidentialClientApplication] = None
         self.access_token: str = ""
         self.token_expires_at: float = 0
+        self.lock = asyncio.Lock()
+        self.refresh_task: Optional[asyncio.Task] = None
+        self.run_metrics = run_metrics
         self.logger = logger.get_logger(__name__)
-        self._authenticate()
+        self._load_cache()
 
-    def _authenticate(self) -> None:
+    async def get_access_token(self) -> str:
         """
-        Authenticates the client and obtains an access token.
+        Returns the access token, acquiring it if it is missing or about to expire,
+        and starts the background refresh.
+
+        Returns:
+            str: Access token.
+
+        Raises:
+            RuntimeError: If no access token could be obtained.
         """
-        app = msal.ConfidentialClientApplication(
-            self.client_id,
-            authority=self.authority,
-            client_credential=self.client_secret,
-        )
-        result = app.acquire_token_for_client(scopes=self.scope)
-        if "access_token" in result:
-            self.access_token = result["access_token"]
-            self.token_expires_at = time.time() + result["expires_in"]
-            self.logger.info("Access token obtained successfully")
+        if time.time() >= self.token_expires_at - self.EXPIRY_SKEW:
+            async with self.lock:
+                if time.time() >= self.token_expires_at - self.EXPIRY_SKEW:
+                    await self._refresh()
+        if self.refresh_task is None:
+            self.refresh_task = asyncio.create_task(self._refresh_periodically())
+        return self.access_token
+
+    async def _refresh(self) -> None:
+        """
+        Acquires an access token off the event loop, from the token cache when it
+        holds one that is still valid.
+
+        Raises:
+            RuntimeError: If no access token could be obtained.
+        """
+        if self.run_metrics:
+            with self.run_metrics.measure("auth"):
+                result = await asyncio.to_thread(self._acquire)
+        else:
+            result = await asyncio.to_thread(self._acquire)
+        if "access_token" not in result:
+            self.logger.error(
+                "Error obtaining access token: "
+                f"{result.get('error_description') or result.get('error')}"
+            )
+            raise RuntimeError("Error obtaining access token")
+        self.access_token = result["access_token"]
+        self.token_expires_at = time.time() + int(result["expires_in"])
+        if result.get("token_source") == "cache":
+            self.logger.info("Access token obtained from the token cache")
         else:
-            self.logger.error("Error obtaining access token")
-            exit()
+            self.logger.info("Access token obtained successfully")
 
-    def get_access_token(self) -> str:
+    def _acquire(self) -> Dict[str, Any]:
         """
-        Returns the access token. Re-authenticates if the token has expired.
+        Acquires an access token with MSAL and persists the token cache.
 
         Returns:
-            str: Access token.
+            dict: The MSAL result.
         """
-        if time.time() >= self.token_expires_at:
-            self.logger.info("Access token expired, re-authenticating...")
-            self._authenticate()
-        return self.access_token
+        if self.app is None:
+            self.app = msal.ConfidentialClientApplication(
+                self.client_id,
+                authority=self.authority,
+                client_credential=self.client_secret,
+                token_cache=self.token_cache,
+            )
+        result = self.app.acquire_token_for_client(scopes=self.scope)
+        self._save_cache()
+        return result
+
+    async def _refresh_periodically(self) -> None:
+        """
+        Refreshes the access token shortly before it expires, for as long as the
+        service is open. Failed refreshes are retried after a short delay.
+        """
+        while True:
+            await asyncio.sleep(
+                max(
+                    self.MIN_REFRESH_DELAY,
+                    self.token_expires_at - self.refresh_margin - time.time(),
+                )
+            )
+            try:
+                async with self.lock:
+                    await self._refresh()
+            except Exception as e:
+                self.logger.error(f"Error refreshing access token: {e}")
+
+    def _load_cache(self) -> None:
+        """
+        Loads the persisted token cache, ignoring a missing or unreadable file.
+        """
+        if not self.token_cache_file or not os.path.exists(self.token_cache_file):
+            return
+        try:
+            with open(self.token_cache_file, "r", encoding="utf-8") as f:
+                self.token_cache.deserialize(f.read())
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable token cache: {e}")
+
+    def _save_cache(self) -> None:
+        """
+        Persists the token cache when it changed, readable by the owner only.
+        """
+        if not self.token_cache_file or not self.token_cache.has_state_changed:
+            return
+        directory = os.path.dirname(self.token_cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.token_cache_file}.tmp"
+        try:
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.token_cache.serialize())
+            os.replace(temp_path, self.token_cache_file)
+        except OSError as e:
+            self.logger.warning(f"Could not save the token cache: {e}")
+
+    async def close(self) -> None:
+        """
+        Stops the background refresh.
+        """
+        if self.refresh_task is not None:
+            self.refresh_task.cancel()
+            try:
+                await self.refresh_task
+            except asyncio.CancelledError:
+                pass
+            self.refresh_task = None
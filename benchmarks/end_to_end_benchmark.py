@@ -0,0 +1,444 @@
+"""
+End-to-end benchmark of full runs against a local stand-in for Microsoft Graph.
+
+Each scenario serves a number of synthetic workbooks of one size from the fake
+Graph server, with the configured latency and throttling, and runs the whole
+application against it in a fresh process: resolution, listing, downloads,
+parsing and writing the output. Wall time, rows/s, MB/s, peak RSS and the number
+of requests per kind are reported as JSON, together with the time per pipeline
+stage from the run report and the revision, so runs of different versions can be
+compared.
+
+With --delta-round the runs use incremental sync, and each scenario deletes a
+file on the server after its run and runs again from the saved delta link,
+checking that the rows of the deleted file leave the output.
+
+Usage:
+    python -m benchmarks.end_to_end_benchmark [--scenarios 10x1MB 1000x50KB 5x300MB]
+        [--latency-ms 20] [--throttle-rate 0.01] [--set key=value] [--delta-round]
+        [--output FILE]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from benchmarks.fake_graph_server import DRIVE_NAME, FakeGraphServer
+from benchmarks.workbook_generator import HEADER, get_workbook, parse_size
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ["10x1MB", "1000x50KB", "5x300MB"]
+FOLDER = "Benchmark"
+COLUMNS = HEADER[:5]
+
+
+class StaticAuthService:
+    """
+    Stands in for the authentication service with a fixed access token, which the
+    fake Graph server does not check.
+    """
+
+    async def get_access_token(self) -> str:
+        """
+        Returns the access token.
+
+        Returns:
+            str: Access token.
+        """
+        return "benchmark"
+
+    async def close(self) -> None:
+        """
+        Releases nothing, as there is no background refresh.
+        """
+
+
+def parse_scenario(scenario: str) -> Tuple[int, int]:
+    """
+    Parses a scenario such as '1000x50KB'.
+
+    Args:
+        scenario (str): Number of files and size of each file.
+
+    Returns:
+        Tuple[int, int]: Number of files and file size in bytes.
+
+    Raises:
+        ValueError: If the scenario is malformed.
+    """
+    match = re.fullmatch(r"(\d+)x(.+)", scenario.strip())
+    if not match:
+        raise ValueError(f"Invalid scenario: {scenario}")
+    return int(match[1]), parse_size(match[2])
+
+
+def get_peak_rss() -> Dict[str, Optional[float]]:
+    """
+    Returns the peak resident set size of this process and of its largest child,
+    such as a parse pool worker, once the children have exited.
+
+    Returns:
+        dict: Peak RSS in megabytes under "peak_rss_mb" and "peak_child_rss_mb",
+            None where the platform does not report it.
+    """
+    if resource is None:
+        return {"peak_rss_mb": None, "peak_child_rss_mb": None}
+    unit = 1024**2 if sys.platform == "darwin" else 1024
+    return {
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+        "peak_child_rss_mb": (
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit
+        ),
+    }
+
+
+def get_revision() -> Optional[str]:
+    """
+    Returns the git revision of the benchmarked code.
+
+    Returns:
+        Optional[str]: The abbreviated commit hash, with a '-dirty' suffix when the
+            tree has changes, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_worker_env(
+    base_url: str, work_dir: str, overrides: Dict[str, str]
+) -> Dict[str, str]:
+    """
+    Returns the environment of a benchmarked run: the current environment with
+    the application pointed at the fake server and every cache in the work
+    directory, so runs start cold and leave nothing behind.
+
+    Args:
+        base_url (str): Graph base URL of the fake server.
+        work_dir (str): Directory for the output, caches and spooled downloads.
+        overrides (dict): Settings set on the command line.
+
+    Returns:
+        dict: The environment variables.
+    """
+    return {
+        **os.environ,
+        "graph_base_url": base_url,
+        "sharepoint_host": "contoso.sharepoint.com",
+        "sharepoint_site": "benchmark",
+        "sharepoint_path": FOLDER,
+        "drive_name": DRIVE_NAME,
+        "columns": ",".join(COLUMNS),
+        "column_mapping": "header",
+        "output_filename": os.path.join(work_dir, "output.sqlite"),
+        "output_format": "sqlite",
+        "cache_dir": work_dir,
+        "state_file": os.path.join(work_dir, "state.json"),
+        "checkpoint_dir": os.path.join(work_dir, "checkpoint"),
+        "spool_dir": work_dir,
+        "token_cache_file": "",
+        "resolution_cache_ttl_s": "0",
+        "incremental_sync": "false",
+        "download_cache_enabled": "false",
+        "parsed_cache_enabled": "false",
+        "log_level": "WARNING",
+        "run_report_file": os.path.join(work_dir, "run_report.json"),
+        "metrics_textfile": "",
+        **overrides,
+    }
+
+
+async def run_worker() -> Dict[str, Any]:
+    """
+    Runs the application once with the settings of the environment and measures
+    it. Runs in the benchmarked process.
+
+    Returns:
+        dict: Wall time, failed files, output rows, peak RSS, and the stage
+            totals and counters of the run report.
+    """
+    from app.app import App
+    from config.logger_config import LoggerConfig
+    from config.settings import Settings
+    from services.factory.service_factory import ServiceFactory
+
+    settings = Settings()
+    LoggerConfig.setup_logging(level=settings.log_level)
+    logger = LoggerConfig()
+    start = time.perf_counter()
+    factory = ServiceFactory(settings, logger)
+    factory.auth_service = StaticAuthService()
+    try:
+        await App(settings, logger, factory).run()
+    finally:
+        await factory.close()
+    wall_s = time.perf_counter() - start
+    scheduler = factory.file_processing_scheduler
+    connection = sqlite3.connect(settings.output_filename)
+    try:
+        output_rows = connection.execute(
+            f'SELECT COUNT(*) FROM "{settings.output_table}"'
+        ).fetchone()[0]
+    except sqlite3.Error:
+        output_rows = 0
+    finally:
+        connection.close()
+    with open(settings.run_report_file, "r", encoding="utf-8") as f:
+        run_report = json.load(f)
+    return {
+        "wall_s": wall_s,
+        "failed_files": scheduler.failed if scheduler else None,
+        "output_rows": output_rows,
+        **get_peak_rss(),
+        "stage_seconds": {
+            stage: totals["total_s"] for stage, totals in run_report["stages"].items()
+        },
+        "counters": run_report["counters"],
+    }
+
+
+async def run_scenario(scenario: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Serves the files of a scenario and runs the application against them in a
+    fresh process, so peak RSS and caches are not shared between scenarios.
+
+    Args:
+        scenario (str): The scenario, such as '1000x50KB'.
+        args (argparse.Namespace): Command line arguments.
+
+    Returns:
+        dict: The measurements of the scenario.
+
+    Raises:
+        RuntimeError: If the benchmarked run failed.
+    """
+    count, size = parse_scenario(scenario)
+    path, rows_per_file = get_workbook(args.data_dir, size)
+    server = FakeGraphServer(
+        [(f"file-{index:05d}.xlsx", path) for index in range(count)],
+        folder=FOLDER,
+        latency_ms=args.latency_ms,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    overrides = dict(item.split("=", 1) for item in args.set)
+    if args.delta_round:
+        overrides["incremental_sync"] = "true"
+    base_url = await server.start()
+    delta_run: Optional[Dict[str, Any]] = None
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            env = get_worker_env(base_url, work_dir, overrides)
+            run = await run_worker_process(scenario, env)
+            requests = dict(server.counts)
+            throttled = dict(server.throttled)
+            bytes_sent = server.bytes_sent
+            if args.delta_round:
+                server.delete_file(server.items[0]["name"])
+                delta_run = await run_worker_process(scenario, env)
+    finally:
+        await server.stop()
+    wall_s = run["wall_s"]
+    rows = count * rows_per_file
+    return {
+        "scenario": scenario,
+        "files": count,
+        "file_size_bytes": os.path.getsize(path),
+        "rows": rows,
+        "output_rows": run["output_rows"],
+        "failed_files": run["failed_files"],
+        "wall_s": round(wall_s, 3),
+        "rows_per_s": round(run["output_rows"] / wall_s, 1),
+        "mb_per_s": round(bytes_sent / 1024**2 / wall_s, 2),
+        "downloaded_bytes": bytes_sent,
+        "peak_rss_mb": run["peak_rss_mb"],
+        "peak_child_rss_mb": run["peak_child_rss_mb"],
+        "requests": requests,
+        "requests_total": sum(requests.values()),
+        "throttled": throttled,
+        "stage_seconds": run["stage_seconds"],
+        "counters": run["counters"],
+        **(
+            {
+                "delta_round": {
+                    "rows": (count - 1) * rows_per_file,
+                    "output_rows": delta_run["output_rows"],
+                    "failed_files": delta_run["failed_files"],
+                    "wall_s": round(delta_run["wall_s"], 3),
+                }
+            }
+            if delta_run
+            else {}
+        ),
+    }
+
+
+async def run_worker_process(scenario: str, env: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Runs the application once in a fresh process.
+
+    Args:
+        scenario (str): The scenario, for error messages.
+        env (dict): Environment of the process, holding the settings.
+
+    Returns:
+        dict: The measurements printed by the worker.
+
+    Raises:
+        RuntimeError: If the run failed.
+    """
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "benchmarks.end_to_end_benchmark",
+        "--worker",
+        cwd=ROOT_DIR,
+        env=env,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    stdout, _ = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"Scenario {scenario} failed")
+    return json.loads(stdout.decode().strip().splitlines()[-1])
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Runs every scenario and prints a summary of each.
+
+    Args:
+        args (argparse.Namespace): Command line arguments.
+
+    Returns:
+        dict: The report, with the environment and the results of each scenario.
+    """
+    report: Dict[str, Any] = {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": get_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": {
+            "latency_ms": args.latency_ms,
+            "throttle_rate": args.throttle_rate,
+            "retry_after": args.retry_after,
+            "seed": args.seed,
+            "delta_round": args.delta_round,
+            "settings": dict(item.split("=", 1) for item in args.set),
+        },
+        "scenarios": [],
+    }
+    print(
+        f"{'scenario':>12} {'seconds':>10} {'rows/s':>12} {'MB/s':>8} "
+        f"{'RSS MB':>8} {'requests':>9} {'throttled':>9}",
+        file=sys.stderr,
+    )
+    for scenario in args.scenarios:
+        result = await run_scenario(scenario, args)
+        report["scenarios"].append(result)
+        for label, run in [
+            (scenario, result),
+            (f"{scenario} delta", result.get("delta_round")),
+        ]:
+            if run and (run["output_rows"] != run["rows"] or run["failed_files"]):
+                print(
+                    f"{label}: expected {run['rows']} rows, got "
+                    f"{run['output_rows']} ({run['failed_files']} files failed)",
+                    file=sys.stderr,
+                )
+        peak_rss = result["peak_rss_mb"]
+        print(
+            f"{scenario:>12} {result['wall_s']:>10.2f} {result['rows_per_s']:>12.0f} "
+            f"{result['mb_per_s']:>8.2f} "
+            f"{peak_rss if peak_rss is None else round(peak_rss):>8} "
+            f"{result['requests_total']:>9} {sum(result['throttled'].values()):>9}",
+            file=sys.stderr,
+        )
+    return report
+
+
+def main() -> None:
+    """
+    Runs the scenarios and writes the report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        default=SCENARIOS,
+        help="Scenarios as FILESxSIZE, such as 1000x50KB",
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=20, help="Delay of each Graph request"
+    )
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="Share of requests throttled with 429",
+    )
+    parser.add_argument(
+        "--retry-after", type=int, default=1, help="Retry-After of throttled requests"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the throttling draws"
+    )
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Application setting for the runs, such as max_concurrent_downloads=16",
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=os.path.join(".cache", "benchmarks"),
+        help="Directory holding the generated workbooks",
+    )
+    parser.add_argument(
+        "--delta-round",
+        action="store_true",
+        help="Delete a file after each run and run again with incremental sync",
+    )
+    parser.add_argument("--output", help="JSON report path; printed when omitted")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        print(json.dumps(asyncio.run(run_worker())))
+        return
+    for item in args.set:
+        if "=" not in item:
+            parser.error(f"--set expects KEY=VALUE, got {item}")
+    report = asyncio.run(benchmark(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
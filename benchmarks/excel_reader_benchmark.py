@@ -0,0 +1,216 @@
+"""
+Micro-benchmark of the Excel reader engines.
+
+Checks that every available engine parses a shared set of fixture workbooks into
+identical frames, then times each engine on synthetic workbooks of increasing
+size.
+
+Usage:
+    python -m benchmarks.excel_reader_benchmark [--rows 1000 100000 1000000]
+"""
+
+import argparse
+import datetime
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from openpyxl import Workbook
+
+from services.file_processing.excel_readers import (
+    ENGINE_MODULES,
+    FORMAT_ENGINES,
+    is_available,
+)
+from services.file_processing.schema_mapper import SchemaMapper
+from services.file_processing.strategies.excel_processing_strategy import (
+    parse_excel_content,
+)
+
+COLUMNS = ["id", "name", "amount", "date", "status"]
+
+
+def write_workbook(path: str, header: List[Any], rows: List[List[Any]]) -> None:
+    """
+    Writes a single-sheet workbook in streaming mode.
+
+    Args:
+        path (str): Destination path.
+        header (List[Any]): The header row.
+        rows (List[List[Any]]): The data rows.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def synthetic_rows(count: int) -> List[List[Any]]:
+    """
+    Builds data rows with integer, text, float, date and sparse text columns, plus
+    two columns the output does not use.
+
+    Args:
+        count (int): Number of rows.
+
+    Returns:
+        List[List[Any]]: The data rows.
+    """
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        [
+            i,
+            f"name {i}",
+            i * 1.25,
+            start + datetime.timedelta(minutes=i),
+            "open" if i % 3 else None,
+            f"unused {i}",
+            i % 7,
+        ]
+        for i in range(count)
+    ]
+
+
+def fixtures(directory: str) -> Dict[str, SchemaMapper]:
+    """
+    Writes the equivalence fixtures covering the cases readers disagree on most
+    often: empty cells, blank rows, unnamed and duplicate headers, aliases, mixed
+    types and data type hints.
+
+    Args:
+        directory (str): Directory for the fixture workbooks.
+
+    Returns:
+        Dict[str, SchemaMapper]: The schema mapper to use per fixture path.
+    """
+    header = ["ID", " Name ", "amount", "Date", "status", "unused", "extra"]
+    cases = {
+        "synthetic": (header, synthetic_rows(50)),
+        "blank_rows": (
+            header,
+            synthetic_rows(5) + [[None] * 7] + synthetic_rows(3) + [[None] * 7] * 2,
+        ),
+        "unnamed_and_duplicate_headers": (
+            ["id", None, "name", "name", "amount"],
+            [[1, "x", "a", "b", 1.5], [2, None, None, "d", 2]],
+        ),
+        "mixed_types": (
+            ["id", "name", "amount"],
+            [[1, "a", 1], [2, 3, 2.5], ["3", None, True]],
+        ),
+        "empty": (header, []),
+    }
+    mappers = {
+        "header": SchemaMapper(COLUMNS),
+        "aliases_and_dtypes": SchemaMapper(
+            COLUMNS,
+            aliases={"status": ["extra"], "date": ["when"]},
+            dtypes={"id": "string", "amount": "Float64"},
+        ),
+        "position": SchemaMapper(COLUMNS, mode="position"),
+    }
+    paths = {}
+    for name, (case_header, rows) in cases.items():
+        for mapper_name, mapper in mappers.items():
+            path = os.path.join(directory, f"{name}-{mapper_name}.xlsx")
+            write_workbook(path, case_header, rows)
+            paths[path] = mapper
+    return paths
+
+
+def available_engines() -> List[str]:
+    """
+    Returns the .xlsx engines whose dependencies are installed.
+
+    Returns:
+        List[str]: Engine names.
+    """
+    engines = []
+    for engine in FORMAT_ENGINES[".xlsx"]:
+        if is_available(engine):
+            engines.append(engine)
+        else:
+            print(f"Skipping {engine}: {ENGINE_MODULES[engine]} is not installed")
+    return engines
+
+
+def check_equivalence(engines: List[str], directory: str) -> bool:
+    """
+    Parses every fixture with every engine and compares the frames with the ones
+    produced by the first engine.
+
+    Args:
+        engines (List[str]): Engines to compare.
+        directory (str): Directory for the fixture workbooks.
+
+    Returns:
+        bool: True if all engines produced identical frames.
+    """
+    identical = True
+    for path, mapper in fixtures(directory).items():
+        expected: Optional[pd.DataFrame] = None
+        for engine in engines:
+            result = parse_excel_content(path, mapper, engine, [])
+            if expected is None:
+                expected = result
+                continue
+            try:
+                pd.testing.assert_frame_equal(result, expected)
+            except AssertionError as e:
+                identical = False
+                print(f"{os.path.basename(path)}: {engine} differs from {engines[0]}")
+                print(e)
+    print(f"Equivalence check {'passed' if identical else 'FAILED'}")
+    return identical
+
+
+def benchmark(engines: List[str], rows: List[int], directory: str) -> None:
+    """
+    Times every engine on synthetic workbooks and prints the results.
+
+    Args:
+        engines (List[str]): Engines to time.
+        rows (List[int]): Row counts of the synthetic workbooks.
+        directory (str): Directory for the synthetic workbooks.
+    """
+    header = ["id", "name", "amount", "date", "status", "unused", "extra"]
+    mapper = SchemaMapper(COLUMNS)
+    print(f"{'rows':>10} {'engine':>20} {'seconds':>10} {'rows/s':>12}")
+    for count in rows:
+        path = os.path.join(directory, f"synthetic-{count}.xlsx")
+        write_workbook(path, header, synthetic_rows(count))
+        for engine in engines:
+            start = time.perf_counter()
+            df = parse_excel_content(path, mapper, engine, [])
+            elapsed = time.perf_counter() - start
+            assert len(df) == count
+            print(f"{count:>10} {engine:>20} {elapsed:>10.2f} {count / elapsed:>12.0f}")
+        os.remove(path)
+
+
+def main() -> None:
+    """
+    Runs the equivalence check and the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[1_000, 100_000, 1_000_000],
+        help="Row counts of the synthetic workbooks",
+    )
+    args = parser.parse_args()
+    engines = available_engines()
+    with tempfile.TemporaryDirectory() as directory:
+        if not check_equivalence(engines, directory):
+            raise SystemExit(1)
+        benchmark(engines, args.rows, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,569 @@
+"""
+Local stand-in for the parts of Microsoft Graph the application uses.
+
+Serves site, drive and folder resolution, paginated folder listings, delta queries,
+$batch requests and file contents from local files, with a configurable latency
+and share of throttled (429 with Retry-After) responses. As in Graph, items only
+carry the properties named by $select, and files deleted from the folder are
+reported by later delta rounds. Requests are counted by
+kind, so benchmarks can report how many round trips a run took.
+
+Usage:
+    python -m benchmarks.fake_graph_server FILE [FILE ...] [--port 8000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlsplit
+
+from aiohttp import web
+
+API_PREFIX = "/v1.0"
+SITE_ID = "contoso.sharepoint.com,site-id,web-id"
+DRIVE_ID = "drive-id"
+DRIVE_NAME = "Documentos"
+ROOT_ID = "root-id"
+FOLDER_ID = "folder-id"
+MIME_TYPES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".xls": "application/vnd.ms-excel",
+    ".csv": "text/csv",
+}
+
+JsonResponse = Tuple[int, Dict[str, Any], Dict[str, str]]
+
+
+class FakeGraphServer:
+    """
+    aiohttp application answering Graph requests for one site, one drive and one
+    folder holding the given files.
+
+    Listings carry a download URL per file, served by the same application with
+    support for Range requests; the content endpoint redirects to it, like Graph.
+    Throttling is drawn per request and per batched sub-request from a seeded
+    generator, so runs with the same settings are throttled alike.
+
+    Attributes:
+        folder (str): Path of the folder holding the files.
+        items (List[dict]): driveItems of the files, without their download URL.
+        deleted (List[Tuple[int, dict]]): Delta round and driveItem of each deleted
+            file.
+        delta_round (int): Number of deletions so far; delta links carry the
+            round they were issued in.
+        paths (Dict[str, str]): Local path of the content of each item ID.
+        latency (float): Seconds each request is delayed before it is answered.
+        throttle_rate (float): Share of requests answered with 429.
+        retry_after (int): Seconds sent in the Retry-After header of throttled
+            responses.
+        page_size (int): Maximum number of items per listing page when the request
+            has no $top.
+        random (random.Random): Generator drawing the throttled requests.
+        counts (Counter): Number of requests per kind, batched ones included.
+        throttled (Counter): Number of throttled requests per kind.
+        bytes_sent (int): Number of file content bytes served.
+        base_url (str): Graph base URL of the running server.
+        runner (Optional[web.AppRunner]): Runner of the application once started.
+    """
+
+    def __init__(
+        self,
+        files: List[Tuple[str, str]],
+        folder: str = "Benchmark",
+        latency_ms: float = 0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        page_size: int = 200,
+        seed: int = 0,
+    ) -> None:
+        """
+        Initializes the FakeGraphServer with the files of its folder.
+
+        Args:
+            files (List[Tuple[str, str]]): Name and local content path of each file;
+                files may share a content path.
+            folder (str): Path of the folder holding the files.
+            latency_ms (float): Milliseconds each request is delayed.
+            throttle_rate (float): Share of requests answered with 429.
+            retry_after (int): Seconds sent in the Retry-After header.
+            page_size (int): Maximum number of items per listing page when the
+                request has no $top.
+            seed (int): Seed of the throttling draws.
+        """
+        self.folder: str = folder.strip("/")
+        self.items: List[Dict[str, Any]] = []
+        self.paths: Dict[str, str] = {}
+        self.deleted: List[Tuple[int, Dict[str, Any]]] = []
+        self.delta_round: int = 0
+        for index, (name, path) in enumerate(files):
+            item_id = f"item-{index:06d}"
+            self.paths[item_id] = path
+            self.items.append(
+                {
+                    "id": item_id,
+                    "name": name,
+                    "eTag": f'"{item_id},1"',
+                    "cTag": f'"c:{item_id},1"',
+                    "size": os.path.getsize(path),
+                    "file": {
+                        "mimeType": MIME_TYPES.get(
+                            os.path.splitext(name)[1].lower(),
+                            "application/octet-stream",
+                        )
+                    },
+                    "parentReference": {
+                        "driveId": DRIVE_ID,
+                        "id": FOLDER_ID,
+                        "path": f"/drive/root:/{quote(self.folder)}",
+                    },
+                    "lastModifiedDateTime": "2024-01-01T00:00:00Z",
+                }
+            )
+        self.latency: float = max(0.0, latency_ms) / 1000
+        self.throttle_rate: float = throttle_rate
+        self.retry_after: int = retry_after
+        self.page_size: int = max(1, page_size)
+        self.random = random.Random(seed)
+        self.counts: Counter = Counter()
+        self.throttled: Counter = Counter()
+        self.bytes_sent: int = 0
+        self.base_url: str = ""
+        self.runner: Optional[web.AppRunner] = None
+        self.routes: List[Tuple[str, re.Pattern, Callable[..., JsonResponse]]] = [
+            ("site", re.compile(r"/sites/[^/]+:/sites/[^/]+"), self._get_site),
+            ("drive", re.compile(r"/sites/[^/]+/drive"), self._get_drive),
+            ("drive", re.compile(r"/sites/[^/]+/drives"), self._get_drives),
+            (
+                "children",
+                re.compile(r"/drives/[^/]+/root:/(?P<folder>.*):/children"),
+                self._get_children,
+            ),
+            (
+                "children",
+                re.compile(r"/drives/[^/]+/items/[^/]+/children"),
+                self._get_subfolder,
+            ),
+            ("delta", re.compile(r"/drives/[^/]+/root/delta"), self._get_delta),
+            (
+                "folder",
+                re.compile(r"/drives/[^/]+/root(?::/(?P<folder>[^:]+))?"),
+                self._get_folder,
+            ),
+        ]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Starts serving.
+
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on; 0 picks a free one.
+
+        Returns:
+            str: The Graph base URL to point the application at.
+        """
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self._handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        bound_port = self.runner.addresses[0][1]
+        self.base_url = f"http://{host}:{bound_port}{API_PREFIX}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        """
+        Stops serving.
+        """
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def _throttle(self, kind: str) -> bool:
+        """
+        Counts a request and draws whether it is throttled.
+
+        Args:
+            kind (str): Kind of the request.
+
+        Returns:
+            bool: True if the request is answered with 429.
+        """
+        self.counts[kind] += 1
+        if self.throttle_rate > 0 and self.random.random() < self.throttle_rate:
+            self.throttled[kind] += 1
+            return True
+        return False
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        """
+        Answers a request after the configured latency.
+
+        Args:
+            request (web.Request): The request.
+
+        Returns:
+            web.StreamResponse: The response.
+        """
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = request.path
+        if path.startswith("/download/"):
+            return self._download(request, path[len("/download/") :])
+        if not path.startswith(API_PREFIX):
+            return web.json_response({"error": {"code": "itemNotFound"}}, status=404)
+        path = path[len(API_PREFIX) :]
+        if request.method == "POST" and path == "/$batch":
+            if self._throttle("batch"):
+                return self._throttled_response()
+            return web.json_response(await self._batch(await request.json()))
+        match = re.fullmatch(r"/drives/[^/]+/items/(?P<id>[^/]+)/content", path)
+        if request.method == "GET" and match:
+            if self._throttle("content"):
+                return self._throttled_response()
+            if match["id"] not in self.paths:
+                return web.json_response(
+                    {"error": {"code": "itemNotFound"}}, status=404
+                )
+            raise web.HTTPFound(self._download_url(match["id"]))
+        status, body, headers = self._dispatch(
+            request.method, path, request.query_string
+        )
+        return web.json_response(body, status=status, headers=headers)
+
+    def _dispatch(self, method: str, path: str, query_string: str) -> JsonResponse:
+        """
+        Answers a JSON request, direct or batched.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path relative to the Graph version.
+            query_string (str): Query string of the request.
+
+        Returns:
+            Tuple[int, dict, dict]: Status, body and headers of the response.
+        """
+        if method == "GET":
+            for kind, pattern, handler in self.routes:
+                match = pattern.fullmatch(path)
+                if match:
+                    if self._throttle(kind):
+                        return (
+                            429,
+                            {"error": {"code": "TooManyRequests"}},
+                            {"Retry-After": str(self.retry_after)},
+                        )
+                    return handler(path, parse_qs(query_string), **match.groupdict())
+        self.counts["not_found"] += 1
+        return 404, {"error": {"code": "itemNotFound"}}, {}
+
+    async def _batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answers the sub-requests of a $batch request.
+
+        Args:
+            body (dict): The batch request body.
+
+        Returns:
+            dict: The batch response body.
+        """
+        responses = []
+        for sub_request in body.get("requests", []):
+            url = urlsplit(sub_request["url"])
+            status, sub_body, headers = self._dispatch(
+                sub_request["method"], url.path, url.query
+            )
+            responses.append(
+                {
+                    "id": sub_request["id"],
+                    "status": status,
+                    "headers": headers,
+                    "body": sub_body,
+                }
+            )
+        return {"responses": responses}
+
+    def _throttled_response(self) -> web.Response:
+        """
+        Returns a throttled response.
+
+        Returns:
+            web.Response: A 429 response with a Retry-After header.
+        """
+        return web.json_response(
+            {"error": {"code": "TooManyRequests"}},
+            status=429,
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def _download(self, request: web.Request, item_id: str) -> web.StreamResponse:
+        """
+        Serves the content of a file, honoring Range requests.
+
+        Args:
+            request (web.Request): The download request.
+            item_id (str): The driveItem ID.
+
+        Returns:
+            web.StreamResponse: The file content.
+        """
+        if self._throttle("download"):
+            return self._throttled_response()
+        path = self.paths.get(item_id)
+        if path is None:
+            return web.json_response({"error": {"code": "itemNotFound"}}, status=404)
+        size = os.path.getsize(path)
+        byte_range = request.http_range
+        start = byte_range.start or 0
+        stop = size if byte_range.stop is None else min(byte_range.stop, size)
+        self.bytes_sent += max(0, stop - start)
+        return web.FileResponse(path)
+
+    def _download_url(self, item_id: str) -> str:
+        """
+        Returns the pre-authenticated download URL of an item.
+
+        Args:
+            item_id (str): The driveItem ID.
+
+        Returns:
+            str: The download URL.
+        """
+        return f"{self.base_url[: -len(API_PREFIX)]}/download/{item_id}?tempauth=x"
+
+    def delete_file(self, name: str) -> None:
+        """
+        Deletes a file from the folder, reporting it in the next delta round.
+
+        Args:
+            name (str): Name of the file.
+
+        Raises:
+            KeyError: If the folder holds no file of that name.
+        """
+        item = next((item for item in self.items if item["name"] == name), None)
+        if item is None:
+            raise KeyError(name)
+        self.items.remove(item)
+        self.delta_round += 1
+        self.deleted.append((self.delta_round, item))
+
+    @staticmethod
+    def _select(item: Dict[str, Any], query: Dict[str, List[str]]) -> Dict[str, Any]:
+        """
+        Returns an item with only the properties named by $select, and its ID.
+
+        Args:
+            item (dict): The driveItem.
+            query (dict): Parsed query string of the request.
+
+        Returns:
+            dict: The driveItem as Graph returns it for the query.
+        """
+        if "$select" not in query:
+            return item
+        fields = set(query["$select"][0].split(",")) | {"id"}
+        return {key: value for key, value in item.items() if key in fields}
+
+    def _with_download_url(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns an item with its download URL, as listings return it.
+
+        Args:
+            item (dict): The driveItem.
+
+        Returns:
+            dict: The driveItem with its @microsoft.graph.downloadUrl.
+        """
+        return {**item, "@microsoft.graph.downloadUrl": self._download_url(item["id"])}
+
+    def _page(
+        self, path: str, query: Dict[str, List[str]], final_key: Optional[str]
+    ) -> JsonResponse:
+        """
+        Returns a page of items, linking to the next page or, on the last page of a
+        delta query, to the next delta round.
+
+        Args:
+            path (str): Path of the listing relative to the Graph version.
+            query (dict): Parsed query string of the request.
+            final_key (Optional[str]): Key of the link returned on the last page.
+
+        Returns:
+            Tuple[int, dict, dict]: Status, body and headers of the response.
+        """
+        top = int(query.get("$top", [self.page_size])[0])
+        start = int(query.get("$skiptoken", ["0"])[0])
+        body: Dict[str, Any] = {
+            "value": [
+                self._select(self._with_download_url(item), query)
+                for item in self.items[start : start + top]
+            ]
+        }
+        next_query = {key: values[0] for key, values in query.items()}
+        if start + top < len(self.items):
+            next_query["$skiptoken"] = str(start + top)
+            body["@odata.nextLink"] = (
+                f"{self.base_url}{path}?{urlencode(next_query, safe='$,@.')}"
+            )
+        elif final_key:
+            next_query.pop("$skiptoken", None)
+            next_query["token"] = str(self.delta_round)
+            body[final_key] = (
+                f"{self.base_url}{path}?{urlencode(next_query, safe='$,@.')}"
+            )
+        return 200, body, {}
+
+    def _get_site(self, path: str, query: Dict[str, List[str]]) -> JsonResponse:
+        """
+        Answers the resolution of the site.
+        """
+        return 200, {"id": SITE_ID}, {}
+
+    def _get_drive(self, path: str, query: Dict[str, List[str]]) -> JsonResponse:
+        """
+        Answers the resolution of the default document library of the site.
+        """
+        return 200, {"id": DRIVE_ID, "name": DRIVE_NAME}, {}
+
+    def _get_drives(self, path: str, query: Dict[str, List[str]]) -> JsonResponse:
+        """
+        Answers the listing of the document libraries of the site.
+        """
+        return 200, {"value": [{"id": DRIVE_ID, "name": DRIVE_NAME}]}, {}
+
+    def _get_children(
+        self, path: str, query: Dict[str, List[str]], folder: str
+    ) -> JsonResponse:
+        """
+        Answers a page of the listing of the folder, which holds every file.
+        """
+        if unquote(folder).strip("/") != self.folder:
+            return 404, {"error": {"code": "itemNotFound"}}, {}
+        return self._page(path, query, None)
+
+    def _get_folder(
+        self, path: str, query: Dict[str, List[str]], folder: Optional[str]
+    ) -> JsonResponse:
+        """
+        Answers the resolution of the drive root or of the folder by path.
+        """
+        if not folder:
+            return 200, {"id": ROOT_ID}, {}
+        if unquote(folder).strip("/") != self.folder:
+            return 404, {"error": {"code": "itemNotFound"}}, {}
+        return 200, {"id": FOLDER_ID}, {}
+
+    def _get_subfolder(self, path: str, query: Dict[str, List[str]]) -> JsonResponse:
+        """
+        Answers the listing of a subfolder; the folder has none.
+        """
+        return 200, {"value": []}, {}
+
+    def _get_delta(self, path: str, query: Dict[str, List[str]]) -> JsonResponse:
+        """
+        Answers a page of a delta query: every file in the first round, then the
+        files deleted since the round of the delta link. As in Graph, delta items
+        carry the ID of their parent but not its path, and deleted items only
+        carry the deleted facet when it is selected.
+        """
+        if "token" in query:
+            since = int(query["token"][0])
+            next_query = {key: values[0] for key, values in query.items()}
+            next_query["token"] = str(self.delta_round)
+            return (
+                200,
+                {
+                    "value": [
+                        self._select(
+                            {
+                                "id": item["id"],
+                                "name": item["name"],
+                                "deleted": {"state": "deleted"},
+                                "parentReference": {
+                                    "driveId": DRIVE_ID,
+                                    "id": FOLDER_ID,
+                                },
+                            },
+                            query,
+                        )
+                        for delta_round, item in self.deleted
+                        if delta_round > since
+                    ],
+                    "@odata.deltaLink": (
+                        f"{self.base_url}{path}?"
+                        f"{urlencode(next_query, safe='$,@.')}"
+                    ),
+                },
+                {},
+            )
+        status, body, headers = self._page(path, query, "@odata.deltaLink")
+        for item in body["value"]:
+            if "parentReference" in item:
+                item["parentReference"] = {
+                    key: value
+                    for key, value in item["parentReference"].items()
+                    if key != "path"
+                }
+        return status, body, headers
+
+
+async def serve(files: List[str], port: int, **options: Any) -> None:
+    """
+    Serves local files until interrupted.
+
+    Args:
+        files (List[str]): Paths of the files to serve.
+        port (int): Port to listen on.
+        **options: Other FakeGraphServer options.
+    """
+    server = FakeGraphServer(
+        [(os.path.basename(path), path) for path in files], **options
+    )
+    base_url = await server.start(port=port)
+    print(f"Serving {len(files)} files, set graph_base_url={base_url}")
+    print(f"sharepoint_path={server.folder}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    """
+    Serves the files given on the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="+", help="Files to serve")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument(
+        "--latency-ms", type=float, default=0, help="Delay of each request"
+    )
+    parser.add_argument(
+        "--throttle-rate", type=float, default=0.0, help="Share of throttled requests"
+    )
+    parser.add_argument(
+        "--retry-after", type=int, default=1, help="Retry-After of throttled requests"
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(
+            serve(
+                args.files,
+                args.port,
+                latency_ms=args.latency_ms,
+                throttle_rate=args.throttle_rate,
+                retry_after=args.retry_after,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Generator of synthetic workbooks of a target file size.
+
+The number of rows needed for the target size is estimated from a sample
+workbook, and generated workbooks are kept in a data directory, so repeated
+benchmark runs reuse them.
+
+Usage:
+    python -m benchmarks.workbook_generator SIZE [SIZE ...] [--data-dir DIR]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+from typing import Any, Iterator, List, Tuple
+
+from openpyxl import Workbook
+
+HEADER = ["id", "name", "amount", "date", "status", "unused", "extra"]
+SAMPLE_ROWS = 5_000
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+
+
+def parse_size(size: str) -> int:
+    """
+    Parses a size such as '50KB' or '300MB'.
+
+    Args:
+        size (str): The size, with an optional B, KB, MB or GB unit.
+
+    Returns:
+        int: The size in bytes.
+
+    Raises:
+        ValueError: If the size is malformed.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B)?\s*", size.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+    return int(float(match[1]) * SIZE_UNITS[match[2] or "B"])
+
+
+def iter_rows(count: int, seed: int = 0) -> Iterator[List[Any]]:
+    """
+    Yields data rows with integer, text, float, date and sparse text columns, plus
+    two columns the output does not use. Text is partly random, so the workbook
+    compresses like real data rather than collapsing to a few repeated strings.
+
+    Args:
+        count (int): Number of rows.
+        seed (int): Seed of the random text.
+
+    Yields:
+        List[Any]: A data row.
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2024, 1, 1)
+    for i in range(count):
+        yield [
+            i,
+            f"name {rng.getrandbits(40):010x}",
+            round(rng.uniform(0, 100_000), 2),
+            start + datetime.timedelta(minutes=i),
+            "open" if i % 3 else None,
+            f"unused {rng.getrandbits(24):06x}",
+            i % 7,
+        ]
+
+
+def write_workbook(path: str, count: int) -> None:
+    """
+    Writes a single-sheet workbook of synthetic rows in streaming mode.
+
+    Args:
+        path (str): Destination path.
+        count (int): Number of data rows.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADER)
+    for row in iter_rows(count):
+        ws.append(row)
+    wb.save(path)
+
+
+def estimate_rows(target_bytes: int, directory: str) -> int:
+    """
+    Estimates the number of rows of a workbook of the target size from the size of
+    an empty workbook and of a sample one.
+
+    Args:
+        target_bytes (int): Target file size in bytes.
+        directory (str): Directory for the sample workbooks.
+
+    Returns:
+        int: Estimated number of rows, at least one.
+    """
+    empty_path = os.path.join(directory, "empty.xlsx")
+    sample_path = os.path.join(directory, "sample.xlsx")
+    write_workbook(empty_path, 0)
+    write_workbook(sample_path, SAMPLE_ROWS)
+    overhead = os.path.getsize(empty_path)
+    bytes_per_row = (os.path.getsize(sample_path) - overhead) / SAMPLE_ROWS
+    return max(1, round((target_bytes - overhead) / bytes_per_row))
+
+
+def get_workbook(directory: str, target_bytes: int) -> Tuple[str, int]:
+    """
+    Returns a synthetic workbook of about the target size, generating it unless a
+    previous run left one in the directory.
+
+    Args:
+        directory (str): Directory holding the generated workbooks.
+        target_bytes (int): Target file size in bytes.
+
+    Returns:
+        Tuple[str, int]: Path of the workbook and its number of data rows.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"synthetic-{target_bytes}.xlsx")
+    meta_path = f"{path}.json"
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return path, json.load(f)["rows"]
+    with tempfile.TemporaryDirectory(dir=directory) as sample_dir:
+        rows = estimate_rows(target_bytes, sample_dir)
+    print(
+        f"Generating a workbook of {target_bytes} bytes with {rows} rows",
+        file=sys.stderr,
+    )
+    write_workbook(path, rows)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"rows": rows, "size": os.path.getsize(path)}, f)
+    return path, rows
+
+
+def main() -> None:
+    """
+    Generates the workbooks of the sizes given on the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sizes", nargs="+", help="Target sizes, such as 50KB or 1MB")
+    parser.add_argument(
+        "--data-dir",
+        default=os.path.join(".cache", "benchmarks"),
+        help="Directory holding the generated workbooks",
+    )
+    args = parser.parse_args()
+    for size in args.sizes:
+        path, rows = get_workbook(args.data_dir, parse_size(size))
+        print(f"{path}: {rows} rows, {os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
+import json
 import os
-from typing import List
+from typing import Dict, List
 
 from dotenv import load_dotenv
 
@@ -17,10 +18,127 @@ class Settings:
         sharepoint_host (str): SharePoint host URL.
         sharepoint_site (str): SharePoint site name.
         sharepoint_path (str): Path to the SharePoint folder.
+        drive_name (str): Name of the document library holding the files; empty
+            selects the default document library of the site.
+        resolution_cache_ttl_s (int): Seconds the resolved site and drive IDs are
+            reused, across runs, before being resolved again; 0 disables the cache.
+        graph_base_url (str): Base URL of the Microsoft Graph API version requests
+            are sent to, such as a local stand-in for benchmarks.
         columns (List[str]): List of column names for the spreadsheet.
+        column_mapping (str): How source columns are matched to the output columns
+            ('header' or 'position').
+        column_aliases (Dict[str, List[str]]): Alternative source headers per output
+            column, as a JSON object.
+        column_dtypes (Dict[str, str]): Data type per output column, as a JSON
+            object.
         output_filename (str): Name of the output file.
         origin_column_name (str): Name of the origin column.
+        output_format (str): Output format ('xlsx', 'csv', 'parquet' or 'sqlite');
+            inferred from the output filename extension when empty.
+        output_streaming (bool): Whether xlsx output is written in streaming mode,
+            keeping memory flat regardless of its size.
+        output_batch_rows (int): Rows buffered before a bulk write to the output, and
+            rows per Parquet row group or SQLite transaction.
+        output_table (str): Name of the table holding the rows in SQLite output.
         log_level (str): Logging level.
+        http_connection_limit (int): Maximum number of pooled HTTP connections.
+        http_connection_limit_per_host (int): Maximum pooled HTTP connections per host.
+        http_keepalive_timeout (float): Seconds an idle HTTP connection is kept alive.
+        http_dns_cache_ttl (int): Seconds resolved host names are cached.
+        http_max_retries (int): Maximum number of retries of a throttled or
+            transiently failing Graph request or download.
+        http_backoff_base (float): Seconds to back off before the first retry when
+            the response has no Retry-After header; doubles on each retry.
+        http_backoff_max (float): Maximum backoff in seconds.
+        http_retry_budget_ratio (float): Retries earned by each request, bounding
+            retries to a share of the traffic.
+        http_retry_budget (int): Maximum number of retries saved up in the budget,
+            which starts full.
+        http_rate_limit (float): Maximum number of Graph requests per second; 0
+            disables the client-side rate limit.
+        http_rate_limit_min (float): Requests per second the rate never drops below
+            when throttled.
+        http_rate_limit_step (float): Requests per second the rate grows by after
+            each successful request.
+        http_rate_limit_burst (int): Maximum number of requests sent in a burst.
+        download_rate_limit (float): Maximum number of downloads from
+            pre-authenticated URLs per second, limited apart from Graph requests;
+            0 disables the limit, keeping only the pauses when downloads are
+            throttled.
+        graph_batch_enabled (bool): Whether concurrent metadata requests are grouped
+            into Graph $batch requests.
+        graph_batch_size (int): Maximum number of requests per batch (at most 20).
+        graph_batch_window_ms (int): Milliseconds to wait for more requests before
+            sending a batch.
+        graph_batch_max_retries (int): Maximum number of retries of a throttled
+            request inside a batch.
+        max_concurrent_downloads (int): Maximum number of in-flight file downloads.
+        max_concurrent_parses (int): Maximum number of in-flight file parses.
+        work_queue_size (int): Maximum number of files waiting to be processed.
+        parse_executor (str): Pool used to parse files ('process' or 'thread').
+        parse_workers (int): Number of parse pool workers.
+        excel_engine (str): Engine used to read Excel files ('auto', 'calamine',
+            'openpyxl_read_only', 'openpyxl', 'xlrd' or 'odf').
+        sheet_names (List[str]): Worksheets read from each workbook: empty for the
+            first one, '*' for all of them, or their names.
+        csv_delimiter (str): Field delimiter of CSV files.
+        csv_encoding (str): Text encoding of CSV files.
+        csv_chunk_rows (int): Number of CSV rows parsed per chunk.
+        download_chunk_size_kb (int): Size of the chunks read from a download
+            response in kilobytes.
+        download_spool_threshold_mb (int): Size in megabytes above which a
+            downloaded file is spooled to a temporary file instead of memory.
+        use_download_url (bool): Whether files are downloaded from the
+            pre-authenticated @microsoft.graph.downloadUrl of the listing instead of
+            the content endpoint.
+        download_parallel_threshold_mb (int): Size in megabytes from which a file is
+            downloaded as byte ranges in parallel.
+        download_range_size_mb (int): Size in megabytes of each byte range.
+        download_range_concurrency (int): Maximum number of ranges of a file
+            downloaded at once.
+        spool_dir (str): Directory for spooled downloads. Defaults to the system
+            temporary directory when empty.
+        list_page_size (int): Number of items requested per listing page.
+        list_select (str): Comma-separated item properties requested in listings;
+            delta queries also request the deleted facet.
+        list_recursive (bool): Whether to include files from subfolders.
+        list_max_concurrency (int): Maximum number of folders listed concurrently;
+            with Graph batching, concurrent listings share $batch requests.
+        incremental_sync (bool): Whether to process only files changed since the
+            last run, using Graph delta queries.
+        state_file (str): Path to the JSON file holding state between runs.
+        cache_dir (str): Directory holding the local caches.
+        download_cache_enabled (bool): Whether downloaded files are cached on disk.
+        download_cache_max_mb (int): Maximum size of the download cache in megabytes.
+        parsed_cache_enabled (bool): Whether parsed rows are cached on disk.
+        parsed_cache_max_mb (int): Maximum size of the parsed row cache in megabytes.
+        checkpoint_enabled (bool): Whether the rows of each completed file are
+            journaled, so a restarted run only processes the remaining files.
+            Off by default, as journaling writes every row a second time.
+        checkpoint_dir (str): Directory holding the checkpoint journal.
+        token_cache_file (str): Path of the persisted MSAL token cache; empty keeps
+            the cache in memory only.
+        token_refresh_margin_s (float): Seconds before expiry the access token is
+            refreshed in the background.
+        run_report_file (str): Path of the JSON report with the stage timings and
+            counters of each run; empty disables it.
+        metrics_textfile (str): Path of a Prometheus textfile with the totals of
+            each run, for the node exporter's textfile collector; empty disables it.
+        profile_dir (str): Directory for the cProfile, allocation and event loop
+            lag profiles of the run; empty disables profiling.
+        profile_sample_size (int): Number of runs of each stage that are profiled.
+        loop_lag_threshold_ms (float): Time in milliseconds the event loop may be
+            blocked before the blocking call is recorded while profiling.
+        daemon_poll_interval_s (float): Seconds between incremental runs in daemon
+            mode when nothing triggers one; 0 disables polling.
+        webhook_host (str): Host the daemon's change notification webhook listens
+            on.
+        webhook_port (int): Port of the daemon's change notification webhook; 0
+            disables it.
+        webhook_client_state (str): Secret the change notifications must carry in
+            their clientState; empty accepts any.
+        query_index_file (str): Path of the SQLite query index kept up to date
+            with the consolidated rows; empty disables it.
     """
 
     def __init__(self) -> None:
@@ -33,7 +151,147 @@ class Settings:
         self.sharepoint_host: str = os.getenv("sharepoint_host", "")
         self.sharepoint_site: str = os.getenv("sharepoint_site", "")
         self.sharepoint_path: str = os.getenv("sharepoint_path", "")
+        self.drive_name: str = os.getenv("drive_name", "Documentos")
+        self.resolution_cache_ttl_s: int = int(
+            os.getenv("resolution_cache_ttl_s", "86400")
+        )
+        self.graph_base_url: str = os.getenv(
+            "graph_base_url", "https://graph.microsoft.com/v1.0"
+        ).rstrip("/")
         self.columns: List[str] = os.getenv("columns", "").split(",")
+        self.column_mapping: str = os.getenv("column_mapping", "header")
+        self.column_aliases: Dict[str, List[str]] = json.loads(
+            os.getenv("column_aliases", "{}")
+        )
+        self.column_dtypes: Dict[str, str] = json.loads(
+            os.getenv("column_dtypes", "{}")
+        )
         self.output_filename: str = os.getenv("output_filename", "consolidated.xlsx")
         self.origin_column_name: str = os.getenv("origin_column_name", "Origem")
+        self.output_format: str = os.getenv("output_format", "")
+        self.output_streaming: bool = (
+            os.getenv("output_streaming", "true").lower() == "true"
+        )
+        self.output_batch_rows: int = int(os.getenv("output_batch_rows", "50000"))
+        self.output_table: str = os.getenv("output_table", "consolidated")
         self.log_level: str = os.getenv("log_level", "INFO")
+        self.http_connection_limit: int = int(os.getenv("http_connection_limit", "100"))
+        self.http_connection_limit_per_host: int = int(
+            os.getenv("http_connection_limit_per_host", "30")
+        )
+        self.http_keepalive_timeout: float = float(
+            os.getenv("http_keepalive_timeout", "30")
+        )
+        self.http_dns_cache_ttl: int = int(os.getenv("http_dns_cache_ttl", "300"))
+        self.http_max_retries: int = int(os.getenv("http_max_retries", "5"))
+        self.http_backoff_base: float = float(os.getenv("http_backoff_base", "0.5"))
+        self.http_backoff_max: float = float(os.getenv("http_backoff_max", "60"))
+        self.http_retry_budget_ratio: float = float(
+            os.getenv("http_retry_budget_ratio", "0.2")
+        )
+        self.http_retry_budget: int = int(os.getenv("http_retry_budget", "20"))
+        self.http_rate_limit: float = float(os.getenv("http_rate_limit", "50"))
+        self.http_rate_limit_min: float = float(os.getenv("http_rate_limit_min", "1"))
+        self.http_rate_limit_step: float = float(
+            os.getenv("http_rate_limit_step", "0.5")
+        )
+        self.http_rate_limit_burst: int = int(os.getenv("http_rate_limit_burst", "20"))
+        self.download_rate_limit: float = float(os.getenv("download_rate_limit", "0"))
+        self.graph_batch_enabled: bool = (
+            os.getenv("graph_batch_enabled", "true").lower() == "true"
+        )
+        self.graph_batch_size: int = int(os.getenv("graph_batch_size", "20"))
+        self.graph_batch_window_ms: int = int(os.getenv("graph_batch_window_ms", "10"))
+        self.graph_batch_max_retries: int = int(
+            os.getenv("graph_batch_max_retries", "5")
+        )
+        self.max_concurrent_downloads: int = int(
+            os.getenv("max_concurrent_downloads", "8")
+        )
+        self.max_concurrent_parses: int = int(
+            os.getenv("max_concurrent_parses", str(os.cpu_count() or 1))
+        )
+        self.work_queue_size: int = int(os.getenv("work_queue_size", "100"))
+        self.parse_executor: str = os.getenv("parse_executor", "process")
+        self.parse_workers: int = int(
+            os.getenv("parse_workers", str(os.cpu_count() or 1))
+        )
+        self.excel_engine: str = os.getenv("excel_engine", "auto")
+        self.sheet_names: List[str] = [
+            name.strip()
+            for name in os.getenv("sheet_names", "").split(",")
+            if name.strip()
+        ]
+        self.csv_delimiter: str = os.getenv("csv_delimiter", ",")
+        self.csv_encoding: str = os.getenv("csv_encoding", "utf-8-sig")
+        self.csv_chunk_rows: int = int(os.getenv("csv_chunk_rows", "50000"))
+        self.download_chunk_size_kb: int = int(
+            os.getenv("download_chunk_size_kb", "1024")
+        )
+        self.download_spool_threshold_mb: int = int(
+            os.getenv("download_spool_threshold_mb", "16")
+        )
+        self.use_download_url: bool = (
+            os.getenv("use_download_url", "true").lower() == "true"
+        )
+        self.download_parallel_threshold_mb: int = int(
+            os.getenv("download_parallel_threshold_mb", "64")
+        )
+        self.download_range_size_mb: int = int(
+            os.getenv("download_range_size_mb", "16")
+        )
+        self.download_range_concurrency: int = int(
+            os.getenv("download_range_concurrency", "4")
+        )
+        self.spool_dir: str = os.getenv("spool_dir", "")
+        self.list_page_size: int = int(os.getenv("list_page_size", "200"))
+        self.list_select: str = os.getenv(
+            "list_select",
+            "id,name,eTag,cTag,size,file,folder,parentReference,lastModifiedDateTime,"
+            "@microsoft.graph.downloadUrl",
+        )
+        self.list_recursive: bool = (
+            os.getenv("list_recursive", "false").lower() == "true"
+        )
+        self.list_max_concurrency: int = int(os.getenv("list_max_concurrency", "20"))
+        self.incremental_sync: bool = (
+            os.getenv("incremental_sync", "false").lower() == "true"
+        )
+        self.state_file: str = os.getenv("state_file", ".sheet_merger_state.json")
+        self.cache_dir: str = os.getenv("cache_dir", ".cache")
+        self.download_cache_enabled: bool = (
+            os.getenv("download_cache_enabled", "false").lower() == "true"
+        )
+        self.download_cache_max_mb: int = int(
+            os.getenv("download_cache_max_mb", "1024")
+        )
+        self.parsed_cache_enabled: bool = (
+            os.getenv("parsed_cache_enabled", "false").lower() == "true"
+        )
+        self.parsed_cache_max_mb: int = int(os.getenv("parsed_cache_max_mb", "1024"))
+        self.checkpoint_enabled: bool = (
+            os.getenv("checkpoint_enabled", "false").lower() == "true"
+        )
+        self.checkpoint_dir: str = os.getenv(
+            "checkpoint_dir", os.path.join(self.cache_dir, "checkpoint")
+        )
+        self.token_cache_file: str = os.getenv(
+            "token_cache_file", os.path.join(self.cache_dir, "token_cache.json")
+        )
+        self.token_refresh_margin_s: float = float(
+            os.getenv("token_refresh_margin_s", "300")
+        )
+        self.run_report_file: str = os.getenv("run_report_file", "")
+        self.metrics_textfile: str = os.getenv("metrics_textfile", "")
+        self.profile_dir: str = os.getenv("profile_dir", "")
+        self.profile_sample_size: int = int(os.getenv("profile_sample_size", "5"))
+        self.loop_lag_threshold_ms: float = float(
+            os.getenv("loop_lag_threshold_ms", "100")
+        )
+        self.daemon_poll_interval_s: float = float(
+            os.getenv("daemon_poll_interval_s", "300")
+        )
+        self.webhook_host: str = os.getenv("webhook_host", "127.0.0.1")
+        self.webhook_port: int = int(os.getenv("webhook_port", "0"))
+        self.webhook_client_state: str = os.getenv("webhook_client_state", "")
+        self.query_index_file: str = os.getenv("query_index_file", "")
@@ -1,6 +1,8 @@
+import argparse
 import asyncio
 
 from app.app import App
+from app.daemon import Daemon
 from config.logger_config import LoggerConfig
 from config.settings import Settings
 from services.factory.service_factory import ServiceFactory
@@ -9,16 +11,56 @@ settings = Settings()
 LoggerConfig.setup_logging(level=settings.log_level)
 
 
-async def main() -> None:
+async def main(daemon: bool = False) -> None:
     """
     Main entry point of the application. Initializes settings, logger, service factory,
-    and the main application class, then runs the application.
+    and the main application class, then runs the application once, or keeps running
+    it on every trigger in daemon mode.
+
+    Args:
+        daemon (bool): Whether to run as a long-running daemon.
     """
     logger = LoggerConfig()
     factory = ServiceFactory(settings, logger)
-    app = App(settings, logger, factory)
-    await app.run()
+    try:
+        if daemon:
+            await Daemon(settings, logger, factory).run_forever()
+        else:
+            app = App(settings, logger, factory)
+            await app.run()
+    finally:
+        await factory.close()
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parses the command line options.
+
+    Returns:
+        argparse.Namespace: The options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Consolidates the spreadsheets of a SharePoint folder into one."
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile",
+        metavar="DIR",
+        help="Profile the pipeline stages and the event loop lag, writing the "
+        "profiles to DIR (default: profile)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running, with warm connections and pools, and run an incremental "
+        "consolidation on every poll interval or change notification",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    if args.profile:
+        settings.profile_dir = args.profile
+    asyncio.run(main(args.daemon))
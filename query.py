@@ -0,0 +1,202 @@
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.query.query_index import QueryIndex
+
+settings = Settings()
+LoggerConfig.setup_logging(level=settings.log_level)
+
+HTTP_DEFAULT_LIMIT = 1000
+
+
+def run_query(query_index: QueryIndex, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Runs a query given as command line or query string options.
+
+    Args:
+        query_index (QueryIndex): The query index.
+        options (dict): Lists of 'where' conditions, 'select' columns, 'group_by'
+            columns, 'agg' aggregations and 'order_by' columns, and the 'limit'.
+
+    Returns:
+        dict: The result column names and rows.
+
+    Raises:
+        ValueError: If the query is malformed.
+    """
+
+    def split(values: Optional[Sequence[str]]) -> List[str]:
+        return [
+            name.strip()
+            for value in values or []
+            for name in value.split(",")
+            if name.strip()
+        ]
+
+    columns, rows = query_index.query(
+        where=[QueryIndex.parse_filter(value) for value in options.get("where") or []],
+        select=split(options.get("select")),
+        group_by=split(options.get("group_by")),
+        aggregates=[
+            QueryIndex.parse_aggregate(value) for value in split(options.get("agg"))
+        ],
+        order_by=split(options.get("order_by")),
+        limit=options.get("limit"),
+    )
+    return {"columns": columns, "rows": [list(row) for row in rows]}
+
+
+def print_result(result: Dict[str, Any], output_format: str) -> None:
+    """
+    Prints a query result as an aligned table, JSON or CSV.
+
+    Args:
+        result (dict): The result column names and rows.
+        output_format (str): 'table', 'json' or 'csv'.
+    """
+    if output_format == "json":
+        json.dump(result, sys.stdout, indent=2, default=str)
+        print()
+        return
+    if output_format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(result["columns"])
+        writer.writerows(result["rows"])
+        return
+    table: List[Tuple[str, ...]] = [tuple(result["columns"])] + [
+        tuple("" if value is None else str(value) for value in row)
+        for row in result["rows"]
+    ]
+    widths = [max(len(row[i]) for row in table) for i in range(len(table[0]))]
+    for i, row in enumerate(table):
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+        if i == 0:
+            print("  ".join("-" * width for width in widths))
+    print(f"({len(result['rows'])} rows)")
+
+
+async def handle_query(request: web.Request) -> web.Response:
+    """
+    Answers GET /query with the result of the query given in the query string,
+    such as /query?where=status=open&select=id,name&limit=10.
+
+    Args:
+        request (web.Request): The request.
+
+    Returns:
+        web.Response: The result as JSON, or a 400 error for a malformed query.
+    """
+    query = request.rel_url.query
+    try:
+        result = run_query(
+            request.app["query_index"],
+            {
+                "where": query.getall("where", []),
+                "select": query.getall("select", []),
+                "group_by": query.getall("group_by", []),
+                "agg": query.getall("agg", []),
+                "order_by": query.getall("order_by", []),
+                "limit": int(query.get("limit", HTTP_DEFAULT_LIMIT)),
+            },
+        )
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    return web.json_response(result, dumps=lambda data: json.dumps(data, default=str))
+
+
+def serve(query_index: QueryIndex, host: str, port: int) -> None:
+    """
+    Serves queries over HTTP until interrupted.
+
+    Args:
+        query_index (QueryIndex): The query index.
+        host (str): Host to listen on.
+        port (int): Port to listen on.
+    """
+    app = web.Application()
+    app["query_index"] = query_index
+    app.router.add_get("/query", handle_query)
+    web.run_app(app, host=host, port=port)
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parses the command line options.
+
+    Returns:
+        argparse.Namespace: The options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Queries the consolidated rows kept in the query index."
+    )
+    parser.add_argument(
+        "--index",
+        default=settings.query_index_file,
+        help="Path of the query index (default: the query_index_file setting)",
+    )
+    parser.add_argument(
+        "--where",
+        action="append",
+        metavar="CONDITION",
+        help="Condition such as status=open, amount>=100 or name~%%acme%%; "
+        "repeat for several",
+    )
+    parser.add_argument("--select", action="append", help="Columns to return")
+    parser.add_argument(
+        "--group-by", dest="group_by", action="append", help="Columns to group by"
+    )
+    parser.add_argument(
+        "--agg",
+        action="append",
+        metavar="FUNCTION[:COLUMN]",
+        help="Aggregation such as count, sum:amount or max:date",
+    )
+    parser.add_argument(
+        "--order-by",
+        dest="order_by",
+        action="append",
+        metavar="COLUMN[:desc]",
+        help="Result column to sort by, such as amount:desc or count:desc",
+    )
+    parser.add_argument("--limit", type=int, help="Maximum number of rows")
+    parser.add_argument("--format", choices=("table", "json", "csv"), default="table")
+    parser.add_argument(
+        "--serve", action="store_true", help="Serve queries over HTTP at /query"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on")
+    parser.add_argument("--port", type=int, default=8081, help="Port to listen on")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """
+    Runs the query given on the command line, or serves queries over HTTP.
+    """
+    args = parse_args()
+    if not args.index:
+        sys.exit("No query index: set query_index_file or pass --index")
+    try:
+        query_index = QueryIndex(args.index, settings, LoggerConfig(), read_only=True)
+    except sqlite3.Error as e:
+        sys.exit(f"Cannot open the query index '{args.index}': {e}")
+    try:
+        if args.serve:
+            serve(query_index, args.host, args.port)
+        else:
+            print_result(run_query(query_index, vars(args)), args.format)
+    except ValueError as e:
+        sys.exit(str(e))
+    finally:
+        query_index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import aiohttp
 
+from auth.authentication import AuthenticationService
 from config.logger_config import LoggerConfig
+from services.http.retry_policy import RetryPolicy
 
 logger = LoggerConfig.get_logger(__name__)
 
@@ -13,21 +15,36 @@ class BaseService(ABC):
     Abstract base class for services that make HTTP requests.
 
     Attributes:
-        access_token (str): Access token for authentication.
+        auth_service (AuthenticationService): Provides the current access token.
+        session (aiohttp.ClientSession): Shared HTTP client session.
+        retry_policy (Optional[RetryPolicy]): Policy retrying throttled and
+            transiently failing requests.
     """
 
-    def __init__(self, access_token: str) -> None:
+    def __init__(
+        self,
+        auth_service: AuthenticationService,
+        session: aiohttp.ClientSession,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
         """
-        Initializes the BaseService class with an access token.
+        Initializes the BaseService class with an authentication service and HTTP
+        session.
 
         Args:
-            access_token (str): Access token for authentication.
+            auth_service (AuthenticationService): Provides the current access token.
+            session (aiohttp.ClientSession): Shared HTTP client session.
+            retry_policy (Optional[RetryPolicy]): Policy retrying throttled and
+                transiently failing requests.
         """
-        self.access_token = access_token
+        self.auth_service = auth_service
+        self.session = session
+        self.retry_policy = retry_policy
 
     async def make_request(self, method: str, url: str) -> Dict[str, Any]:
         """
-        Makes an HTTP request with the specified method and URL.
+        Makes an HTTP request with the specified method and URL, retrying it
+        through the retry policy when one is set.
 
         Args:
             method (str): HTTP method (e.g., 'GET', 'POST').
@@ -36,15 +53,20 @@ class BaseService(ABC):
         Returns:
             dict: JSON response from the request.
         """
-        headers = self.get_headers()
-        async with aiohttp.ClientSession() as session:
-            async with session.request(method, url, headers=headers) as response:
-                return await self.handle_response(response)
+        headers = await self.get_headers()
+        if self.retry_policy:
+            request = self.retry_policy.request(
+                self.session, method, url, headers=headers
+            )
+        else:
+            request = self.session.request(method, url, headers=headers)
+        async with request as response:
+            return await self.handle_response(response)
 
     @abstractmethod
-    def get_headers(self) -> Dict[str, str]:
+    async def get_headers(self) -> Dict[str, str]:
         """
-        Returns the headers for the HTTP request.
+        Returns the headers for the HTTP request, with the current access token.
 
         Returns:
             dict: Headers for the request.
@@ -0,0 +1,232 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from config.logger_config import LoggerConfig
+
+
+class DiskCache:
+    """
+    Size-bounded on-disk cache that evicts the least recently used entries.
+
+    Entries are content-addressed by SharePoint item ID and version tag, so a new
+    version of a file never reuses stale content. The cache is safe to use from
+    several worker threads: entries are written to unique temporary files and the
+    index is guarded by a lock.
+
+    Attributes:
+        directory (str): Directory holding the cached entries.
+        max_bytes (int): Maximum total size of the cached entries.
+        entries (OrderedDict[str, int]): Cached entry sizes, least recently used first.
+        total_bytes (int): Total size of the cached entries.
+        lock (threading.Lock): Lock guarding the entries and their total size.
+        logger (Logger): Logger instance.
+    """
+
+    SUFFIX = ".bin"
+
+    def __init__(self, directory: str, max_bytes: int, logger: LoggerConfig) -> None:
+        """
+        Initializes the DiskCache and indexes the entries already on disk.
+
+        Args:
+            directory (str): Directory holding the cached entries.
+            max_bytes (int): Maximum total size of the cached entries.
+            logger (LoggerConfig): Logger configuration.
+        """
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        self.logger = logger.get_logger(__name__)
+        self.entries: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes: int = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._index()
+
+    @staticmethod
+    def make_key(item_id: str, tag: str) -> str:
+        """
+        Builds the cache key for a version of a SharePoint item.
+
+        Args:
+            item_id (str): The driveItem ID.
+            tag (str): The driveItem cTag or eTag.
+
+        Returns:
+            str: The cache key.
+        """
+        return hashlib.sha256(f"{item_id}:{tag}".encode("utf-8")).hexdigest()
+
+    def _index(self) -> None:
+        """
+        Indexes the entries on disk, ordered by last access time.
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            found.append((stat.st_mtime, name[: -len(self.SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def _path(self, key: str) -> str:
+        """
+        Returns the path of a cache entry.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str: Path of the entry file.
+        """
+        return os.path.join(self.directory, f"{key}{self.SUFFIX}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the cached data for the key and marks it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[bytes]: The cached data, or None on a cache miss.
+        """
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            self._forget(key)
+            return None
+
+    def get_path(self, key: str) -> Optional[str]:
+        """
+        Returns the path of the cached entry for the key and marks it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[str]: Path of the entry file, or None on a cache miss.
+        """
+        with self.lock:
+            if key not in self.entries:
+                return None
+        path = self._path(key)
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            self._forget(key)
+            return None
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        return path
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Stores data under the key and evicts old entries beyond the size limit.
+
+        Args:
+            key (str): The cache key.
+            data (bytes): The data to cache.
+        """
+
+        def write(tmp_path: str) -> None:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+
+        self._store(key, len(data), write)
+
+    def put_file(self, key: str, source_path: str) -> None:
+        """
+        Stores a copy of a file under the key and evicts old entries beyond the size
+        limit.
+
+        Args:
+            key (str): The cache key.
+            source_path (str): Path of the file to cache.
+        """
+        self._store(
+            key,
+            os.path.getsize(source_path),
+            lambda tmp_path: shutil.copyfile(source_path, tmp_path),
+        )
+
+    def _store(self, key: str, size: int, write: Callable[[str], None]) -> None:
+        """
+        Writes an entry atomically and updates the index.
+
+        Args:
+            key (str): The cache key.
+            size (int): Size of the entry in bytes.
+            write (Callable[[str], None]): Function writing the entry to a path.
+        """
+        if size > self.max_bytes:
+            return
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.directory, prefix=f".{key}.", suffix=".tmp"
+        )
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)
+            self.entries[key] = size
+            self.total_bytes += size
+            self._evict()
+
+    def _forget(self, key: str) -> None:
+        """
+        Removes an entry from the index.
+
+        Args:
+            key (str): The cache key.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)
+
+    def clear(self) -> None:
+        """
+        Removes every cached entry.
+        """
+        with self.lock:
+            for key in list(self.entries):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache fits its size limit.
+        Call with the lock held.
+        """
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self.logger.debug(f"Evicted cache entry {key}")
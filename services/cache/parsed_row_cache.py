@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from config.logger_config import LoggerConfig
+from services.cache.disk_cache import DiskCache
+
+
+class ParsedRowCache:
+    """
+    Cache of the rows parsed from each source file, so unchanged files are merged
+    without being downloaded or parsed again.
+
+    Entries are column-aligned DataFrame batches pickled with protocol 5 and keyed
+    by driveItem ID, version tag and a fingerprint of the output schema. When the
+    schema or the entry format changes, the whole cache is invalidated.
+
+    Attributes:
+        disk_cache (DiskCache): Underlying size-bounded on-disk cache.
+        fingerprint (str): Fingerprint of the output schema and entry format.
+        logger (Logger): Logger instance.
+    """
+
+    FINGERPRINT_FILE = "schema.fingerprint"
+    FORMAT_VERSION = 2
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        schema: Dict[str, Any],
+        logger: LoggerConfig,
+    ) -> None:
+        """
+        Initializes the ParsedRowCache, clearing it if the output schema changed.
+
+        Args:
+            directory (str): Directory holding the cached entries.
+            max_bytes (int): Maximum total size of the cached entries.
+            schema (dict): JSON-serializable description of the output schema and
+                column mapping.
+            logger (LoggerConfig): Logger configuration.
+        """
+        self.logger = logger.get_logger(__name__)
+        self.disk_cache: DiskCache = DiskCache(directory, max_bytes, logger)
+        self.fingerprint: str = hashlib.sha256(
+            json.dumps(
+                {"schema": schema, "format": self.FORMAT_VERSION}, sort_keys=True
+            ).encode("utf-8")
+        ).hexdigest()
+        self._invalidate_if_schema_changed(directory)
+
+    def _invalidate_if_schema_changed(self, directory: str) -> None:
+        """
+        Clears the cache when it was built for a different output schema.
+
+        Args:
+            directory (str): Directory holding the cached entries.
+        """
+        path = os.path.join(directory, self.FINGERPRINT_FILE)
+        previous = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                previous = f.read().strip()
+        if previous != self.fingerprint:
+            if previous is not None:
+                self.logger.info("Output schema changed, clearing the parsed row cache")
+            self.disk_cache.clear()
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.fingerprint)
+
+    def _key(self, item_id: str, tag: str) -> str:
+        """
+        Builds the cache key for a version of a SharePoint item.
+
+        Args:
+            item_id (str): The driveItem ID.
+            tag (str): The driveItem cTag or eTag.
+
+        Returns:
+            str: The cache key.
+        """
+        return DiskCache.make_key(item_id, f"{tag}:{self.fingerprint}")
+
+    def get(self, item_id: str, tag: str) -> Optional[pd.DataFrame]:
+        """
+        Returns the cached rows of a file version.
+
+        Args:
+            item_id (str): The driveItem ID.
+            tag (str): The driveItem cTag or eTag.
+
+        Returns:
+            Optional[pd.DataFrame]: The cached rows, or None on a cache miss.
+        """
+        data = self.disk_cache.get(self._key(item_id, tag))
+        if data is None:
+            return None
+        try:
+            return pickle.loads(data)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable parsed row cache entry: {e}")
+            return None
+
+    def put(self, item_id: str, tag: str, rows: pd.DataFrame) -> None:
+        """
+        Stores the rows parsed from a file version.
+
+        Args:
+            item_id (str): The driveItem ID.
+            tag (str): The driveItem cTag or eTag.
+            rows (pd.DataFrame): The parsed rows.
+        """
+        self.disk_cache.put(self._key(item_id, tag), pickle.dumps(rows, protocol=5))
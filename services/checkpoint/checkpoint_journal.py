@@ -0,0 +1,413 @@
+import asyncio
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from config.logger_config import LoggerConfig
+from services.file_processing.strategies.base_file_processing_strategy import (
+    BaseFileProcessingStrategy,
+)
+from services.spreadsheet.spreadsheet_service import SpreadsheetService
+
+
+class CheckpointRecorder:
+    """
+    Stands in for the spreadsheet while a file is processed, forwarding its rows
+    to the spreadsheet and appending them to the file's rows file in the journal.
+
+    The rows file and the journal are written in the writer thread of the
+    journal, so pickling and syncing the rows never blocks the event loop.
+
+    Attributes:
+        journal (CheckpointJournal): The journal the file is recorded in.
+        file (dict): The file metadata.
+        spreadsheet_service (SpreadsheetService): The spreadsheet rows go to.
+        origin_column_name (str): Name of the origin column.
+        rows_path (str): Path of the file's rows file.
+        row_count (int): Number of rows recorded.
+        rows_file (Optional[BinaryIO]): The rows file, opened with the first batch.
+        writes (List[Future]): Pending writes of the file's batches.
+    """
+
+    def __init__(
+        self,
+        journal: "CheckpointJournal",
+        file: Dict[str, Any],
+        spreadsheet_service: SpreadsheetService,
+    ) -> None:
+        """
+        Initializes the CheckpointRecorder for a file.
+
+        Args:
+            journal (CheckpointJournal): The journal the file is recorded in.
+            file (dict): The file metadata.
+            spreadsheet_service (SpreadsheetService): The spreadsheet rows go to.
+        """
+        self.journal = journal
+        self.file = file
+        self.spreadsheet_service = spreadsheet_service
+        self.origin_column_name: str = spreadsheet_service.origin_column_name
+        self.rows_path: str = journal.get_rows_path(file["id"])
+        self.row_count: int = 0
+        self.rows_file: Optional[BinaryIO] = None
+        self.writes: List[Future] = []
+
+    def add_batch(self, batch: pd.DataFrame) -> None:
+        """
+        Adds a batch of rows to the spreadsheet and queues its recording.
+
+        Args:
+            batch (pd.DataFrame): Rows aligned to the output header.
+        """
+        self.spreadsheet_service.add_batch(batch)
+        self.writes.append(self.journal.writer.submit(self._write, batch))
+        self.row_count += len(batch)
+
+    def _write(self, batch: pd.DataFrame) -> None:
+        """
+        Appends a batch to the rows file, marking the file as in progress with its
+        first batch. Runs in the writer thread.
+
+        Args:
+            batch (pd.DataFrame): Rows aligned to the output header.
+        """
+        if self.rows_file is None:
+            self.journal.mark_in_progress(self.file)
+            self.rows_file = open(self.rows_path, "wb")
+        pickle.dump(batch, self.rows_file, protocol=5)
+
+    async def commit(self) -> None:
+        """
+        Marks the file as completed once all of its rows are recorded.
+
+        Raises:
+            Exception: If recording a batch failed.
+        """
+        await self.journal.run(self._commit)
+
+    def _commit(self) -> None:
+        """
+        Syncs the rows file and marks the file as completed. Runs in the writer
+        thread, after the writes of every batch.
+        """
+        try:
+            for write in self.writes:
+                write.result()
+        except BaseException:
+            self._abort()
+            raise
+        if self.rows_file is None:
+            self.rows_file = open(self.rows_path, "wb")
+        self.rows_file.flush()
+        os.fsync(self.rows_file.fileno())
+        self.rows_file.close()
+        self.journal.mark_completed(self.file, self.rows_path, self.row_count)
+
+    def abort(self) -> None:
+        """
+        Marks the file as failed and discards the rows recorded for it.
+        """
+        self.journal.writer.submit(self._abort)
+
+    def _abort(self) -> None:
+        """
+        Closes the rows file and marks the file as failed. Runs in the writer
+        thread.
+        """
+        if self.rows_file is not None:
+            self.rows_file.close()
+        self.journal.mark_failed(self.file)
+
+    def discard(self) -> None:
+        """
+        Forgets a file that was not processed, such as a parsed row cache miss.
+        """
+        self.journal.writer.submit(self._discard)
+
+    def _discard(self) -> None:
+        """
+        Closes and removes the rows file. Runs in the writer thread.
+        """
+        if self.rows_file is not None:
+            self.rows_file.close()
+            os.remove(self.rows_path)
+
+
+class CheckpointJournal:
+    """
+    SQLite journal recording the status of each file of a run, its version tag and
+    the file holding its parsed rows, so a restarted run replays the completed
+    files from disk and only processes the remaining ones.
+
+    The journal belongs to one source and output schema: it is reset when either
+    changes, and cleared once a run has saved its output without failures.
+
+    Once opened, the journal database and the rows files are only touched from a
+    single writer thread; the event loop submits calls to it with run.
+
+    Attributes:
+        directory (str): Directory holding the journal and the rows files.
+        rows_dir (str): Directory holding the rows files.
+        fingerprint (str): Fingerprint of the source and output schema.
+        connection (sqlite3.Connection): Connection to the journal database.
+        writer (ThreadPoolExecutor): Single thread running the journal writes.
+        logger (Logger): Logger instance.
+    """
+
+    DATABASE_FILE = "journal.sqlite3"
+    STATUS_IN_PROGRESS = "in_progress"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+
+    def __init__(
+        self, directory: str, source: Dict[str, Any], logger: LoggerConfig
+    ) -> None:
+        """
+        Initializes the CheckpointJournal, resetting it if it was written for a
+        different source or output schema.
+
+        Args:
+            directory (str): Directory holding the journal and the rows files.
+            source (dict): JSON-serializable description of the source and the
+                output schema.
+            logger (LoggerConfig): Logger configuration.
+        """
+        self.directory: str = directory
+        self.rows_dir: str = os.path.join(directory, "rows")
+        self.logger = logger.get_logger(__name__)
+        self.fingerprint: str = hashlib.sha256(
+            json.dumps(source, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        os.makedirs(self.rows_dir, exist_ok=True)
+        self.connection = sqlite3.connect(
+            os.path.join(directory, self.DATABASE_FILE), check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "item_id TEXT PRIMARY KEY, name TEXT, tag TEXT, status TEXT, "
+                "rows_path TEXT, row_count INTEGER, updated_at REAL)"
+            )
+        self._reset_if_source_changed()
+        self.writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="checkpoint-journal"
+        )
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs a journal call in the writer thread, after the writes queued before.
+
+        Args:
+            func (Callable[..., Any]): The call, such as get_completed or clear.
+            *args: Arguments of the call.
+
+        Returns:
+            Any: The result of the call.
+        """
+        return await asyncio.wrap_future(self.writer.submit(func, *args))
+
+    def _reset_if_source_changed(self) -> None:
+        """
+        Clears the journal when it was written for a different source or schema.
+        """
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'fingerprint'"
+        ).fetchone()
+        if row is None or row[0] != self.fingerprint:
+            if row is not None:
+                self.logger.info("Source or schema changed, starting a new checkpoint")
+            self.clear()
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)",
+                    (self.fingerprint,),
+                )
+        else:
+            completed = self.count(self.STATUS_COMPLETED)
+            if completed:
+                self.logger.info(
+                    f"Resuming from a checkpoint with {completed} completed files"
+                )
+
+    def get_rows_path(self, item_id: str) -> str:
+        """
+        Returns the path of the rows file of an item.
+
+        Args:
+            item_id (str): The driveItem ID.
+
+        Returns:
+            str: The path of the rows file.
+        """
+        name = hashlib.sha256(item_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.rows_dir, f"{name}.pkl")
+
+    def get_completed(self, file: Dict[str, Any]) -> Optional[str]:
+        """
+        Returns the rows file of a file completed in an earlier attempt of the run.
+
+        Args:
+            file (dict): The file metadata.
+
+        Returns:
+            Optional[str]: The path of the rows file, or None if the file was not
+                completed, changed since, or its rows file is missing.
+        """
+        row = self.connection.execute(
+            "SELECT name, tag, status, rows_path FROM files WHERE item_id = ?",
+            (file["id"],),
+        ).fetchone()
+        if row is None:
+            return None
+        name, tag, status, rows_path = row
+        if (
+            tag is None
+            or status != self.STATUS_COMPLETED
+            or name != SpreadsheetService.get_origin(file)
+            or tag != BaseFileProcessingStrategy.get_version_tag(file)
+            or not os.path.exists(rows_path)
+        ):
+            return None
+        return rows_path
+
+    @staticmethod
+    def load_rows(rows_path: str) -> List[pd.DataFrame]:
+        """
+        Loads the recorded rows of a completed file.
+
+        Args:
+            rows_path (str): The path of the rows file.
+
+        Returns:
+            List[pd.DataFrame]: The recorded batches, aligned to the output header.
+        """
+        batches = []
+        with open(rows_path, "rb") as f:
+            while True:
+                try:
+                    batches.append(pickle.load(f))
+                except EOFError:
+                    return batches
+
+    def record(
+        self, file: Dict[str, Any], spreadsheet_service: SpreadsheetService
+    ) -> CheckpointRecorder:
+        """
+        Returns the recorder the rows of a file go through.
+
+        Args:
+            file (dict): The file metadata.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+
+        Returns:
+            CheckpointRecorder: The recorder standing in for the spreadsheet.
+        """
+        return CheckpointRecorder(self, file, spreadsheet_service)
+
+    def mark_in_progress(self, file: Dict[str, Any]) -> None:
+        """
+        Records that the rows of a file are being written.
+
+        Args:
+            file (dict): The file metadata.
+        """
+        self._set_status(file, self.STATUS_IN_PROGRESS, None, 0)
+
+    def mark_completed(
+        self, file: Dict[str, Any], rows_path: str, row_count: int
+    ) -> None:
+        """
+        Records that all the rows of a file are in its rows file.
+
+        Args:
+            file (dict): The file metadata.
+            rows_path (str): The path of the rows file.
+            row_count (int): The number of rows recorded.
+        """
+        self._set_status(file, self.STATUS_COMPLETED, rows_path, row_count)
+
+    def mark_failed(self, file: Dict[str, Any]) -> None:
+        """
+        Records that a file failed and removes its partial rows file.
+
+        Args:
+            file (dict): The file metadata.
+        """
+        self._set_status(file, self.STATUS_FAILED, None, 0)
+        try:
+            os.remove(self.get_rows_path(file["id"]))
+        except OSError:
+            pass
+
+    def _set_status(
+        self,
+        file: Dict[str, Any],
+        status: str,
+        rows_path: Optional[str],
+        row_count: int,
+    ) -> None:
+        """
+        Writes the status of a file to the journal.
+
+        Args:
+            file (dict): The file metadata.
+            status (str): The status.
+            rows_path (Optional[str]): The path of the rows file, if completed.
+            row_count (int): The number of rows recorded.
+        """
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    file["id"],
+                    SpreadsheetService.get_origin(file),
+                    BaseFileProcessingStrategy.get_version_tag(file),
+                    status,
+                    rows_path,
+                    row_count,
+                    time.time(),
+                ),
+            )
+
+    def count(self, status: str) -> int:
+        """
+        Returns the number of files with a status.
+
+        Args:
+            status (str): The status.
+
+        Returns:
+            int: The number of files.
+        """
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM files WHERE status = ?", (status,)
+        ).fetchone()[0]
+
+    def clear(self) -> None:
+        """
+        Removes every file entry and rows file from the journal.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM files")
+        shutil.rmtree(self.rows_dir, ignore_errors=True)
+        os.makedirs(self.rows_dir, exist_ok=True)
+
+    def close(self) -> None:
+        """
+        Waits for the queued writes and closes the journal database.
+        """
+        self.writer.shutdown(wait=True)
+        self.connection.close()
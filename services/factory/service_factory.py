@@ -1,3 +1,4 @@
+import os
 from typing import Optional
 
 from aiohttp import ClientSession
@@ -5,12 +6,34 @@ from aiohttp import ClientSession
 from auth.authentication import AuthenticationService
 from config.logger_config import LoggerConfig
 from config.settings import Settings
+from services.cache.disk_cache import DiskCache
+from services.cache.parsed_row_cache import ParsedRowCache
+from services.checkpoint.checkpoint_journal import CheckpointJournal
+from services.file_processing.file_processing_scheduler import (
+    FileProcessingScheduler,
+)
 from services.file_processing.file_processor import FileProcessor
+from services.file_processing.parse_executor import ParseExecutor
+from services.file_processing.schema_mapper import SchemaMapper
+from services.file_processing.strategies.csv_processing_strategy import (
+    CsvProcessingStrategy,
+)
 from services.file_processing.strategies.excel_processing_strategy import (
     ExcelProcessingStrategy,
 )
+from services.file_processing.strategies.strategy_registry import StrategyRegistry
+from services.http.graph_batch_client import GraphBatchClient
+from services.http.http_session_manager import HttpSessionManager
+from services.http.rate_limiter import AdaptiveRateLimiter
+from services.http.retry_policy import RetryPolicy
+from services.metrics.run_metrics import RunMetrics
+from services.metrics.stage_profiler import StageProfiler
+from services.query.query_index import QueryIndex
 from services.sharepoint.sharepoint_service import SharePointFolderService
+from services.spreadsheet.sinks.output_sink_factory import OutputSinkFactory
 from services.spreadsheet.spreadsheet_service import SpreadsheetService
+from services.state.state_store import StateStore
+from services.sync.incremental_sync_service import IncrementalSyncService
 
 
 class ServiceFactory:
@@ -20,26 +43,131 @@ class ServiceFactory:
     Attributes:
         settings (Settings): Application settings.
         logger (LoggerConfig): Logger configuration.
+        incremental_sync (bool): Whether runs only process the files changed since
+            the last run; defaults to the setting.
+        http_session_manager (HttpSessionManager): Owner of the shared HTTP session.
+        stage_profiler (Optional[StageProfiler]): Profiler of the pipeline stages,
+            when a profile directory is set.
+        run_metrics (RunMetrics): Stage timings and counters of the run.
+        retry_policy (RetryPolicy): Retry policy and rate limiter shared by every
+            Graph request.
+        download_retry_policy (RetryPolicy): Retry policy and rate limiter of the
+            downloads from pre-authenticated URLs, which are not Graph requests.
+        parse_executor (ParseExecutor): Pool that parses files off the event loop.
         auth_service (Optional[AuthenticationService]): Authentication service instance.
+        graph_batch_client (Optional[GraphBatchClient]): Graph batch client instance.
         sharepoint_service (Optional[SharePointFolderService]): SharePoint service instance.
         spreadsheet_service (Optional[SpreadsheetService]): Spreadsheet service instance.
+        schema_mapper (Optional[SchemaMapper]): Schema mapper instance.
+        strategy_registry (Optional[StrategyRegistry]): Strategy registry instance.
         file_processor (Optional[FileProcessor]): File processor instance.
+        file_processing_scheduler (Optional[FileProcessingScheduler]): Scheduler
+            instance.
+        state_store (Optional[StateStore]): State store instance.
+        download_cache (Optional[DiskCache]): Download cache instance.
+        parsed_row_cache (Optional[ParsedRowCache]): Parsed row cache instance.
+        checkpoint_journal (Optional[CheckpointJournal]): Checkpoint journal instance.
+        incremental_sync_service (Optional[IncrementalSyncService]): Incremental sync
+            service instance.
+        query_index (Optional[QueryIndex]): Query index instance.
     """
 
-    def __init__(self, settings: Settings, logger: LoggerConfig) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        logger: LoggerConfig,
+        incremental_sync: Optional[bool] = None,
+    ) -> None:
         """
         Initializes the ServiceFactory class with settings and logger.
 
         Args:
             settings (Settings): Application settings.
             logger (LoggerConfig): Logger configuration.
+            incremental_sync (Optional[bool]): Whether runs only process the files
+                changed since the last run. Defaults to the configured value.
         """
         self.settings: Settings = settings
         self.logger: LoggerConfig = logger
+        self.incremental_sync: bool = (
+            settings.incremental_sync if incremental_sync is None else incremental_sync
+        )
+        self.http_session_manager: HttpSessionManager = HttpSessionManager(
+            settings, logger
+        )
+        self.stage_profiler: Optional[StageProfiler] = (
+            StageProfiler(settings, logger) if settings.profile_dir else None
+        )
+        self.run_metrics: RunMetrics = RunMetrics(settings, logger, self.stage_profiler)
+        self.retry_policy: RetryPolicy = RetryPolicy(
+            settings, AdaptiveRateLimiter(settings, logger), logger, self.run_metrics
+        )
+        self.download_retry_policy: RetryPolicy = RetryPolicy(
+            settings,
+            AdaptiveRateLimiter(settings, logger, settings.download_rate_limit),
+            logger,
+            self.run_metrics,
+        )
+        self.parse_executor: ParseExecutor = ParseExecutor(
+            settings, logger, self.stage_profiler
+        )
         self.auth_service: Optional[AuthenticationService] = None
+        self.graph_batch_client: Optional[GraphBatchClient] = None
         self.sharepoint_service: Optional[SharePointFolderService] = None
         self.spreadsheet_service: Optional[SpreadsheetService] = None
+        self.schema_mapper: Optional[SchemaMapper] = None
+        self.strategy_registry: Optional[StrategyRegistry] = None
         self.file_processor: Optional[FileProcessor] = None
+        self.file_processing_scheduler: Optional[FileProcessingScheduler] = None
+        self.state_store: Optional[StateStore] = None
+        self.download_cache: Optional[DiskCache] = None
+        self.parsed_row_cache: Optional[ParsedRowCache] = None
+        self.checkpoint_journal: Optional[CheckpointJournal] = None
+        self.incremental_sync_service: Optional[IncrementalSyncService] = None
+        self.query_index: Optional[QueryIndex] = None
+
+    def get_session(self) -> ClientSession:
+        """
+        Returns the shared, connection-pooled HTTP session.
+
+        Returns:
+            ClientSession: Shared HTTP client session.
+        """
+        return self.http_session_manager.get_session()
+
+    async def close(self) -> None:
+        """
+        Releases the resources owned by the factory, such as the shared HTTP session,
+        the token refresh and the parse pool, and discards an output that was never
+        saved.
+        """
+        if self.spreadsheet_service:
+            self.spreadsheet_service.discard()
+        if self.graph_batch_client:
+            await self.graph_batch_client.close()
+        if self.auth_service:
+            await self.auth_service.close()
+        if self.checkpoint_journal:
+            self.checkpoint_journal.close()
+        if self.query_index:
+            self.query_index.close()
+        await self.http_session_manager.close()
+        self.parse_executor.shutdown()
+
+    def reset_run_state(self) -> None:
+        """
+        Drops the services holding the state of a run, such as the output and the
+        scheduler counters, and clears the run metrics, so a long-running process
+        can start another run while the token, the HTTP session, the parse pool and
+        the caches stay warm.
+        """
+        if self.spreadsheet_service:
+            self.spreadsheet_service.discard()
+        self.spreadsheet_service = None
+        self.file_processor = None
+        self.file_processing_scheduler = None
+        self.incremental_sync_service = None
+        self.run_metrics.reset()
 
     def get_auth_service(self) -> AuthenticationService:
         """
@@ -49,7 +177,9 @@ class ServiceFactory:
             AuthenticationService: Authentication service instance.
         """
         if not self.auth_service:
-            self.auth_service = AuthenticationService(self.settings, self.logger)
+            self.auth_service = AuthenticationService(
+                self.settings, self.logger, self.run_metrics
+            )
         return self.auth_service
 
     def get_sharepoint_service(self) -> SharePointFolderService:
@@ -60,12 +190,36 @@ class ServiceFactory:
             SharePointFolderService: SharePoint service instance.
         """
         if not self.sharepoint_service:
-            access_token = self.get_auth_service().get_access_token()
             self.sharepoint_service = SharePointFolderService(
-                access_token, self.settings, self.logger
+                self.get_auth_service(),
+                self.get_session(),
+                self.settings,
+                self.logger,
+                self.get_graph_batch_client(),
+                self.retry_policy,
+                self.get_state_store(),
             )
         return self.sharepoint_service
 
+    def get_graph_batch_client(self) -> Optional[GraphBatchClient]:
+        """
+        Returns the Graph batch client instance. Creates it if it doesn't exist.
+
+        Returns:
+            Optional[GraphBatchClient]: Graph batch client instance, or None if
+                batching is disabled.
+        """
+        if not self.graph_batch_client and self.settings.graph_batch_enabled:
+            self.graph_batch_client = GraphBatchClient(
+                self.get_auth_service(),
+                self.get_session(),
+                self.settings,
+                self.logger,
+                self.retry_policy,
+                self.run_metrics,
+            )
+        return self.graph_batch_client
+
     def get_spreadsheet_service(self) -> SpreadsheetService:
         """
         Returns the spreadsheet service instance. Creates it if it doesn't exist.
@@ -74,30 +228,223 @@ class ServiceFactory:
             SpreadsheetService: Spreadsheet service instance.
         """
         if not self.spreadsheet_service:
+            header = self.settings.columns + [self.settings.origin_column_name]
             self.spreadsheet_service = SpreadsheetService(
-                self.settings.columns, self.settings.origin_column_name, self.logger
+                self.settings.columns,
+                self.settings.origin_column_name,
+                self.logger,
+                OutputSinkFactory.create(self.settings, header, self.logger),
+                self.settings.output_batch_rows,
             )
         return self.spreadsheet_service
 
-    async def get_file_processor(self, session: ClientSession) -> FileProcessor:
+    def get_schema_mapper(self) -> SchemaMapper:
+        """
+        Returns the schema mapper instance. Creates it if it doesn't exist.
+
+        Returns:
+            SchemaMapper: Schema mapper instance.
+        """
+        if not self.schema_mapper:
+            self.schema_mapper = SchemaMapper(
+                self.settings.columns,
+                self.settings.column_mapping,
+                self.settings.column_aliases,
+                self.settings.column_dtypes,
+            )
+        return self.schema_mapper
+
+    def get_strategy_registry(self) -> StrategyRegistry:
+        """
+        Returns the strategy registry instance. Creates it if it doesn't exist, with
+        a strategy for every workbook format that has a reader engine installed and
+        one for CSV files.
+
+        Returns:
+            StrategyRegistry: Strategy registry instance.
+        """
+        if not self.strategy_registry:
+            registry = StrategyRegistry(self.logger)
+            for file_extension in ExcelProcessingStrategy.MIME_TYPES:
+                try:
+                    registry.register(
+                        ExcelProcessingStrategy(
+                            self.parse_executor,
+                            self.get_schema_mapper(),
+                            self.settings,
+                            file_extension,
+                            self.get_download_cache(),
+                            self.get_parsed_row_cache(),
+                            self.retry_policy,
+                            self.download_retry_policy,
+                        )
+                    )
+                except ImportError as e:
+                    self.logger.get_logger(__name__).warning(
+                        f"Skipping {file_extension} files: {e}"
+                    )
+            registry.register(
+                CsvProcessingStrategy(
+                    self.get_schema_mapper(),
+                    self.settings,
+                    self.get_download_cache(),
+                    self.retry_policy,
+                    self.download_retry_policy,
+                )
+            )
+            self.strategy_registry = registry
+        return self.strategy_registry
+
+    def get_file_processor(self, drive_id: str) -> FileProcessor:
         """
         Returns the file processor instance. Creates it if it doesn't exist.
 
         Args:
-            session (ClientSession): HTTP client session.
+            drive_id (str): The ID of the drive holding the files.
 
         Returns:
             FileProcessor: File processor instance.
         """
         if not self.file_processor:
-            strategy = ExcelProcessingStrategy()
             self.file_processor = FileProcessor(
-                session,
-                self.get_spreadsheet_service().ws,
-                self.get_auth_service().get_access_token(),
-                await self.get_sharepoint_service().get_drive_id(
-                    await self.get_sharepoint_service().get_site_id()
-                ),
-                strategy,
+                self.get_session(),
+                self.get_spreadsheet_service(),
+                self.get_auth_service(),
+                drive_id,
+                self.get_strategy_registry(),
+                self.get_checkpoint_journal(drive_id),
+                self.run_metrics,
+                self.get_query_index(),
             )
         return self.file_processor
+
+    def get_file_processing_scheduler(self, drive_id: str) -> FileProcessingScheduler:
+        """
+        Returns the file processing scheduler instance. Creates it if it doesn't exist.
+
+        Args:
+            drive_id (str): The ID of the drive holding the files.
+
+        Returns:
+            FileProcessingScheduler: File processing scheduler instance.
+        """
+        if not self.file_processing_scheduler:
+            query_index = self.get_query_index()
+            self.file_processing_scheduler = FileProcessingScheduler(
+                self.get_file_processor(drive_id),
+                self.settings,
+                self.logger,
+                [query_index.complete] if query_index else None,
+                self.run_metrics,
+            )
+        return self.file_processing_scheduler
+
+    def get_state_store(self) -> StateStore:
+        """
+        Returns the state store instance. Creates it if it doesn't exist.
+
+        Returns:
+            StateStore: State store instance.
+        """
+        if not self.state_store:
+            self.state_store = StateStore(self.settings.state_file, self.logger)
+        return self.state_store
+
+    def get_incremental_sync_service(self) -> IncrementalSyncService:
+        """
+        Returns the incremental sync service instance. Creates it if it doesn't exist.
+
+        Returns:
+            IncrementalSyncService: Incremental sync service instance.
+        """
+        if not self.incremental_sync_service:
+            self.incremental_sync_service = IncrementalSyncService(
+                self.get_sharepoint_service(),
+                self.get_spreadsheet_service(),
+                self.get_state_store(),
+                {
+                    "output_filename": self.settings.output_filename,
+                    "output_format": self.settings.output_format,
+                    "output_table": self.settings.output_table,
+                    "origin_column_name": self.settings.origin_column_name,
+                    "sheet_names": self.settings.sheet_names,
+                    **self.get_schema_mapper().describe(),
+                },
+                self.settings,
+                self.logger,
+            )
+        return self.incremental_sync_service
+
+    def get_download_cache(self) -> Optional[DiskCache]:
+        """
+        Returns the download cache instance. Creates it if it doesn't exist.
+
+        Returns:
+            Optional[DiskCache]: Download cache instance, or None if disabled.
+        """
+        if not self.download_cache and self.settings.download_cache_enabled:
+            self.download_cache = DiskCache(
+                os.path.join(self.settings.cache_dir, "downloads"),
+                self.settings.download_cache_max_mb * 1024 * 1024,
+                self.logger,
+            )
+        return self.download_cache
+
+    def get_checkpoint_journal(self, drive_id: str) -> Optional[CheckpointJournal]:
+        """
+        Returns the checkpoint journal instance. Creates it if it doesn't exist.
+
+        Args:
+            drive_id (str): The ID of the drive holding the files.
+
+        Returns:
+            Optional[CheckpointJournal]: Checkpoint journal instance, or None if
+                disabled.
+        """
+        if not self.checkpoint_journal and self.settings.checkpoint_enabled:
+            self.checkpoint_journal = CheckpointJournal(
+                self.settings.checkpoint_dir,
+                {
+                    "drive_id": drive_id,
+                    "sharepoint_path": self.settings.sharepoint_path,
+                    "recursive": self.settings.list_recursive,
+                    "incremental_sync": self.incremental_sync,
+                    "origin_column_name": self.settings.origin_column_name,
+                    "sheet_names": self.settings.sheet_names,
+                    **self.get_schema_mapper().describe(),
+                },
+                self.logger,
+            )
+        return self.checkpoint_journal
+
+    def get_parsed_row_cache(self) -> Optional[ParsedRowCache]:
+        """
+        Returns the parsed row cache instance. Creates it if it doesn't exist.
+
+        Returns:
+            Optional[ParsedRowCache]: Parsed row cache instance, or None if disabled.
+        """
+        if not self.parsed_row_cache and self.settings.parsed_cache_enabled:
+            self.parsed_row_cache = ParsedRowCache(
+                os.path.join(self.settings.cache_dir, "parsed"),
+                self.settings.parsed_cache_max_mb * 1024 * 1024,
+                {
+                    **self.get_schema_mapper().describe(),
+                    "sheet_names": self.settings.sheet_names,
+                },
+                self.logger,
+            )
+        return self.parsed_row_cache
+
+    def get_query_index(self) -> Optional[QueryIndex]:
+        """
+        Returns the query index instance. Creates it if it doesn't exist.
+
+        Returns:
+            Optional[QueryIndex]: Query index instance, or None if disabled.
+        """
+        if not self.query_index and self.settings.query_index_file:
+            self.query_index = QueryIndex(
+                self.settings.query_index_file, self.settings, self.logger
+            )
+        return self.query_index
@@ -0,0 +1,276 @@
+import importlib.util
+from functools import partial
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from pandas.io.parsers import TextParser
+
+from services.file_processing.schema_mapper import SchemaMapper
+
+ExcelReader = Callable[[Union[bytes, str], SchemaMapper, List[str]], List[pd.DataFrame]]
+
+EXCEL_ERRORS = frozenset(
+    ("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A")
+)
+
+ALL_SHEETS = "*"
+
+
+def _open(content: Union[bytes, str]) -> Union[BytesIO, str]:
+    """
+    Wraps raw content in a file object, leaving paths untouched.
+
+    Args:
+        content (Union[bytes, str]): The raw content of the file, or its path.
+
+    Returns:
+        Union[BytesIO, str]: A source accepted by the Excel readers.
+    """
+    return BytesIO(content) if isinstance(content, bytes) else content
+
+
+def select_sheets(available: List[str], sheet_names: List[str]) -> List[str]:
+    """
+    Selects the worksheets to read.
+
+    Args:
+        available (List[str]): The worksheet names of the workbook, in order.
+        sheet_names (List[str]): The configured selection: empty for the first
+            worksheet, '*' for all of them, or the names to read. Names missing
+            from the workbook are ignored.
+
+    Returns:
+        List[str]: The names of the worksheets to read, in order.
+    """
+    if not sheet_names:
+        return available[:1]
+    if ALL_SHEETS in sheet_names:
+        return list(available)
+    return [name for name in sheet_names if name in available]
+
+
+def read_with_pandas(
+    content: Union[bytes, str],
+    schema_mapper: SchemaMapper,
+    sheet_names: List[str],
+    engine: str,
+) -> List[pd.DataFrame]:
+    """
+    Reads the selected worksheets with a pandas Excel engine.
+
+    Args:
+        content (Union[bytes, str]): The raw content of the file, or its path.
+        schema_mapper (SchemaMapper): Selects the columns to read.
+        sheet_names (List[str]): The configured worksheet selection.
+        engine (str): The pandas engine name.
+
+    Returns:
+        List[pd.DataFrame]: The columns used by the output, one frame per sheet.
+    """
+    with pd.ExcelFile(_open(content), engine=engine) as workbook:
+        return [
+            workbook.parse(name, **schema_mapper.read_options())
+            for name in select_sheets(workbook.sheet_names, sheet_names)
+        ]
+
+
+def read_with_openpyxl_read_only(
+    content: Union[bytes, str], schema_mapper: SchemaMapper, sheet_names: List[str]
+) -> List[pd.DataFrame]:
+    """
+    Reads the selected worksheets by streaming their rows with openpyxl in
+    read-only mode, keeping only the values of the columns used by the output.
+
+    The kept values go through the same parser as pandas.read_excel, so the frames
+    are identical to the ones the pandas readers produce, without materializing
+    the unused columns.
+
+    Args:
+        content (Union[bytes, str]): The raw content of the file, or its path.
+        schema_mapper (SchemaMapper): Selects the columns to read.
+        sheet_names (List[str]): The configured worksheet selection.
+
+    Returns:
+        List[pd.DataFrame]: The columns used by the output, one frame per sheet.
+    """
+    wb = load_workbook(_open(content), read_only=True, data_only=True)
+    try:
+        return [
+            _read_worksheet(wb[name], schema_mapper)
+            for name in select_sheets(wb.sheetnames, sheet_names)
+        ]
+    finally:
+        wb.close()
+
+
+def _read_worksheet(ws: Any, schema_mapper: SchemaMapper) -> pd.DataFrame:
+    """
+    Streams the rows of a read-only worksheet into a frame.
+
+    Args:
+        ws (ReadOnlyWorksheet): The worksheet.
+        schema_mapper (SchemaMapper): Selects the columns to read.
+
+    Returns:
+        pd.DataFrame: The columns of the worksheet used by the output.
+    """
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    names = _header_names(header)
+    if schema_mapper.mode == "position":
+        indexes = list(range(min(len(names), len(schema_mapper.columns))))
+    else:
+        indexes = [
+            index for index, name in enumerate(names) if schema_mapper.use_column(name)
+        ]
+    if not indexes:
+        return pd.DataFrame()
+    data: List[List[Any]] = [[names[index] for index in indexes]]
+    last_row_with_data = 1
+    for row in rows:
+        data.append(
+            [
+                _convert_value(row[index]) if index < len(row) else ""
+                for index in indexes
+            ]
+        )
+        if any(value is not None for value in row):
+            last_row_with_data = len(data)
+    del data[last_row_with_data:]
+    return TextParser(
+        data,
+        header=0,
+        dtype=schema_mapper.read_options().get("dtype"),
+        skip_blank_lines=False,
+    ).read()
+
+
+def _convert_value(value: Any) -> Any:
+    """
+    Converts a cell value the way the pandas openpyxl reader does: empty cells
+    become empty strings, error values become NaN and integral numbers become
+    integers.
+
+    Args:
+        value (Any): The cell value.
+
+    Returns:
+        Any: The converted value.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and value in EXCEL_ERRORS:
+        return np.nan
+    return value
+
+
+def _header_names(header: tuple) -> List[str]:
+    """
+    Labels header cells the way pandas does: empty cells become 'Unnamed: n' and
+    repeated names get a '.n' suffix.
+
+    Args:
+        header (tuple): The values of the header row.
+
+    Returns:
+        List[str]: One unique column label per header cell.
+    """
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for index, value in enumerate(header):
+        name = f"Unnamed: {index}" if value is None else str(value)
+        if name in seen:
+            base = name
+            while name in seen:
+                seen[base] += 1
+                name = f"{base}.{seen[base]}"
+        seen[name] = 0
+        names.append(name)
+    return names
+
+
+ENGINES: Dict[str, ExcelReader] = {
+    "calamine": partial(read_with_pandas, engine="calamine"),
+    "openpyxl_read_only": read_with_openpyxl_read_only,
+    "openpyxl": partial(read_with_pandas, engine="openpyxl"),
+    "xlrd": partial(read_with_pandas, engine="xlrd"),
+    "odf": partial(read_with_pandas, engine="odf"),
+}
+
+ENGINE_MODULES: Dict[str, str] = {
+    "calamine": "python_calamine",
+    "openpyxl_read_only": "openpyxl",
+    "openpyxl": "openpyxl",
+    "xlrd": "xlrd",
+    "odf": "odf",
+}
+
+FORMAT_ENGINES: Dict[str, Tuple[str, ...]] = {
+    ".xlsx": ("calamine", "openpyxl_read_only", "openpyxl"),
+    ".xlsm": ("calamine", "openpyxl_read_only", "openpyxl"),
+    ".xls": ("calamine", "xlrd"),
+    ".ods": ("calamine", "odf"),
+}
+
+
+def is_available(engine: str) -> bool:
+    """
+    Checks whether the package an engine depends on is installed.
+
+    Args:
+        engine (str): The engine name.
+
+    Returns:
+        bool: True if the engine can be used.
+    """
+    return importlib.util.find_spec(ENGINE_MODULES[engine]) is not None
+
+
+def resolve_engine(name: str, file_extension: str = ".xlsx") -> str:
+    """
+    Resolves the configured Excel reader engine for a file format.
+
+    'auto', or an engine that cannot read the format, selects the first installed
+    engine for the format: calamine, then the streaming openpyxl reader for
+    .xlsx/.xlsm, xlrd for .xls and odfpy for .ods.
+
+    Args:
+        name (str): The configured engine name.
+        file_extension (str): The file extension of the format.
+
+    Returns:
+        str: The name of an engine in ENGINES.
+
+    Raises:
+        ValueError: If the engine or the format is unknown.
+        ImportError: If the engine, or every engine for the format, is not installed.
+    """
+    name = name.lower()
+    if name != "auto" and name not in ENGINES:
+        raise ValueError(
+            f"Unknown Excel engine '{name}', expected one of: "
+            f"auto, {', '.join(ENGINES)}"
+        )
+    if file_extension not in FORMAT_ENGINES:
+        raise ValueError(f"Unsupported Excel format '{file_extension}'")
+    candidates = FORMAT_ENGINES[file_extension]
+    if name in candidates:
+        if not is_available(name):
+            raise ImportError(
+                f"The {name} Excel engine requires {ENGINE_MODULES[name]}"
+            )
+        return name
+    for engine in candidates:
+        if is_available(engine):
+            return engine
+    raise ImportError(
+        f"Reading {file_extension} files requires one of: "
+        f"{', '.join(ENGINE_MODULES[engine] for engine in candidates)}"
+    )
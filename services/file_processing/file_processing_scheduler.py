@@ -0,0 +1,253 @@
+import asyncio
+import time
+from contextlib import nullcontext
+from typing import (
+    Any,
+    AsyncIterable,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.file_processing.file_processor import FileProcessor
+from services.metrics.run_metrics import RunMetrics
+
+CompletionCallback = Callable[[Dict[str, Any], bool], None]
+
+
+class FileProcessingScheduler:
+    """
+    Schedules file downloads and parses with bounded concurrency.
+
+    Files are fed through a bounded work queue, so a slow pipeline applies
+    backpressure to the producer instead of buffering the whole listing. Downloads
+    and parses are capped independently, and the number of workers bounds how many
+    file bodies are held at any time. Each body is released as soon as the file
+    finishes.
+
+    Attributes:
+        file_processor (FileProcessor): The processor that downloads and parses files.
+        max_concurrent_downloads (int): Maximum number of in-flight downloads.
+        max_concurrent_parses (int): Maximum number of in-flight parses.
+        queue_size (int): Maximum number of files waiting in the work queue.
+        completion_callbacks (List[CompletionCallback]): Callbacks invoked with the
+            file metadata and a success flag whenever a file finishes.
+        queued (int): Number of files queued in the current run.
+        succeeded (int): Number of files processed successfully in the current run.
+        failed (int): Number of files that failed in the current run.
+        skipped (int): Number of files no strategy could process in the current run.
+        run_metrics (Optional[RunMetrics]): Metrics timing the queue wait, download
+            and parse of each file.
+        logger (Logger): Logger instance.
+    """
+
+    def __init__(
+        self,
+        file_processor: FileProcessor,
+        settings: Settings,
+        logger: LoggerConfig,
+        completion_callbacks: Optional[List[CompletionCallback]] = None,
+        run_metrics: Optional[RunMetrics] = None,
+    ) -> None:
+        """
+        Initializes the FileProcessingScheduler with a file processor and limits.
+
+        Args:
+            file_processor (FileProcessor): The processor that downloads and parses files.
+            settings (Settings): Application settings.
+            logger (LoggerConfig): Logger configuration.
+            completion_callbacks (Optional[List[CompletionCallback]]): Callbacks invoked
+                whenever a file finishes.
+            run_metrics (Optional[RunMetrics]): Metrics timing the queue wait,
+                download and parse of each file.
+        """
+        self.file_processor: FileProcessor = file_processor
+        self.max_concurrent_downloads: int = max(1, settings.max_concurrent_downloads)
+        self.max_concurrent_parses: int = max(1, settings.max_concurrent_parses)
+        self.queue_size: int = max(1, settings.work_queue_size)
+        self.completion_callbacks: List[CompletionCallback] = list(
+            completion_callbacks or []
+        )
+        self.queued: int = 0
+        self.succeeded: int = 0
+        self.failed: int = 0
+        self.skipped: int = 0
+        self.run_metrics = run_metrics
+        self.logger = logger.get_logger(__name__)
+
+    def add_completion_callback(self, callback: CompletionCallback) -> None:
+        """
+        Registers a callback invoked whenever a file finishes.
+
+        Args:
+            callback (CompletionCallback): Callback receiving the file metadata and
+                a success flag.
+        """
+        self.completion_callbacks.append(callback)
+
+    async def run(
+        self, files: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+    ) -> None:
+        """
+        Processes the files with bounded download and parse concurrency.
+
+        Args:
+            files (Union[Iterable[dict], AsyncIterable[dict]]): File metadata items,
+                either as a list or as an asynchronous stream.
+        """
+        self.queued = self.succeeded = self.failed = self.skipped = 0
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        download_semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
+        parse_semaphore = asyncio.Semaphore(self.max_concurrent_parses)
+        workers = [
+            asyncio.create_task(
+                self._worker(queue, download_semaphore, parse_semaphore)
+            )
+            for _ in range(self.max_concurrent_downloads + self.max_concurrent_parses)
+        ]
+        try:
+            await self._produce(files, queue)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        self.logger.info(
+            f"Processed {self.succeeded + self.failed} files: "
+            f"{self.succeeded} succeeded, {self.failed} failed, "
+            f"{self.skipped} skipped"
+        )
+
+    async def _produce(
+        self,
+        files: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        queue: asyncio.Queue,
+    ) -> None:
+        """
+        Feeds the supported files into the work queue, waiting while it is full.
+
+        Args:
+            files (Union[Iterable[dict], AsyncIterable[dict]]): File metadata items.
+            queue (asyncio.Queue): The bounded work queue.
+        """
+        if isinstance(files, AsyncIterable):
+            async for file in files:
+                await self._enqueue(file, queue)
+        else:
+            for file in files:
+                await self._enqueue(file, queue)
+
+    async def _enqueue(self, file: Dict[str, Any], queue: asyncio.Queue) -> None:
+        """
+        Puts a file into the work queue if a strategy can process it.
+
+        Args:
+            file (dict): The file metadata.
+            queue (asyncio.Queue): The bounded work queue.
+        """
+        if not self.file_processor.can_process(file):
+            self.skipped += 1
+            self.logger.debug(f"Skipping unsupported file: {file['name']}")
+            return
+        self.queued += 1
+        await queue.put((file, time.perf_counter()))
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue,
+        download_semaphore: asyncio.Semaphore,
+        parse_semaphore: asyncio.Semaphore,
+    ) -> None:
+        """
+        Downloads and parses files from the work queue until a sentinel is received.
+        Files with cached parsed rows skip both stages.
+
+        Args:
+            queue (asyncio.Queue): The bounded work queue.
+            download_semaphore (asyncio.Semaphore): Limits in-flight downloads.
+            parse_semaphore (asyncio.Semaphore): Limits in-flight parses.
+        """
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            file, queued_at = entry
+            if self.run_metrics:
+                self.run_metrics.record(
+                    "queue_wait", time.perf_counter() - queued_at, file
+                )
+            success = False
+            cached = False
+            file_content = None
+            try:
+                with self._measure("cached", file):
+                    cached = await self.file_processor.process_cached(file)
+                if cached:
+                    success = True
+                else:
+                    async with download_semaphore:
+                        with self._measure("download", file):
+                            file_content = await self.file_processor.download_file(file)
+                    if file_content is not None:
+                        if self.run_metrics:
+                            self.run_metrics.increment(
+                                "bytes_downloaded", file_content.size, file
+                            )
+                        async with parse_semaphore:
+                            with self._measure("parse", file):
+                                await self.file_processor.process_content(
+                                    file_content, file
+                                )
+                        success = True
+            except Exception as e:
+                self.logger.error(f"Error processing file {file['name']}: {e}")
+            finally:
+                if file_content is not None:
+                    file_content.close()
+            if self.run_metrics:
+                self.run_metrics.set_file_status(
+                    file,
+                    "failed" if not success else "cached" if cached else "completed",
+                )
+            self._report(file, success)
+
+    def _measure(self, stage: str, file: Dict[str, Any]) -> ContextManager[None]:
+        """
+        Returns a context measuring a stage of a file, when metrics are collected.
+
+        Args:
+            stage (str): Name of the stage.
+            file (dict): The file metadata.
+
+        Returns:
+            ContextManager[None]: The measuring context.
+        """
+        if self.run_metrics:
+            return self.run_metrics.measure(stage, file)
+        return nullcontext()
+
+    def _report(self, file: Dict[str, Any], success: bool) -> None:
+        """
+        Records the completion of a file and notifies the completion callbacks.
+
+        Args:
+            file (dict): The file metadata.
+            success (bool): Whether the file was processed successfully.
+        """
+        if success:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self.logger.info(
+            f"[{self.succeeded + self.failed}/{self.queued}] "
+            f"File {file['name']} {'completed' if success else 'failed'}"
+        )
+        for callback in self.completion_callbacks:
+            callback(file, success)
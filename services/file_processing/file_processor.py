@@ -1,56 +1,283 @@
-from typing import Any, Dict
+import asyncio
+from typing import Any, Dict, Optional
 
 from aiohttp import ClientSession
-from openpyxl.worksheet.worksheet import Worksheet
 
+from auth.authentication import AuthenticationService
+from config.logger_config import LoggerConfig
+from services.checkpoint.checkpoint_journal import CheckpointJournal
+from services.file_processing.spool_file import SpoolFile
 from services.file_processing.strategies.file_processing_strategy import (
     FileProcessingStrategy,
 )
+from services.file_processing.strategies.strategy_registry import StrategyRegistry
+from services.metrics.run_metrics import RunMetrics
+from services.query.query_index import QueryIndex
+from services.spreadsheet.spreadsheet_service import SpreadsheetService
+
+logger = LoggerConfig.get_logger(__name__)
 
 
 class FileProcessor:
     """
-    Class responsible for processing files using a specified strategy.
+    Class responsible for processing files using the strategy registered for
+    their type.
 
     Attributes:
         session (ClientSession): The HTTP client session.
-        ws (Worksheet): The worksheet to append data to.
-        access_token (str): The access token for authentication.
+        spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+        auth_service (AuthenticationService): Provides the current access token.
         drive_id (str): The ID of the drive containing the file.
-        strategy (FileProcessingStrategy): The strategy to process the file.
+        strategy_registry (StrategyRegistry): The strategies to process files with.
+        checkpoint_journal (Optional[CheckpointJournal]): Journal recording the
+            rows of each completed file, so a restarted run replays them.
+        run_metrics (Optional[RunMetrics]): Metrics counting the rows of each file
+            and timing their append to the output.
+        query_index (Optional[QueryIndex]): Index staging the rows of each file.
     """
 
     def __init__(
         self,
         session: ClientSession,
-        ws: Worksheet,
-        access_token: str,
+        spreadsheet_service: SpreadsheetService,
+        auth_service: AuthenticationService,
         drive_id: str,
-        strategy: FileProcessingStrategy,
+        strategy_registry: StrategyRegistry,
+        checkpoint_journal: Optional[CheckpointJournal] = None,
+        run_metrics: Optional[RunMetrics] = None,
+        query_index: Optional[QueryIndex] = None,
     ) -> None:
         """
         Initializes the FileProcessor with the specified parameters.
 
         Args:
             session (ClientSession): The HTTP client session.
-            ws (Worksheet): The worksheet to append data to.
-            access_token (str): The access token for authentication.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+            auth_service (AuthenticationService): Provides the current access
+                token.
             drive_id (str): The ID of the drive containing the file.
-            strategy (FileProcessingStrategy): The strategy to process the file.
+            strategy_registry (StrategyRegistry): The strategies to process files
+                with.
+            checkpoint_journal (Optional[CheckpointJournal]): Journal recording the
+                rows of each completed file, so a restarted run replays them.
+            run_metrics (Optional[RunMetrics]): Metrics counting the rows of each
+                file and timing their append to the output.
+            query_index (Optional[QueryIndex]): Index staging the rows of each
+                file.
         """
         self.session = session
-        self.ws = ws
-        self.access_token = access_token
+        self.spreadsheet_service = spreadsheet_service
+        self.auth_service = auth_service
         self.drive_id = drive_id
-        self.strategy = strategy
+        self.strategy_registry = strategy_registry
+        self.checkpoint_journal = checkpoint_journal
+        self.run_metrics = run_metrics
+        self.query_index = query_index
+
+    def get_strategy(self, file: Dict[str, Any]) -> FileProcessingStrategy:
+        """
+        Returns the strategy that processes the file.
+
+        Args:
+            file (dict): The file metadata.
+
+        Returns:
+            FileProcessingStrategy: The strategy registered for the file type.
+
+        Raises:
+            ValueError: If no strategy handles the file.
+        """
+        strategy = self.strategy_registry.get_strategy(file)
+        if strategy is None:
+            raise ValueError(f"No strategy can process file {file['name']}")
+        return strategy
 
     async def process_file(self, file: Dict[str, Any]) -> None:
         """
-        Processes the file using the specified strategy.
+        Processes the file using the strategy registered for its type. Files no
+        strategy handles are ignored.
+
+        Args:
+            file (dict): The file metadata.
+        """
+        strategy = self.strategy_registry.get_strategy(file)
+        if strategy is None:
+            return
+        await strategy.process(
+            file,
+            self.session,
+            self.spreadsheet_service,
+            await self.auth_service.get_access_token(),
+            self.drive_id,
+        )
+
+    def can_process(self, file: Dict[str, Any]) -> bool:
+        """
+        Checks whether a registered strategy handles the file.
+
+        Args:
+            file (dict): The file metadata.
+
+        Returns:
+            bool: True if the file can be processed.
+        """
+        return self.strategy_registry.get_strategy(file) is not None
+
+    async def process_cached(self, file: Dict[str, Any]) -> bool:
+        """
+        Processes the file from rows recorded in the checkpoint journal by an
+        earlier attempt of the run, or else from previously parsed rows using its
+        strategy.
+
+        Args:
+            file (dict): The file metadata.
+
+        Returns:
+            bool: True if the file was processed from checkpointed or cached rows.
+        """
+        processed = await self._process_cached(self.get_strategy(file), file)
+        await self._drain_query_index()
+        return processed
+
+    async def _process_cached(
+        self, strategy: FileProcessingStrategy, file: Dict[str, Any]
+    ) -> bool:
+        """
+        Processes the file from checkpointed or previously parsed rows.
+
+        Args:
+            strategy (FileProcessingStrategy): The strategy processing the file.
+            file (dict): The file metadata.
+
+        Returns:
+            bool: True if the file was processed from checkpointed or cached rows.
+        """
+        if not self.checkpoint_journal:
+            return await strategy.process_cached(
+                file, self._get_target(file, self.spreadsheet_service)
+            )
+        rows_path = await self.checkpoint_journal.run(
+            self.checkpoint_journal.get_completed, file
+        )
+        if rows_path:
+            batches = await asyncio.to_thread(
+                self.checkpoint_journal.load_rows, rows_path
+            )
+            target = self._get_target(file, self.spreadsheet_service)
+            for batch in batches:
+                target.add_batch(batch)
+            logger.info(f"Using checkpointed rows for file {file['name']}")
+            return True
+        recorder = self.checkpoint_journal.record(file, self.spreadsheet_service)
+        try:
+            processed = await strategy.process_cached(
+                file, self._get_target(file, recorder)
+            )
+        except BaseException:
+            recorder.abort()
+            raise
+        if processed:
+            await recorder.commit()
+        else:
+            recorder.discard()
+        return processed
+
+    async def download_file(self, file: Dict[str, Any]) -> Optional[SpoolFile]:
+        """
+        Downloads the file content using its strategy.
 
         Args:
             file (dict): The file metadata.
+
+        Returns:
+            Optional[SpoolFile]: The content of the file, or None if the download
+                failed.
         """
-        await self.strategy.process(
-            file, self.session, self.ws, self.access_token, self.drive_id
+        return await self.get_strategy(file).download(
+            file,
+            self.session,
+            await self.auth_service.get_access_token(),
+            self.drive_id,
         )
+
+    async def process_content(
+        self, file_content: SpoolFile, file: Dict[str, Any]
+    ) -> None:
+        """
+        Processes downloaded file content using its strategy, recording the rows in
+        the checkpoint journal. Strategies streaming the rows of a file run in a
+        spreadsheet transaction, so a file failing partway leaves no rows behind.
+
+        Args:
+            file_content (SpoolFile): The content of the file.
+            file (dict): The file metadata.
+        """
+        strategy = self.get_strategy(file)
+        if strategy.STREAMS_ROWS:
+            async with self.spreadsheet_service.transaction() as transaction:
+                await self._process_content(strategy, file_content, file, transaction)
+        else:
+            await self._process_content(
+                strategy, file_content, file, self.spreadsheet_service
+            )
+        await self._drain_query_index()
+
+    async def _process_content(
+        self,
+        strategy: FileProcessingStrategy,
+        file_content: SpoolFile,
+        file: Dict[str, Any],
+        spreadsheet: Any,
+    ) -> None:
+        """
+        Processes downloaded file content with a strategy, recording the rows in
+        the checkpoint journal.
+
+        Args:
+            strategy (FileProcessingStrategy): The strategy processing the file.
+            file_content (SpoolFile): The content of the file.
+            file (dict): The file metadata.
+            spreadsheet (Any): The spreadsheet, or the transaction, rows go to.
+        """
+        if not self.checkpoint_journal:
+            await strategy.process_content(
+                file_content, file, self._get_target(file, spreadsheet)
+            )
+            return
+        recorder = self.checkpoint_journal.record(file, spreadsheet)
+        try:
+            await strategy.process_content(
+                file_content, file, self._get_target(file, recorder)
+            )
+        except BaseException:
+            recorder.abort()
+            raise
+        await recorder.commit()
+
+    async def _drain_query_index(self) -> None:
+        """
+        Waits for the query index to catch up with the staged rows, so parsing
+        does not outrun it.
+        """
+        if self.query_index:
+            await self.query_index.drain()
+
+    def _get_target(self, file: Dict[str, Any], target: Any) -> Any:
+        """
+        Returns what the rows of a file are added to: the target itself, behind a
+        recorder staging them when the query index is enabled and a recorder
+        counting them when run metrics are collected.
+
+        Args:
+            file (dict): The file metadata.
+            target (Any): The spreadsheet, the transaction or the checkpoint
+                recorder rows go to.
+
+        Returns:
+            Any: An object with the spreadsheet's add_batch method.
+        """
+        if self.query_index:
+            target = self.query_index.record(file, target)
+        if self.run_metrics:
+            return self.run_metrics.record_rows(file, target)
+        return target
@@ -0,0 +1,105 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.metrics.stage_profiler import StageProfiler
+
+
+class ParseExecutor:
+    """
+    Runs CPU-bound parsing work off the event loop in a process or thread pool.
+
+    Attributes:
+        executor_type (str): Type of pool to use ('process' or 'thread').
+        max_workers (int): Number of pool workers.
+        executor (Optional[Executor]): The underlying pool, created on first use.
+        profiler (Optional[StageProfiler]): Profiler of the work run in the pool,
+            when profiling is enabled.
+        logger (Logger): Logger instance.
+    """
+
+    EXECUTOR_TYPES = ("process", "thread")
+
+    def __init__(
+        self,
+        settings: Settings,
+        logger: LoggerConfig,
+        profiler: Optional[StageProfiler] = None,
+    ) -> None:
+        """
+        Initializes the ParseExecutor with the pool type and size from the settings.
+
+        Args:
+            settings (Settings): Application settings.
+            logger (LoggerConfig): Logger configuration.
+            profiler (Optional[StageProfiler]): Profiler of the work run in the pool.
+        """
+        self.logger = logger.get_logger(__name__)
+        self.executor_type: str = settings.parse_executor.lower()
+        if self.executor_type not in self.EXECUTOR_TYPES:
+            self.logger.warning(
+                f"Unknown parse executor '{settings.parse_executor}', using 'process'"
+            )
+            self.executor_type = "process"
+        self.max_workers: int = max(1, settings.parse_workers)
+        self.executor: Optional[Executor] = None
+        self.profiler: Optional[StageProfiler] = profiler
+
+    def get_executor(self) -> Executor:
+        """
+        Returns the pool instance. Creates it if it doesn't exist.
+
+        Returns:
+            Executor: The process or thread pool.
+        """
+        if not self.executor:
+            if self.executor_type == "process":
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="parse"
+                )
+            self.logger.info(
+                f"Parse executor started ({self.executor_type}, "
+                f"{self.max_workers} workers)"
+            )
+        return self.executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs a function in the pool without blocking the event loop.
+
+        In process mode the function and its arguments must be picklable. When a
+        worker dies, for example killed for running out of memory, the broken
+        pool is replaced and the function is retried once in the new pool.
+
+        Args:
+            func (Callable): The function to run.
+            *args: Positional arguments for the function.
+
+        Returns:
+            Any: The value returned by the function.
+        """
+        loop = asyncio.get_running_loop()
+        if self.profiler is not None:
+            func = self.profiler.wrap_worker_call(func)
+        executor = self.get_executor()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            if self.executor is executor:
+                self.logger.warning("Parse pool broken, restarting it")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+            return await loop.run_in_executor(self.get_executor(), func, *args)
+
+    def shutdown(self) -> None:
+        """
+        Shuts down the pool, waiting for running work to finish.
+        """
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
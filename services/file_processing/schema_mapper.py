@@ -0,0 +1,152 @@
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+
+class SchemaMapper:
+    """
+    Maps the columns of a source sheet to the output columns at parse time.
+
+    In 'header' mode, source headers are matched to the output columns by name or by
+    a configured alias, ignoring case and surrounding whitespace; in 'position' mode
+    they are matched by position. Only the matched columns are read, then they are
+    renamed, reordered and completed with empty values for the missing ones.
+
+    The mapper is sent to parse executor workers, so it only holds picklable data.
+
+    Attributes:
+        columns (List[str]): The output column names.
+        mode (str): How source columns are matched ('header' or 'position').
+        aliases (Dict[str, List[str]]): Alternative source headers per output column.
+        dtypes (Dict[str, str]): Data type per output column.
+        lookup (Dict[str, str]): Output column per normalized source header.
+    """
+
+    MODES = ("header", "position")
+
+    def __init__(
+        self,
+        columns: List[str],
+        mode: str = "header",
+        aliases: Optional[Dict[str, List[str]]] = None,
+        dtypes: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Initializes the SchemaMapper with the output columns and mapping rules.
+
+        Args:
+            columns (List[str]): The output column names.
+            mode (str): How source columns are matched ('header' or 'position').
+            aliases (Optional[Dict[str, List[str]]]): Alternative source headers per
+                output column.
+            dtypes (Optional[Dict[str, str]]): Data type per output column, such as
+                'string', 'float64' or 'Int64'.
+
+        Raises:
+            ValueError: If the mode is unknown or an alias or data type refers to a
+                column that is not an output column.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown column mapping mode '{mode}'")
+        unknown = (set(aliases or {}) | set(dtypes or {})) - set(columns)
+        if unknown:
+            raise ValueError(f"Unknown output columns in schema mapping: {unknown}")
+        self.columns: List[str] = list(columns)
+        self.mode: str = mode
+        self.aliases: Dict[str, List[str]] = {
+            column: list(names) for column, names in (aliases or {}).items()
+        }
+        self.dtypes: Dict[str, str] = dict(dtypes or {})
+        self.lookup: Dict[str, str] = {}
+        for column in self.columns:
+            for name in [column] + self.aliases.get(column, []):
+                self.lookup.setdefault(self.normalize(name), column)
+
+    @staticmethod
+    def normalize(name: Any) -> str:
+        """
+        Normalizes a header for matching.
+
+        Args:
+            name (Any): The header as read from the sheet.
+
+        Returns:
+            str: The header without surrounding whitespace, in lower case.
+        """
+        return str(name).strip().casefold()
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-serializable description of the mapping, used to invalidate
+        caches built with a different mapping.
+
+        Returns:
+            dict: The columns, mode, aliases and data types.
+        """
+        return {
+            "columns": self.columns,
+            "mode": self.mode,
+            "aliases": self.aliases,
+            "dtypes": self.dtypes,
+        }
+
+    def read_options(self) -> Dict[str, Any]:
+        """
+        Returns the reader options that skip unused columns and apply the data types
+        while reading. In 'position' mode no options are returned, because pandas
+        rejects positional usecols beyond the width of the sheet.
+
+        Returns:
+            dict: The usecols and dtype options for pandas readers.
+        """
+        if self.mode == "position":
+            return {}
+        dtype = {
+            name: self.dtypes[column]
+            for column in self.dtypes
+            for name in [column] + self.aliases.get(column, [])
+        }
+        return {"usecols": self.use_column, "dtype": dtype or None}
+
+    def use_column(self, name: Any) -> bool:
+        """
+        Checks whether a source column is mapped to an output column.
+
+        Args:
+            name (Any): The source header.
+
+        Returns:
+            bool: True if the column must be read.
+        """
+        return self.normalize(name) in self.lookup
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Renames, reorders and completes the columns of a parsed sheet so they match
+        the output columns.
+
+        When several source columns map to the same output column, the first one
+        is kept.
+
+        Args:
+            df (pd.DataFrame): The parsed sheet.
+
+        Returns:
+            pd.DataFrame: The rows with exactly the output columns, in order.
+        """
+        if self.mode == "position":
+            df = df.iloc[:, : len(self.columns)]
+            df.columns = self.columns[: df.shape[1]]
+        else:
+            positions: Dict[str, int] = {}
+            for position, name in enumerate(df.columns):
+                column = self.lookup.get(self.normalize(name))
+                if column is not None:
+                    positions.setdefault(column, position)
+            df = df.iloc[:, list(positions.values())]
+            df.columns = list(positions)
+        df = df.reindex(columns=self.columns)
+        for column, dtype in self.dtypes.items():
+            if df[column].dtype != dtype:
+                df[column] = df[column].astype(dtype)
+        return df
@@ -0,0 +1,162 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from typing import BinaryIO, Optional, Union
+
+
+class SpoolFile:
+    """
+    Download buffer that keeps small files in memory and spills larger ones to a
+    temporary file on disk, so the memory held per file is capped at a threshold.
+
+    Attributes:
+        max_memory_bytes (int): Size above which the content is moved to disk.
+        directory (Optional[str]): Directory for the temporary file.
+        buffer (Optional[BytesIO]): In-memory content, until it is moved to disk.
+        file (Optional[BinaryIO]): Open temporary file, once the content is on disk.
+        path (Optional[str]): Path of the temporary file, once the content is on disk.
+        size (int): Size of the content, up to the end of the furthest write.
+    """
+
+    COPY_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, max_memory_bytes: int, directory: Optional[str] = None) -> None:
+        """
+        Initializes an empty SpoolFile.
+
+        Args:
+            max_memory_bytes (int): Size above which the content is moved to disk.
+            directory (Optional[str]): Directory for the temporary file. Defaults to
+                the system temporary directory.
+        """
+        self.max_memory_bytes: int = max_memory_bytes
+        self.directory: Optional[str] = directory or None
+        self.buffer: Optional[BytesIO] = BytesIO()
+        self.file: Optional[BinaryIO] = None
+        self.path: Optional[str] = None
+        self.size: int = 0
+
+    def write(self, data: bytes) -> None:
+        """
+        Appends data, moving the content to disk once it exceeds the threshold.
+
+        Args:
+            data (bytes): The data to append.
+        """
+        self.write_at(self.size, data)
+
+    def write_at(self, offset: int, data: bytes) -> None:
+        """
+        Writes data at an offset, so ranges of the content can arrive in any order.
+        Gaps are filled with zeros until their data is written. The content is
+        moved to disk once it exceeds the threshold.
+
+        Args:
+            offset (int): Position of the data in the content.
+            data (bytes): The data to write.
+        """
+        end = offset + len(data)
+        if self.buffer is not None and end > self.max_memory_bytes:
+            self.roll_over()
+        target = self.buffer if self.buffer is not None else self.file
+        target.seek(offset)
+        target.write(data)
+        self.size = max(self.size, end)
+
+    def write_file(self, path: str) -> None:
+        """
+        Appends the content of a file in chunks.
+
+        Args:
+            path (str): Path of the file to copy.
+        """
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(self.COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.write(chunk)
+
+    def roll_over(self) -> None:
+        """
+        Moves the content to a temporary file on disk.
+        """
+        if self.buffer is None:
+            return
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(
+            dir=self.directory, suffix=".spool", delete=False
+        )
+        self.path = self.file.name
+        self.file.write(self.buffer.getbuffer())
+        self.buffer = None
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """
+        Returns the content for a parser: the bytes while in memory, or the path of
+        the temporary file once on disk. Both can be sent to a process pool worker.
+
+        Returns:
+            Union[bytes, str]: The content or the path to it.
+        """
+        if self.buffer is not None:
+            return self.buffer.getvalue()
+        self.file.flush()
+        return self.path
+
+    def getvalue(self) -> bytes:
+        """
+        Returns the whole content as bytes, reading it from disk if necessary.
+
+        Returns:
+            bytes: The content.
+        """
+        if self.buffer is not None:
+            return self.buffer.getvalue()
+        self.file.flush()
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def copy_to(self, path: str) -> None:
+        """
+        Writes the content to a file.
+
+        Args:
+            path (str): Destination path.
+        """
+        if self.buffer is not None:
+            with open(path, "wb") as f:
+                f.write(self.buffer.getbuffer())
+        else:
+            self.file.flush()
+            shutil.copyfile(self.path, path)
+
+    def close(self) -> None:
+        """
+        Releases the content and removes the temporary file.
+        """
+        self.buffer = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+    def __enter__(self) -> "SpoolFile":
+        """
+        Returns the SpoolFile for use in a with statement.
+
+        Returns:
+            SpoolFile: This instance.
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Closes the SpoolFile when the with statement exits.
+        """
+        self.close()
@@ -1,78 +1,450 @@
-from abc import ABC, abstractmethod
-from io import BytesIO
-from typing import Any, Dict
+import asyncio
+from abc import abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
 
 import aiohttp
-from openpyxl.worksheet.worksheet import Worksheet
+import pandas as pd
 
 from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.cache.disk_cache import DiskCache
+from services.file_processing.spool_file import SpoolFile
+from services.file_processing.strategies.file_processing_strategy import (
+    FileProcessingStrategy,
+)
+from services.http.retry_policy import RetryPolicy
+from services.spreadsheet.spreadsheet_service import SpreadsheetService
 
 logger = LoggerConfig.get_logger(__name__)
 
 
-class BaseFileProcessingStrategy(ABC):
+def get_mime_type(file: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns the MIME type of a driveItem, from its file facet.
+
+    Args:
+        file (dict): The file metadata.
+
+    Returns:
+        Optional[str]: The MIME type, or None if the listing does not include it.
+    """
+    return (file.get("file") or {}).get("mimeType")
+
+
+class BaseFileProcessingStrategy(FileProcessingStrategy):
     """
     Abstract base class for file processing strategies.
 
     Attributes:
         file_extension (str): The file extension that this strategy can process.
+        mime_type (Optional[str]): The MIME type that this strategy can process.
+        chunk_size (int): Size of the chunks read from a download response.
+        spool_threshold (int): Size above which a download is spooled to disk.
+        spool_dir (str): Directory for spooled downloads.
+        graph_url (str): Base URL of the Graph API version.
+        download_cache (Optional[DiskCache]): Cache of downloaded file contents.
+        retry_policy (Optional[RetryPolicy]): Policy retrying throttled and
+            transiently failing Graph requests, such as the content endpoint.
+        download_retry_policy (Optional[RetryPolicy]): Policy retrying the
+            pre-authenticated download URLs and byte ranges, which are served
+            outside Graph and so have their own rate limiter; the Graph policy is
+            used when unset.
+        use_download_url (bool): Whether files are downloaded from the
+            pre-authenticated download URL of the listing.
+        parallel_threshold (int): Size from which a file is downloaded as byte
+            ranges in parallel.
+        range_size (int): Size of each byte range.
+        range_concurrency (int): Maximum number of ranges of a file downloaded at
+            once.
     """
 
-    def __init__(self, file_extension: str) -> None:
+    DOWNLOAD_URL_KEY = "@microsoft.graph.downloadUrl"
+
+    def __init__(
+        self,
+        file_extension: str,
+        settings: Settings,
+        mime_type: Optional[str] = None,
+        download_cache: Optional[DiskCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        download_retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
         """
         Initializes the BaseFileProcessingStrategy with the specified file extension.
 
         Args:
             file_extension (str): The file extension that this strategy can process.
+            settings (Settings): Application settings.
+            mime_type (Optional[str]): The MIME type that this strategy can process.
+            download_cache (Optional[DiskCache]): Cache of downloaded file contents.
+            retry_policy (Optional[RetryPolicy]): Policy retrying throttled and
+                transiently failing Graph requests.
+            download_retry_policy (Optional[RetryPolicy]): Policy retrying the
+                download URLs and byte ranges; defaults to retry_policy.
         """
-        self.file_extension = file_extension
+        self.file_extension = file_extension.lower()
+        self.mime_type = mime_type
+        self.chunk_size: int = max(1, settings.download_chunk_size_kb) * 1024
+        self.spool_threshold: int = settings.download_spool_threshold_mb * 1024 * 1024
+        self.spool_dir: str = settings.spool_dir
+        self.graph_url: str = settings.graph_base_url
+        self.download_cache = download_cache
+        self.retry_policy = retry_policy
+        self.download_retry_policy = download_retry_policy or retry_policy
+        self.use_download_url: bool = settings.use_download_url
+        self.parallel_threshold: int = (
+            settings.download_parallel_threshold_mb * 1024 * 1024
+        )
+        self.range_size: int = max(1, settings.download_range_size_mb) * 1024 * 1024
+        self.range_concurrency: int = max(1, settings.download_range_concurrency)
 
-    async def process(
+    @staticmethod
+    def get_version_tag(file: Dict[str, Any]) -> Optional[str]:
+        """
+        Returns the tag identifying the version of the file content.
+
+        The cTag only changes when the content changes, so it is preferred over the
+        eTag, which also changes on metadata updates.
+
+        Args:
+            file (dict): The file metadata.
+
+        Returns:
+            Optional[str]: The cTag or eTag, or None if the listing has neither.
+        """
+        return file.get("cTag") or file.get("eTag")
+
+    def can_process(self, file: Dict[str, Any]) -> bool:
+        """
+        Checks whether the file matches the specified file extension or MIME type.
+
+        Args:
+            file (dict): The file metadata.
+
+        Returns:
+            bool: True if the file can be processed by this strategy.
+        """
+        if file["name"].lower().endswith(self.file_extension):
+            return True
+        return bool(self.mime_type) and get_mime_type(file) == self.mime_type
+
+    async def process_cached(
+        self, file: Dict[str, Any], spreadsheet_service: SpreadsheetService
+    ) -> bool:
+        """
+        Processes the file from previously parsed rows. Strategies without a parsed
+        row cache never have cached rows.
+
+        Args:
+            file (dict): The file metadata.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+
+        Returns:
+            bool: True if the file was processed from cached rows.
+        """
+        return False
+
+    async def download(
         self,
         file: Dict[str, Any],
         session: aiohttp.ClientSession,
-        ws: Worksheet,
         access_token: str,
         drive_id: str,
-    ) -> None:
+    ) -> Optional[SpoolFile]:
         """
-        Processes the file if it matches the specified file extension.
+        Downloads the content of the file in chunks, reusing the cached content
+        when the file version has not changed. Files above the spool threshold are
+        written to a temporary file, so memory use does not grow with file size.
+        Throttled and transiently failing requests are retried through the retry
+        policy before the content is streamed.
+
+        Files are fetched from the pre-authenticated download URL of the listing,
+        which skips the redirect of the content endpoint, as byte ranges in
+        parallel when they are large. The content endpoint is used when the listing
+        has no download URL or it has expired.
 
         Args:
             file (dict): The file metadata.
             session (aiohttp.ClientSession): The HTTP client session.
-            ws (Worksheet): The worksheet to append data to.
             access_token (str): The access token for authentication.
             drive_id (str): The ID of the drive containing the file.
+
+        Returns:
+            Optional[SpoolFile]: The content of the file, or None if the download
+                failed. The caller must close it.
         """
-        if file["name"].endswith(self.file_extension):
-            file_id = file["id"]
-            logger.info(f"Processing file: {file['name']}")
+        file_id = file["id"]
+        logger.info(f"Processing file: {file['name']}")
+        tag = self.get_version_tag(file)
+        cache_key = (
+            DiskCache.make_key(file_id, tag) if self.download_cache and tag else None
+        )
+        if cache_key:
+            spool = await asyncio.to_thread(self._read_cached, cache_key)
+            if spool is not None:
+                logger.info(f"Using cached content for file {file['name']}")
+                return spool
+        spool = None
+        download_url = file.get(self.DOWNLOAD_URL_KEY)
+        if self.use_download_url and download_url:
+            size = file.get("size") or 0
+            if size >= self.parallel_threshold and size > self.range_size:
+                spool = await self._download_ranges(file, session, download_url, size)
+            if spool is None:
+                spool = await self._download_stream(file, session, download_url, {})
+        if spool is None:
             headers = {
                 "Authorization": f"Bearer {access_token}",
                 "Accept": "application/json",
             }
-            url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/items/{file_id}/content"
-            async with session.get(url, headers=headers) as file_response:
-                if file_response.status == 200:
-                    file_content = BytesIO(await file_response.read())
-                    await self.process_content(file_content, file, ws)
-                else:
+            url = f"{self.graph_url}/drives/{drive_id}/items/{file_id}/content"
+            spool = await self._download_stream(
+                file, session, url, headers, log_errors=True
+            )
+        if spool is not None and cache_key:
+            await asyncio.to_thread(self._write_cached, cache_key, spool)
+        return spool
+
+    def _get(
+        self, session: aiohttp.ClientSession, url: str, headers: Dict[str, str]
+    ) -> Any:
+        """
+        Starts a GET request, through the retry policy when one is set: the Graph
+        policy for Graph URLs and the download policy for the others.
+
+        Args:
+            session (aiohttp.ClientSession): The HTTP client session.
+            url (str): URL for the request.
+            headers (dict): Headers for the request.
+
+        Returns:
+            AsyncContextManager[aiohttp.ClientResponse]: The request, to be used in
+                an async with statement.
+        """
+        retry_policy = (
+            self.retry_policy
+            if url.startswith(self.graph_url)
+            else self.download_retry_policy
+        )
+        if retry_policy:
+            return retry_policy.request(session, "GET", url, headers=headers)
+        return session.get(url, headers=headers)
+
+    async def _download_stream(
+        self,
+        file: Dict[str, Any],
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, str],
+        log_errors: bool = False,
+    ) -> Optional[SpoolFile]:
+        """
+        Downloads the content of the file as one stream.
+
+        Args:
+            file (dict): The file metadata.
+            session (aiohttp.ClientSession): The HTTP client session.
+            url (str): URL of the content.
+            headers (dict): Headers for the request.
+            log_errors (bool): Whether a failed download is logged as an error,
+                rather than as a warning before another attempt.
+
+        Returns:
+            Optional[SpoolFile]: The content of the file, or None if the download
+                failed.
+        """
+        async with self._get(session, url, headers) as file_response:
+            if file_response.status != 200:
+                if log_errors:
                     logger.error(
                         f"Error downloading file {file['name']}: {file_response.status}"
                     )
                     logger.error(f"Response: {await file_response.text()}")
+                else:
+                    logger.warning(
+                        f"Download URL of file {file['name']} failed with "
+                        f"{file_response.status}, using the content endpoint"
+                    )
+                return None
+            spool = SpoolFile(self.spool_threshold, self.spool_dir)
+            try:
+                async for chunk in file_response.content.iter_chunked(self.chunk_size):
+                    spool.write(chunk)
+            except BaseException:
+                spool.close()
+                raise
+        return spool
+
+    async def _download_ranges(
+        self,
+        file: Dict[str, Any],
+        session: aiohttp.ClientSession,
+        url: str,
+        size: int,
+    ) -> Optional[SpoolFile]:
+        """
+        Downloads the content of a large file as byte ranges fetched in parallel
+        and written at their offsets in the spool file. The first range is fetched
+        alone, so a server ignoring range requests costs a single request.
+
+        Args:
+            file (dict): The file metadata.
+            session (aiohttp.ClientSession): The HTTP client session.
+            url (str): Pre-authenticated download URL of the content.
+            size (int): Size of the file in bytes.
+
+        Returns:
+            Optional[SpoolFile]: The content of the file, or None if a range was
+                refused or incomplete, so the file is downloaded as one stream.
+        """
+        spool = SpoolFile(self.spool_threshold, self.spool_dir)
+        if size > self.spool_threshold:
+            spool.roll_over()
+        semaphore = asyncio.Semaphore(self.range_concurrency)
+        ranges: List[Tuple[int, int]] = [
+            (start, min(start + self.range_size, size) - 1)
+            for start in range(0, size, self.range_size)
+        ]
+
+        async def download_range(start: int, end: int) -> bool:
+            async with semaphore:
+                headers = {"Range": f"bytes={start}-{end}"}
+                async with self._get(session, url, headers) as response:
+                    if response.status != 206:
+                        return False
+                    offset = start
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        spool.write_at(offset, chunk)
+                        offset += len(chunk)
+                    return offset == end + 1
+
+        tasks: List[asyncio.Task] = []
+        try:
+            completed = [await download_range(*ranges[0])]
+            if completed[0]:
+                tasks = [
+                    asyncio.create_task(download_range(*byte_range))
+                    for byte_range in ranges[1:]
+                ]
+                completed += await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            spool.close()
+            raise
+        if all(completed) and spool.size == size:
+            logger.info(
+                f"Downloaded file {file['name']} in {len(ranges)} parallel ranges"
+            )
+            return spool
+        spool.close()
+        logger.warning(
+            f"Ranged download of file {file['name']} failed, downloading it as one "
+            "stream"
+        )
+        return None
+
+    def _read_cached(self, cache_key: str) -> Optional[SpoolFile]:
+        """
+        Copies a cached file content into a new SpoolFile.
+
+        Args:
+            cache_key (str): The download cache key.
+
+        Returns:
+            Optional[SpoolFile]: The cached content, or None on a cache miss.
+        """
+        path = self.download_cache.get_path(cache_key)
+        if path is None:
+            return None
+        spool = SpoolFile(self.spool_threshold, self.spool_dir)
+        try:
+            spool.write_file(path)
+        except OSError:
+            spool.close()
+            return None
+        return spool
+
+    def _write_cached(self, cache_key: str, spool: SpoolFile) -> None:
+        """
+        Stores downloaded content in the download cache, copying spooled files
+        without loading them into memory.
+
+        Args:
+            cache_key (str): The download cache key.
+            spool (SpoolFile): The downloaded content.
+        """
+        source = spool.source
+        if isinstance(source, str):
+            self.download_cache.put_file(cache_key, source)
+        else:
+            self.download_cache.put(cache_key, source)
+
+    @staticmethod
+    def append_batch(
+        batch: pd.DataFrame,
+        file: Dict[str, Any],
+        spreadsheet_service: SpreadsheetService,
+    ) -> None:
+        """
+        Adds parsed rows to the spreadsheet, with the origin column set to the
+        origin of the file in one vectorized step.
+
+        Args:
+            batch (pd.DataFrame): The parsed rows, aligned to the output columns.
+            file (dict): The file metadata.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+        """
+        spreadsheet_service.add_batch(
+            batch.assign(
+                **{
+                    spreadsheet_service.origin_column_name: (
+                        SpreadsheetService.get_origin(file)
+                    )
+                }
+            )
+        )
+
+    async def process(
+        self,
+        file: Dict[str, Any],
+        session: aiohttp.ClientSession,
+        spreadsheet_service: SpreadsheetService,
+        access_token: str,
+        drive_id: str,
+    ) -> None:
+        """
+        Processes the file if it matches the specified file extension.
+
+        Args:
+            file (dict): The file metadata.
+            session (aiohttp.ClientSession): The HTTP client session.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+            access_token (str): The access token for authentication.
+            drive_id (str): The ID of the drive containing the file.
+        """
+        if self.can_process(file):
+            if await self.process_cached(file, spreadsheet_service):
+                return
+            file_content = await self.download(file, session, access_token, drive_id)
+            if file_content is not None:
+                with file_content:
+                    await self.process_content(file_content, file, spreadsheet_service)
 
     @abstractmethod
     async def process_content(
-        self, file_content: BytesIO, file: Dict[str, Any], ws: Worksheet
+        self,
+        file_content: SpoolFile,
+        file: Dict[str, Any],
+        spreadsheet_service: SpreadsheetService,
     ) -> None:
         """
         Abstract method to process the content of the file.
 
         Args:
-            file_content (BytesIO): The content of the file.
+            file_content (SpoolFile): The content of the file.
             file (dict): The file metadata.
-            ws (Worksheet): The worksheet to append data to.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
         """
         pass
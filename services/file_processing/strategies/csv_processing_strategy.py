@@ -0,0 +1,131 @@
+import asyncio
+from io import BytesIO
+from typing import Any, Dict, Iterator, Optional, Union
+
+import pandas as pd
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.cache.disk_cache import DiskCache
+from services.file_processing.schema_mapper import SchemaMapper
+from services.file_processing.spool_file import SpoolFile
+from services.file_processing.strategies.base_file_processing_strategy import (
+    BaseFileProcessingStrategy,
+)
+from services.http.retry_policy import RetryPolicy
+from services.spreadsheet.spreadsheet_service import SpreadsheetService
+
+logger = LoggerConfig.get_logger(__name__)
+
+
+class CsvProcessingStrategy(BaseFileProcessingStrategy):
+    """
+    Strategy for processing CSV files.
+
+    The file is parsed in chunks of rows, keeping only the output columns of each
+    chunk, and each chunk is added to the spreadsheet as soon as it is parsed. The
+    rows are streamed in a spreadsheet transaction, so a file failing partway
+    leaves no rows behind in the output.
+
+    Attributes:
+        schema_mapper (SchemaMapper): Maps the source columns to the output columns.
+        delimiter (str): The field delimiter.
+        encoding (str): The text encoding of the files.
+        chunk_rows (int): Number of rows parsed per chunk.
+
+    Methods:
+        process_content(file_content, file, spreadsheet_service): Processes the
+            content of a CSV file.
+    """
+
+    MIME_TYPE = "text/csv"
+    STREAMS_ROWS = True
+
+    def __init__(
+        self,
+        schema_mapper: SchemaMapper,
+        settings: Settings,
+        download_cache: Optional[DiskCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        download_retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
+        """
+        Initializes the CsvProcessingStrategy with the .csv file extension.
+
+        Args:
+            schema_mapper (SchemaMapper): Maps the source columns to the output
+                columns.
+            settings (Settings): Application settings.
+            download_cache (Optional[DiskCache]): Cache of downloaded file contents.
+            retry_policy (Optional[RetryPolicy]): Policy retrying throttled and
+                transiently failing Graph requests.
+            download_retry_policy (Optional[RetryPolicy]): Policy retrying the
+                download URLs and byte ranges; defaults to retry_policy.
+        """
+        super().__init__(
+            ".csv",
+            settings,
+            self.MIME_TYPE,
+            download_cache,
+            retry_policy,
+            download_retry_policy,
+        )
+        self.schema_mapper = schema_mapper
+        self.delimiter: str = settings.csv_delimiter
+        self.encoding: str = settings.csv_encoding
+        self.chunk_rows: int = max(1, settings.csv_chunk_rows)
+
+    def open_reader(self, source: Union[bytes, str]) -> Iterator[pd.DataFrame]:
+        """
+        Opens a chunked reader over the columns used by the output.
+
+        Args:
+            source (Union[bytes, str]): The raw content of the file, or its path.
+
+        Returns:
+            Iterator[pd.DataFrame]: Chunks of parsed rows.
+        """
+        return pd.read_csv(
+            BytesIO(source) if isinstance(source, bytes) else source,
+            sep=self.delimiter,
+            encoding=self.encoding,
+            chunksize=self.chunk_rows,
+            **self.schema_mapper.read_options(),
+        )
+
+    async def process_content(
+        self,
+        file_content: SpoolFile,
+        file: Dict[str, Any],
+        spreadsheet_service: SpreadsheetService,
+    ) -> None:
+        """
+        Processes the content of a CSV file chunk by chunk. Chunks are parsed in a
+        worker thread, so the event loop keeps serving other downloads, and added
+        to the spreadsheet as soon as they are parsed.
+
+        Args:
+            file_content (SpoolFile): The content of the file.
+            file (dict): The file metadata.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+        """
+        try:
+            reader = await asyncio.to_thread(self.open_reader, file_content.source)
+        except pd.errors.EmptyDataError:
+            logger.warning(f"File {file['name']} is empty")
+            return
+        row_count = 0
+        with reader:
+            while True:
+                chunk = await asyncio.to_thread(next, reader, None)
+                if chunk is None:
+                    break
+                if not chunk.empty:
+                    self.append_batch(
+                        self.schema_mapper.apply(chunk), file, spreadsheet_service
+                    )
+                    row_count += len(chunk)
+        if row_count:
+            logger.info(f"File {file['name']} processed successfully")
+        else:
+            logger.warning(f"File {file['name']} is empty")
@@ -1,46 +1,201 @@
-from io import BytesIO
-from typing import Any, Dict
+import asyncio
+from typing import Any, Dict, List, Optional, Union
 
 import pandas as pd
-from openpyxl.worksheet.worksheet import Worksheet
 
 from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.cache.disk_cache import DiskCache
+from services.cache.parsed_row_cache import ParsedRowCache
+from services.file_processing.excel_readers import ENGINES, resolve_engine
+from services.file_processing.parse_executor import ParseExecutor
+from services.file_processing.schema_mapper import SchemaMapper
+from services.file_processing.spool_file import SpoolFile
 from services.file_processing.strategies.base_file_processing_strategy import (
     BaseFileProcessingStrategy,
 )
+from services.http.retry_policy import RetryPolicy
+from services.spreadsheet.spreadsheet_service import SpreadsheetService
 
 logger = LoggerConfig.get_logger(__name__)
 
 
+def parse_excel_content(
+    content: Union[bytes, str],
+    schema_mapper: SchemaMapper,
+    engine: str,
+    sheet_names: List[str],
+) -> pd.DataFrame:
+    """
+    Parses the selected worksheets of an Excel file into a batch aligned to the
+    output columns.
+
+    Only the columns mapped by the schema mapper are read, and each worksheet is
+    mapped on its own so sheets with different layouts line up. Runs inside a
+    parse executor worker, so it only takes and returns picklable data.
+
+    Args:
+        content (Union[bytes, str]): The raw content of the file, or the path of a
+            spooled copy of it.
+        schema_mapper (SchemaMapper): Maps the source columns to the output columns.
+        engine (str): Name of the reader engine in ENGINES.
+        sheet_names (List[str]): The worksheets to read: empty for the first one,
+            '*' for all of them, or their names.
+
+    Returns:
+        pd.DataFrame: The data rows of the selected worksheets.
+    """
+    frames = [
+        schema_mapper.apply(df)
+        for df in ENGINES[engine](content, schema_mapper, sheet_names)
+    ]
+    if not frames:
+        return schema_mapper.apply(pd.DataFrame())
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
 class ExcelProcessingStrategy(BaseFileProcessingStrategy):
     """
-    Strategy for processing Excel files.
+    Strategy for processing Excel workbooks (.xlsx, .xlsm, .xls or .ods).
+
+    Attributes:
+        parse_executor (ParseExecutor): Executor that parses workbooks off the event loop.
+        schema_mapper (SchemaMapper): Maps the source columns to the output columns.
+        engine (str): Name of the reader engine used to parse workbooks.
+        sheet_names (List[str]): The worksheets to read: empty for the first one,
+            '*' for all of them, or their names.
+        parsed_row_cache (Optional[ParsedRowCache]): Cache of the rows parsed from
+            each file version.
 
     Methods:
-        process_content(file_content, file, ws): Processes the content of an Excel file.
+        process_cached(file, spreadsheet_service): Appends the cached rows of an
+            unchanged Excel file.
+        process_content(file_content, file, spreadsheet_service): Processes the
+            content of an Excel file.
     """
 
-    def __init__(self) -> None:
+    MIME_TYPES = {
+        ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        ".xlsm": "application/vnd.ms-excel.sheet.macroEnabled.12",
+        ".xls": "application/vnd.ms-excel",
+        ".ods": "application/vnd.oasis.opendocument.spreadsheet",
+    }
+
+    def __init__(
+        self,
+        parse_executor: ParseExecutor,
+        schema_mapper: SchemaMapper,
+        settings: Settings,
+        file_extension: str = ".xlsx",
+        download_cache: Optional[DiskCache] = None,
+        parsed_row_cache: Optional[ParsedRowCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        download_retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
         """
-        Initializes the ExcelProcessingStrategy with the .xlsx file extension.
+        Initializes the ExcelProcessingStrategy for a workbook format, with the
+        reader engine configured for it.
+
+        Args:
+            parse_executor (ParseExecutor): Executor that parses workbooks off the
+                event loop.
+            schema_mapper (SchemaMapper): Maps the source columns to the output
+                columns.
+            settings (Settings): Application settings.
+            file_extension (str): The workbook format, one of MIME_TYPES.
+            download_cache (Optional[DiskCache]): Cache of downloaded file contents.
+            parsed_row_cache (Optional[ParsedRowCache]): Cache of the rows parsed from
+                each file version.
+            retry_policy (Optional[RetryPolicy]): Policy retrying throttled and
+                transiently failing Graph requests.
+            download_retry_policy (Optional[RetryPolicy]): Policy retrying the
+                download URLs and byte ranges; defaults to retry_policy.
+
+        Raises:
+            ValueError: If the format or the configured engine is unknown.
+            ImportError: If no reader engine for the format is installed.
         """
-        super().__init__(".xlsx")
+        super().__init__(
+            file_extension,
+            settings,
+            self.MIME_TYPES.get(file_extension),
+            download_cache,
+            retry_policy,
+            download_retry_policy,
+        )
+        self.parse_executor = parse_executor
+        self.schema_mapper = schema_mapper
+        self.engine: str = resolve_engine(settings.excel_engine, file_extension)
+        self.sheet_names: List[str] = settings.sheet_names
+        self.parsed_row_cache = parsed_row_cache
+
+    async def process_cached(
+        self, file: Dict[str, Any], spreadsheet_service: SpreadsheetService
+    ) -> bool:
+        """
+        Appends the cached rows of an Excel file whose version has not changed.
+
+        Args:
+            file (dict): The file metadata.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+
+        Returns:
+            bool: True if the file was processed from cached rows.
+        """
+        tag = self.get_version_tag(file)
+        if not self.parsed_row_cache or not tag:
+            return False
+        batch = await asyncio.to_thread(self.parsed_row_cache.get, file["id"], tag)
+        if batch is None:
+            return False
+        logger.info(f"Using cached rows for file {file['name']}")
+        self._add_batch(batch, file, spreadsheet_service)
+        return True
 
     async def process_content(
-        self, file_content: BytesIO, file: Dict[str, Any], ws: Worksheet
+        self,
+        file_content: SpoolFile,
+        file: Dict[str, Any],
+        spreadsheet_service: SpreadsheetService,
     ) -> None:
         """
         Processes the content of an Excel file.
 
         Args:
-            file_content (BytesIO): The content of the file.
+            file_content (SpoolFile): The content of the file.
+            file (dict): The file metadata.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+        """
+        batch = await self.parse_executor.run(
+            parse_excel_content,
+            file_content.source,
+            self.schema_mapper,
+            self.engine,
+            self.sheet_names,
+        )
+        tag = self.get_version_tag(file)
+        if self.parsed_row_cache and tag:
+            await asyncio.to_thread(self.parsed_row_cache.put, file["id"], tag, batch)
+        self._add_batch(batch, file, spreadsheet_service)
+
+    def _add_batch(
+        self,
+        batch: pd.DataFrame,
+        file: Dict[str, Any],
+        spreadsheet_service: SpreadsheetService,
+    ) -> None:
+        """
+        Adds the parsed rows of a file to the spreadsheet.
+
+        Args:
+            batch (pd.DataFrame): The parsed rows.
             file (dict): The file metadata.
-            ws (Worksheet): The worksheet to append data to.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
         """
-        df = pd.read_excel(file_content)
-        if not df.empty:
-            for row in df.itertuples(index=False, name=None):
-                ws.append(row + (file["name"],))
+        if not batch.empty:
+            self.append_batch(batch, file, spreadsheet_service)
             logger.info(f"File {file['name']} processed successfully")
         else:
             logger.warning(f"File {file['name']} is empty")
@@ -1,24 +1,109 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import aiohttp
-from openpyxl.worksheet.worksheet import Worksheet
+
+from services.file_processing.spool_file import SpoolFile
+from services.spreadsheet.spreadsheet_service import SpreadsheetService
 
 
 class FileProcessingStrategy(ABC):
     """
     Abstract base class for file processing strategies.
 
+    Strategies setting STREAMS_ROWS add the rows of a file to the spreadsheet in
+    several batches while parsing it, so they are run in a spreadsheet transaction
+    that removes them if the file fails partway.
+
     Methods:
-        process(file, session, ws, access_token, drive_id): Processes the file.
+        can_process(file): Checks whether the strategy handles the file.
+        process_cached(file, spreadsheet_service): Processes the file from
+            previously parsed rows.
+        download(file, session, access_token, drive_id): Downloads the file content.
+        process_content(file_content, file, spreadsheet_service): Processes the
+            downloaded content.
+        process(file, session, spreadsheet_service, access_token, drive_id):
+            Processes the file.
     """
 
+    STREAMS_ROWS = False
+
+    @abstractmethod
+    def can_process(self, file: Dict[str, Any]) -> bool:
+        """
+        Abstract method to check whether the strategy handles the file.
+
+        Args:
+            file (dict): The file metadata.
+
+        Returns:
+            bool: True if the file can be processed by this strategy.
+        """
+        pass
+
+    @abstractmethod
+    async def process_cached(
+        self, file: Dict[str, Any], spreadsheet_service: SpreadsheetService
+    ) -> bool:
+        """
+        Abstract method to process the file from previously parsed rows, without
+        downloading it.
+
+        Args:
+            file (dict): The file metadata.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+
+        Returns:
+            bool: True if the file was processed from cached rows.
+        """
+        pass
+
+    @abstractmethod
+    async def download(
+        self,
+        file: Dict[str, Any],
+        session: aiohttp.ClientSession,
+        access_token: str,
+        drive_id: str,
+    ) -> Optional[SpoolFile]:
+        """
+        Abstract method to download the content of the file.
+
+        Args:
+            file (dict): The file metadata.
+            session (aiohttp.ClientSession): The HTTP client session.
+            access_token (str): The access token for authentication.
+            drive_id (str): The ID of the drive containing the file.
+
+        Returns:
+            Optional[SpoolFile]: The content of the file, or None if the download
+                failed.
+        """
+        pass
+
+    @abstractmethod
+    async def process_content(
+        self,
+        file_content: SpoolFile,
+        file: Dict[str, Any],
+        spreadsheet_service: SpreadsheetService,
+    ) -> None:
+        """
+        Abstract method to process the content of the file.
+
+        Args:
+            file_content (SpoolFile): The content of the file.
+            file (dict): The file metadata.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
+        """
+        pass
+
     @abstractmethod
     async def process(
         self,
         file: Dict[str, Any],
         session: aiohttp.ClientSession,
-        ws: Worksheet,
+        spreadsheet_service: SpreadsheetService,
         access_token: str,
         drive_id: str,
     ) -> None:
@@ -28,7 +113,7 @@ class FileProcessingStrategy(ABC):
         Args:
             file (dict): The file metadata.
             session (aiohttp.ClientSession): The HTTP client session.
-            ws (Worksheet): The worksheet to append data to.
+            spreadsheet_service (SpreadsheetService): The spreadsheet to append rows to.
             access_token (str): The access token for authentication.
             drive_id (str): The ID of the drive containing the file.
         """
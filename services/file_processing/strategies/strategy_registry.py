@@ -0,0 +1,76 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from config.logger_config import LoggerConfig
+from services.file_processing.strategies.base_file_processing_strategy import (
+    BaseFileProcessingStrategy,
+    get_mime_type,
+)
+
+
+class StrategyRegistry:
+    """
+    Registry of file processing strategies, dispatching each file to a strategy by
+    its extension or, failing that, by the MIME type of its driveItem.
+
+    Attributes:
+        strategies_by_extension (Dict[str, BaseFileProcessingStrategy]): Strategies
+            keyed by lower-case file extension.
+        strategies_by_mime_type (Dict[str, BaseFileProcessingStrategy]): Strategies
+            keyed by MIME type.
+        logger (Logger): Logger instance.
+    """
+
+    def __init__(self, logger: LoggerConfig) -> None:
+        """
+        Initializes an empty StrategyRegistry.
+
+        Args:
+            logger (LoggerConfig): Logger configuration.
+        """
+        self.strategies_by_extension: Dict[str, BaseFileProcessingStrategy] = {}
+        self.strategies_by_mime_type: Dict[str, BaseFileProcessingStrategy] = {}
+        self.logger = logger.get_logger(__name__)
+
+    def register(self, strategy: BaseFileProcessingStrategy) -> None:
+        """
+        Registers a strategy for its file extension and MIME type, replacing any
+        strategy previously registered for them.
+
+        Args:
+            strategy (BaseFileProcessingStrategy): The strategy to register.
+        """
+        self.strategies_by_extension[strategy.file_extension] = strategy
+        if strategy.mime_type:
+            self.strategies_by_mime_type[strategy.mime_type] = strategy
+        self.logger.debug(
+            f"Registered {type(strategy).__name__} for {strategy.file_extension}"
+        )
+
+    def get_strategy(
+        self, file: Dict[str, Any]
+    ) -> Optional[BaseFileProcessingStrategy]:
+        """
+        Returns the strategy that processes the file.
+
+        Args:
+            file (dict): The file metadata.
+
+        Returns:
+            Optional[BaseFileProcessingStrategy]: The strategy, or None if no
+                registered strategy handles the file.
+        """
+        extension = os.path.splitext(file["name"])[1].lower()
+        strategy = self.strategies_by_extension.get(extension)
+        if strategy is None:
+            strategy = self.strategies_by_mime_type.get(get_mime_type(file))
+        return strategy
+
+    def get_extensions(self) -> List[str]:
+        """
+        Returns the file extensions with a registered strategy.
+
+        Returns:
+            List[str]: The file extensions.
+        """
+        return list(self.strategies_by_extension)
@@ -0,0 +1,270 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+
+import aiohttp
+
+from auth.authentication import AuthenticationService
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.http.retry_policy import RetryPolicy
+from services.metrics.run_metrics import RunMetrics
+
+
+class GraphBatchClient:
+    """
+    Groups concurrent Microsoft Graph requests into JSON batches.
+
+    Requests made within a short window are sent together as one POST to the
+    $batch endpoint, up to 20 per batch, and each caller receives the body of its
+    own sub-response. Throttled sub-requests (429, 503, 504) are retried in a later
+    batch after the delay the service asks for; other failed sub-requests resolve
+    to None, like a failed direct request. With a retry policy, batches go through
+    its rate limiter, taking one token per sub-request, and throttled sub-requests
+    slow the limiter down like throttled direct requests.
+
+    Attributes:
+        auth_service (AuthenticationService): Provides the current access token.
+        session (aiohttp.ClientSession): Shared HTTP client session.
+        graph_url (str): Base URL of the Graph API version.
+        batch_size (int): Maximum number of requests per batch.
+        window (float): Seconds to wait for more requests before sending a batch.
+        max_retries (int): Maximum number of retries of a throttled sub-request.
+        retry_policy (Optional[RetryPolicy]): Policy retrying throttled batches.
+        run_metrics (Optional[RunMetrics]): Metrics counting batches, batched
+            requests and throttled sub-requests.
+        pending (List[dict]): Requests waiting to be sent.
+        flush_handle (Optional[asyncio.TimerHandle]): Timer sending the pending
+            requests once the window elapses.
+        tasks (Set[asyncio.Task]): Batches in flight.
+        logger (Logger): Logger instance.
+    """
+
+    MAX_BATCH_SIZE = 20
+    RETRY_STATUSES = (429, 503, 504)
+
+    def __init__(
+        self,
+        auth_service: AuthenticationService,
+        session: aiohttp.ClientSession,
+        settings: Settings,
+        logger: LoggerConfig,
+        retry_policy: Optional[RetryPolicy] = None,
+        run_metrics: Optional[RunMetrics] = None,
+    ) -> None:
+        """
+        Initializes the GraphBatchClient with the batching limits from the settings.
+
+        Args:
+            auth_service (AuthenticationService): Provides the current access
+                token.
+            session (aiohttp.ClientSession): Shared HTTP client session.
+            settings (Settings): Application settings.
+            logger (LoggerConfig): Logger configuration.
+            retry_policy (Optional[RetryPolicy]): Policy retrying throttled batches.
+            run_metrics (Optional[RunMetrics]): Metrics counting batches, batched
+                requests and throttled sub-requests.
+        """
+        self.auth_service = auth_service
+        self.session = session
+        self.graph_url: str = settings.graph_base_url
+        self.batch_size: int = min(
+            self.MAX_BATCH_SIZE, max(1, settings.graph_batch_size)
+        )
+        self.window: float = max(0, settings.graph_batch_window_ms) / 1000
+        self.max_retries: int = settings.graph_batch_max_retries
+        self.retry_policy = retry_policy
+        self.run_metrics = run_metrics
+        self.pending: List[Dict[str, Any]] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.tasks: Set[asyncio.Task] = set()
+        self.logger = logger.get_logger(__name__)
+
+    async def request(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Queues a request for the next batch and waits for its response.
+
+        Args:
+            method (str): HTTP method (e.g., 'GET').
+            url (str): Absolute Graph URL, or a URL relative to the Graph version.
+
+        Returns:
+            Optional[dict]: JSON body of the response, or None if the request failed.
+        """
+        if url.startswith(self.graph_url):
+            url = url[len(self.graph_url) :]
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue({"method": method, "url": url, "future": future, "retries": 0})
+        return await future
+
+    def _enqueue(self, entry: Dict[str, Any]) -> None:
+        """
+        Adds a request to the pending batch, sending it when it is full.
+
+        Args:
+            entry (dict): The request with its future and retry count.
+        """
+        if entry["future"].done():
+            return
+        self.pending.append(entry)
+        if len(self.pending) >= self.batch_size:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(
+                self.window, self._flush
+            )
+
+    def _flush(self) -> None:
+        """
+        Sends the pending requests as one or more batches.
+        """
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        while self.pending:
+            batch = self.pending[: self.batch_size]
+            self.pending = self.pending[self.batch_size :]
+            task = asyncio.create_task(self._send(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _send(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Posts a batch and dispatches the sub-responses to their callers.
+
+        Args:
+            batch (List[dict]): The requests of the batch.
+        """
+        body = {
+            "requests": [
+                {"id": str(index), "method": entry["method"], "url": entry["url"]}
+                for index, entry in enumerate(batch)
+            ]
+        }
+        url = f"{self.graph_url}/$batch"
+        if self.run_metrics:
+            self.run_metrics.increment("graph_batches")
+            self.run_metrics.increment("graph_batched_requests", len(batch))
+        try:
+            headers = {
+                "Authorization": f"Bearer {await self.auth_service.get_access_token()}",
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+            }
+            if self.retry_policy:
+                request = self.retry_policy.request(
+                    self.session, "POST", url, len(batch), json=body, headers=headers
+                )
+            else:
+                request = self.session.post(url, json=body, headers=headers)
+            async with request as response:
+                if response.status in self.RETRY_STATUSES:
+                    self._retry(batch, self._get_delay(response.headers, 0))
+                    return
+                if response.status != 200:
+                    self.logger.error(f"Error making batch request: {response.status}")
+                    self._resolve(batch, None)
+                    return
+                data = await response.json()
+        except Exception as e:
+            for entry in batch:
+                if not entry["future"].done():
+                    entry["future"].set_exception(e)
+            return
+
+        responses = {
+            sub_response.get("id"): sub_response
+            for sub_response in data.get("responses", [])
+        }
+        throttled: List[Dict[str, Any]] = []
+        delay = 0.0
+        for index, entry in enumerate(batch):
+            sub_response = responses.get(str(index))
+            status = sub_response.get("status") if sub_response else None
+            if status == 200:
+                self._resolve([entry], sub_response.get("body"))
+            elif status is None or status in self.RETRY_STATUSES:
+                throttled.append(entry)
+                delay = max(
+                    delay,
+                    self._get_delay(
+                        (sub_response or {}).get("headers") or {}, entry["retries"]
+                    ),
+                )
+            else:
+                self.logger.error(
+                    f"Error making request {entry['url']} in batch: {status}"
+                )
+                self._resolve([entry], None)
+        if throttled:
+            if self.run_metrics:
+                self.run_metrics.increment("http_throttled", len(throttled))
+            if self.retry_policy:
+                self.retry_policy.rate_limiter.on_throttled(delay)
+            self._retry(throttled, delay)
+
+    def _retry(self, entries: List[Dict[str, Any]], delay: float) -> None:
+        """
+        Queues throttled requests again after a delay, giving up on the ones that
+        exhausted their retries.
+
+        Args:
+            entries (List[dict]): The throttled requests.
+            delay (float): Seconds to wait before queuing them again.
+        """
+        retried = []
+        for entry in entries:
+            entry["retries"] += 1
+            if entry["retries"] > self.max_retries:
+                self.logger.error(f"Giving up on throttled request {entry['url']}")
+                self._resolve([entry], None)
+            else:
+                retried.append(entry)
+        if retried:
+            if self.run_metrics:
+                self.run_metrics.increment("http_retries", len(retried))
+            self.logger.warning(
+                f"{len(retried)} batched requests throttled, retrying in {delay:.1f}s"
+            )
+            asyncio.get_running_loop().call_later(
+                delay, lambda: [self._enqueue(entry) for entry in retried]
+            )
+
+    def _get_delay(self, headers: Any, attempt: int) -> float:
+        """
+        Returns the delay before retrying a throttled request: the Retry-After
+        value when the service sends one, else an exponential backoff.
+
+        Args:
+            headers (Mapping): Response headers, possibly with a Retry-After value.
+            attempt (int): Number of retries already made for the request.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        delay = RetryPolicy.get_retry_after(headers)
+        if delay is not None:
+            return delay
+        if self.retry_policy:
+            return self.retry_policy.get_backoff(attempt)
+        return float(min(2 ** (attempt + 1), 60))
+
+    @staticmethod
+    def _resolve(entries: List[Dict[str, Any]], result: Optional[Dict]) -> None:
+        """
+        Completes the futures of requests that are still awaited.
+
+        Args:
+            entries (List[dict]): The requests.
+            result (Optional[dict]): The response body, or None on failure.
+        """
+        for entry in entries:
+            if not entry["future"].done():
+                entry["future"].set_result(result)
+
+    async def close(self) -> None:
+        """
+        Sends the pending requests and waits for the batches in flight.
+        """
+        self._flush()
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
@@ -0,0 +1,68 @@
+from typing import Optional
+
+import aiohttp
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+
+
+class HttpSessionManager:
+    """
+    Manages a single connection-pooled HTTP session shared by all services.
+
+    Attributes:
+        limit (int): Maximum number of simultaneous connections.
+        limit_per_host (int): Maximum number of simultaneous connections per host.
+        keepalive_timeout (float): Seconds an idle connection is kept alive.
+        dns_cache_ttl (int): Seconds resolved host names are cached.
+        session (Optional[aiohttp.ClientSession]): Shared HTTP client session.
+        logger (Logger): Logger instance.
+    """
+
+    def __init__(self, settings: Settings, logger: LoggerConfig) -> None:
+        """
+        Initializes the HttpSessionManager with connector limits from the settings.
+
+        Args:
+            settings (Settings): Application settings.
+            logger (LoggerConfig): Logger configuration.
+        """
+        self.limit: int = settings.http_connection_limit
+        self.limit_per_host: int = settings.http_connection_limit_per_host
+        self.keepalive_timeout: float = settings.http_keepalive_timeout
+        self.dns_cache_ttl: int = settings.http_dns_cache_ttl
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.logger = logger.get_logger(__name__)
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the shared HTTP session. Creates it if it doesn't exist.
+
+        Must be called from a running event loop.
+
+        Returns:
+            aiohttp.ClientSession: Shared HTTP client session.
+        """
+        if not self.session or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+            self.logger.debug(
+                f"HTTP session created (limit={self.limit}, "
+                f"limit_per_host={self.limit_per_host})"
+            )
+        return self.session
+
+    async def close(self) -> None:
+        """
+        Closes the shared HTTP session and its pooled connections.
+        """
+        if self.session and not self.session.closed:
+            await self.session.close()
+            self.logger.debug("HTTP session closed")
+        self.session = None
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from typing import Optional
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+
+
+class AdaptiveRateLimiter:
+    """
+    Client-side token bucket shared by the requests to one service, such as every
+    Graph request or every download, whose rate adapts to throttling: it is halved when the service throttles a request and grows back
+    by a fixed step on each success, up to the configured maximum. Requests
+    throttled together only halve it once. A throttling response also pauses all
+    requests for the Retry-After delay.
+
+    Attributes:
+        max_rate (float): Maximum number of requests per second; 0 disables the
+            rate limit, keeping only the throttling pauses.
+        min_rate (float): Rate the limiter never goes below.
+        increase_step (float): Requests per second added after each success.
+        capacity (float): Maximum number of tokens, the size of a burst.
+        rate (float): Current number of requests per second.
+        tokens (float): Tokens currently available.
+        updated_at (float): Time the tokens were last refilled.
+        paused_until (float): Time before which no request is let through.
+        decreased_at (float): Time the rate was last lowered.
+        lock (asyncio.Lock): Serializes waiting requests in arrival order.
+        logger (Logger): Logger instance.
+    """
+
+    DECREASE_FACTOR = 0.5
+    DECREASE_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        settings: Settings,
+        logger: LoggerConfig,
+        max_rate: Optional[float] = None,
+    ) -> None:
+        """
+        Initializes the AdaptiveRateLimiter with the rates from the settings.
+
+        Args:
+            settings (Settings): Application settings.
+            logger (LoggerConfig): Logger configuration.
+            max_rate (Optional[float]): Maximum number of requests per second;
+                defaults to the Graph rate limit.
+        """
+        if max_rate is None:
+            max_rate = settings.http_rate_limit
+        self.max_rate: float = max(0.0, max_rate)
+        self.min_rate: float = min(
+            max(0.1, settings.http_rate_limit_min), self.max_rate or 1
+        )
+        self.increase_step: float = settings.http_rate_limit_step
+        self.capacity: float = max(1.0, settings.http_rate_limit_burst)
+        self.rate: float = self.max_rate
+        self.tokens: float = self.capacity
+        self.updated_at: float = time.monotonic()
+        self.paused_until: float = 0.0
+        self.decreased_at: float = float("-inf")
+        self.lock = asyncio.Lock()
+        self.logger = logger.get_logger(__name__)
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """
+        Waits until the requests can be sent.
+
+        Args:
+            tokens (int): Number of requests about to be sent, such as the size of
+                a batch.
+        """
+        needed = min(float(tokens), self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if not self.max_rate:
+                    return
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= needed:
+                    self.tokens -= needed
+                    return
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+
+    def on_success(self) -> None:
+        """
+        Raises the rate by one step after a successful request.
+        """
+        if self.max_rate and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttled(self, retry_after: float) -> None:
+        """
+        Halves the rate, unless it was just lowered, and pauses all requests after
+        a throttling response.
+
+        Args:
+            retry_after (float): Seconds the service asked to wait.
+        """
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + retry_after)
+        if self.max_rate and now - self.decreased_at >= self.DECREASE_INTERVAL:
+            self.rate = max(self.min_rate, self.rate * self.DECREASE_FACTOR)
+            self.tokens = min(self.tokens, 0.0)
+            self.decreased_at = now
+        self.logger.warning(
+            f"Throttled by the service, pausing {retry_after:.1f}s"
+            + (f" at {self.rate:.1f} requests/s" if self.max_rate else "")
+        )
@@ -0,0 +1,213 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Mapping, Optional
+
+import aiohttp
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.http.rate_limiter import AdaptiveRateLimiter
+from services.metrics.run_metrics import RunMetrics
+
+
+class RetryPolicy:
+    """
+    Retry policy shared by every Graph call, or by every download from the
+    pre-authenticated download URLs, each with its own rate limiter.
+
+    Throttled and transiently failing requests (429, 500, 502, 503, 504 and
+    connection errors) are retried after the Retry-After delay the service asks
+    for, or after an exponential backoff with full jitter. Retries draw from a
+    budget that grows with the number of requests, so a struggling service is not
+    flooded with retries. Every attempt first goes through the shared rate limiter.
+
+    Attributes:
+        rate_limiter (AdaptiveRateLimiter): Limiter shared by all requests.
+        max_retries (int): Maximum number of retries of a request.
+        backoff_base (float): Backoff of the first retry in seconds.
+        backoff_max (float): Maximum backoff in seconds.
+        budget_ratio (float): Retries earned by each request.
+        budget_max (float): Maximum number of retries that can be saved up.
+        budget (float): Retries currently available.
+        run_metrics (Optional[RunMetrics]): Metrics counting requests, retries and
+            throttling responses.
+        logger (Logger): Logger instance.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    THROTTLE_STATUSES = (429, 503)
+
+    def __init__(
+        self,
+        settings: Settings,
+        rate_limiter: AdaptiveRateLimiter,
+        logger: LoggerConfig,
+        run_metrics: Optional[RunMetrics] = None,
+    ) -> None:
+        """
+        Initializes the RetryPolicy with the limits from the settings.
+
+        Args:
+            settings (Settings): Application settings.
+            rate_limiter (AdaptiveRateLimiter): Limiter shared by all requests.
+            logger (LoggerConfig): Logger configuration.
+            run_metrics (Optional[RunMetrics]): Metrics counting requests, retries
+                and throttling responses.
+        """
+        self.rate_limiter = rate_limiter
+        self.max_retries: int = max(0, settings.http_max_retries)
+        self.backoff_base: float = settings.http_backoff_base
+        self.backoff_max: float = settings.http_backoff_max
+        self.budget_ratio: float = settings.http_retry_budget_ratio
+        self.budget_max: float = float(max(1, settings.http_retry_budget))
+        self.budget: float = self.budget_max
+        self.run_metrics = run_metrics
+        self.logger = logger.get_logger(__name__)
+
+    @asynccontextmanager
+    async def request(
+        self,
+        session: aiohttp.ClientSession,
+        method: str,
+        url: str,
+        cost: int = 1,
+        **kwargs: Any,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        Sends a request, retrying it while it is throttled or fails transiently.
+
+        The response of the last attempt is yielded, whatever its status, so
+        callers handle final failures as before.
+
+        Args:
+            session (aiohttp.ClientSession): The HTTP client session.
+            method (str): HTTP method (e.g., 'GET', 'POST').
+            url (str): URL for the request.
+            cost (int): Number of rate limiter tokens the request takes, such as
+                the number of requests in a batch.
+            **kwargs: Other arguments for the request, such as headers.
+
+        Yields:
+            aiohttp.ClientResponse: The response.
+        """
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(cost)
+            self._earn()
+            self._count("http_requests")
+            try:
+                response = await session.request(method, url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if not self._can_retry(attempt):
+                    raise
+                delay = self.get_backoff(attempt)
+                self.logger.warning(
+                    f"Request to {url} failed ({e!r}), retrying in {delay:.1f}s"
+                )
+                self._count("http_retries")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            if response.status in self.RETRY_STATUSES and self._can_retry(attempt):
+                delay = self.get_retry_after(response.headers)
+                if response.status in self.THROTTLE_STATUSES:
+                    self._count("http_throttled")
+                    self.rate_limiter.on_throttled(
+                        delay if delay is not None else self.get_backoff(attempt)
+                    )
+                if delay is None:
+                    delay = self.get_backoff(attempt)
+                self.logger.warning(
+                    f"Request to {url} returned {response.status}, "
+                    f"retrying in {delay:.1f}s"
+                )
+                self._count("http_retries")
+                response.release()
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            if response.status < 400:
+                self.rate_limiter.on_success()
+            try:
+                yield response
+            finally:
+                response.release()
+            return
+
+    def _count(self, counter: str) -> None:
+        """
+        Increments a counter of the run metrics, when they are collected.
+
+        Args:
+            counter (str): Name of the counter.
+        """
+        if self.run_metrics:
+            self.run_metrics.increment(counter)
+
+    def _earn(self) -> None:
+        """
+        Adds the retries earned by a request to the budget.
+        """
+        self.budget = min(self.budget_max, self.budget + self.budget_ratio)
+
+    def _can_retry(self, attempt: int) -> bool:
+        """
+        Checks whether a failed attempt may be retried, spending one retry from the
+        budget if so.
+
+        Args:
+            attempt (int): Number of retries already made for the request.
+
+        Returns:
+            bool: True if the request should be retried.
+        """
+        if attempt >= self.max_retries:
+            return False
+        if self.budget < 1:
+            self.logger.error("Retry budget exhausted, not retrying")
+            return False
+        self.budget -= 1
+        return True
+
+    def get_backoff(self, attempt: int) -> float:
+        """
+        Returns an exponential backoff with full jitter.
+
+        Args:
+            attempt (int): Number of retries already made for the request.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    @staticmethod
+    def get_retry_after(headers: Mapping[str, Any]) -> Optional[float]:
+        """
+        Reads the Retry-After header, in seconds or as an HTTP date.
+
+        Args:
+            headers (Mapping): Response headers.
+
+        Returns:
+            Optional[float]: Seconds to wait, or None if the header is missing or
+                invalid.
+        """
+        value = None
+        for name, header_value in headers.items():
+            if name.lower() == "retry-after":
+                value = str(header_value)
+                break
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,407 @@
+import datetime
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.metrics.stage_profiler import StageProfiler
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class FileMetricsRecorder:
+    """
+    Stands in for the spreadsheet while a file is processed, counting the rows the
+    file produces and timing their append to the output.
+
+    Attributes:
+        run_metrics (RunMetrics): The metrics of the run.
+        file (dict): The file metadata.
+        target (Any): The spreadsheet, or the checkpoint recorder, rows go to.
+        origin_column_name (str): Name of the origin column.
+    """
+
+    def __init__(
+        self, run_metrics: "RunMetrics", file: Dict[str, Any], target: Any
+    ) -> None:
+        """
+        Initializes the FileMetricsRecorder for a file.
+
+        Args:
+            run_metrics (RunMetrics): The metrics of the run.
+            file (dict): The file metadata.
+            target (Any): The spreadsheet, or the checkpoint recorder, rows go to.
+        """
+        self.run_metrics = run_metrics
+        self.file = file
+        self.target = target
+        self.origin_column_name: str = target.origin_column_name
+
+    def add_batch(self, batch: pd.DataFrame) -> None:
+        """
+        Adds a batch of rows to the target and records its size and append time.
+
+        Args:
+            batch (pd.DataFrame): Rows aligned to the output header.
+        """
+        with self.run_metrics.measure("append", self.file):
+            self.target.add_batch(batch)
+        self.run_metrics.increment("rows", len(batch), self.file)
+
+
+class RunMetrics:
+    """
+    Collects the measurements of a run: the time spent in each pipeline stage
+    (auth, resolve, listing, queue_wait, cached, download, parse, append, save,
+    index), per file and in total, counters such as bytes downloaded, rows
+    produced, HTTP requests, retries and throttling responses, and the peak memory
+    use.
+
+    Files are processed concurrently, so stage totals add up the time of every
+    file and can exceed the duration of the run; they show where the time goes
+    rather than the critical path. The parse stage includes the append of the
+    rows it produces, and bytes downloaded include contents read from the
+    download cache.
+
+    At the end of the run a JSON report is written, and optionally a Prometheus
+    textfile for the node exporter's textfile collector. When profiling is
+    enabled, measured stages are also sampled by the stage profiler.
+
+    Attributes:
+        report_file (str): Path of the JSON run report; empty disables it.
+        prometheus_file (str): Path of the Prometheus textfile; empty disables it.
+        started_at (float): Timestamp the run started at.
+        start (float): Performance counter value the run started at.
+        stages (Dict[str, dict]): Number, total and maximum duration per stage.
+        counters (Counter): Counters of the run.
+        files (Dict[str, dict]): Name, status, stage durations and counters per
+            driveItem ID.
+        profiler (Optional[StageProfiler]): Profiler of the stages, when profiling
+            is enabled.
+        logger (Logger): Logger instance.
+    """
+
+    PROMETHEUS_PREFIX = "sheet_merger"
+
+    def __init__(
+        self,
+        settings: Settings,
+        logger: LoggerConfig,
+        profiler: Optional[StageProfiler] = None,
+    ) -> None:
+        """
+        Initializes the RunMetrics with the report paths from the settings.
+
+        Args:
+            settings (Settings): Application settings.
+            logger (LoggerConfig): Logger configuration.
+            profiler (Optional[StageProfiler]): Profiler of the stages.
+        """
+        self.report_file: str = settings.run_report_file
+        self.prometheus_file: str = settings.metrics_textfile
+        self.started_at: float = time.time()
+        self.start: float = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Counter = Counter()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.profiler: Optional[StageProfiler] = profiler
+        self.logger = logger.get_logger(__name__)
+
+    def reset(self) -> None:
+        """
+        Clears the measurements, so the next run of a long-running process is
+        measured on its own.
+        """
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = Counter()
+        self.files = {}
+
+    @contextmanager
+    def measure(
+        self, stage: str, file: Optional[Dict[str, Any]] = None
+    ) -> Iterator[None]:
+        """
+        Measures the duration of a stage, of the run or of a file.
+
+        Args:
+            stage (str): Name of the stage.
+            file (Optional[dict]): The file metadata, for a stage of a file.
+
+        Yields:
+            None
+        """
+        start = time.perf_counter()
+        try:
+            with self.profile(stage):
+                yield
+        finally:
+            self.record(stage, time.perf_counter() - start, file)
+
+    def profile(self, stage: str) -> ContextManager[None]:
+        """
+        Returns a context that profiles a run of a stage when profiling is enabled,
+        for stages that are timed separately.
+
+        Args:
+            stage (str): Name of the stage.
+
+        Returns:
+            ContextManager[None]: The profiling context, or a no-op one.
+        """
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.profile(stage)
+
+    def record(
+        self, stage: str, seconds: float, file: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Records the duration of a stage.
+
+        Args:
+            stage (str): Name of the stage.
+            seconds (float): Duration in seconds.
+            file (Optional[dict]): The file metadata, for a stage of a file.
+        """
+        totals = self.stages.setdefault(
+            stage, {"count": 0, "total_s": 0.0, "max_s": 0.0}
+        )
+        totals["count"] += 1
+        totals["total_s"] += seconds
+        totals["max_s"] = max(totals["max_s"], seconds)
+        if file is not None:
+            stages = self._get_file(file)["stages"]
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def increment(
+        self, counter: str, value: int = 1, file: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Adds to a counter of the run, and of a file.
+
+        Args:
+            counter (str): Name of the counter.
+            value (int): Amount added.
+            file (Optional[dict]): The file metadata, for a counter of a file.
+        """
+        self.counters[counter] += value
+        if file is not None:
+            counters = self._get_file(file)["counters"]
+            counters[counter] = counters.get(counter, 0) + value
+
+    def set_file_status(self, file: Dict[str, Any], status: str) -> None:
+        """
+        Records how a file finished, such as 'completed', 'cached' or 'failed'.
+
+        Args:
+            file (dict): The file metadata.
+            status (str): The status.
+        """
+        self._get_file(file)["status"] = status
+
+    def record_rows(self, file: Dict[str, Any], target: Any) -> FileMetricsRecorder:
+        """
+        Returns the recorder the rows of a file go through.
+
+        Args:
+            file (dict): The file metadata.
+            target (Any): The spreadsheet, or the checkpoint recorder, rows go to.
+
+        Returns:
+            FileMetricsRecorder: The recorder standing in for the target.
+        """
+        return FileMetricsRecorder(self, file, target)
+
+    def _get_file(self, file: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns the measurements of a file, creating them on first use.
+
+        Args:
+            file (dict): The file metadata.
+
+        Returns:
+            dict: The measurements of the file.
+        """
+        return self.files.setdefault(
+            file["id"],
+            {"name": file["name"], "status": None, "stages": {}, "counters": {}},
+        )
+
+    @staticmethod
+    def get_peak_rss() -> Optional[int]:
+        """
+        Returns the peak resident set size of the process. Parse pool workers are
+        not included, as they outlive the run.
+
+        Returns:
+            Optional[int]: Peak RSS in bytes, or None where the platform does not
+                report it.
+        """
+        if resource is None:
+            return None
+        unit = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+
+    def get_report(self) -> Dict[str, Any]:
+        """
+        Returns the run report.
+
+        Returns:
+            dict: The duration, peak memory, file statuses, counters and stage
+                totals of the run, followed by the measurements of each file.
+        """
+        statuses = Counter(file["status"] for file in self.files.values())
+        return {
+            "started_at": datetime.datetime.fromtimestamp(
+                self.started_at, datetime.timezone.utc
+            ).isoformat(),
+            "duration_s": round(time.perf_counter() - self.start, 3),
+            "peak_rss_bytes": self.get_peak_rss(),
+            "files": {status: count for status, count in statuses.items() if status},
+            "counters": dict(self.counters),
+            "stages": {
+                stage: {
+                    "count": int(totals["count"]),
+                    "total_s": round(totals["total_s"], 3),
+                    "mean_s": round(totals["total_s"] / totals["count"], 3),
+                    "max_s": round(totals["max_s"], 3),
+                }
+                for stage, totals in self.stages.items()
+            },
+            "file_details": [
+                {
+                    "id": item_id,
+                    "name": file["name"],
+                    "status": file["status"],
+                    "stages": {
+                        stage: round(seconds, 3)
+                        for stage, seconds in file["stages"].items()
+                    },
+                    "counters": file["counters"],
+                }
+                for item_id, file in self.files.items()
+            ],
+        }
+
+    def write(self) -> None:
+        """
+        Logs a summary of the run and writes the JSON report and the Prometheus
+        textfile when they are configured.
+        """
+        report = self.get_report()
+        slowest = sorted(
+            report["stages"].items(),
+            key=lambda stage: stage[1]["total_s"],
+            reverse=True,
+        )
+        self.logger.info(
+            f"Run took {report['duration_s']:.1f}s; time per stage: "
+            + ", ".join(
+                f"{stage} {totals['total_s']:.1f}s" for stage, totals in slowest
+            )
+        )
+        try:
+            if self.report_file:
+                self._write_atomically(self.report_file, json.dumps(report, indent=2))
+                self.logger.info(f"Run report saved as '{self.report_file}'")
+            if self.prometheus_file:
+                self._write_atomically(
+                    self.prometheus_file, self.format_prometheus(report)
+                )
+        except OSError as e:
+            self.logger.warning(f"Could not save the run report: {e}")
+
+    def format_prometheus(self, report: Dict[str, Any]) -> str:
+        """
+        Formats the totals of a run report in the Prometheus text format.
+
+        Args:
+            report (dict): The run report.
+
+        Returns:
+            str: The metrics, one gauge per total.
+        """
+        prefix = self.PROMETHEUS_PREFIX
+        lines: List[str] = []
+
+        def gauge(name: str, help_text: str, samples: Dict[str, Any]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            for labels, value in samples.items():
+                if value is not None:
+                    lines.append(f"{prefix}_{name}{labels} {value}")
+
+        gauge(
+            "last_run_timestamp_seconds",
+            "Time the last run started.",
+            {"": round(self.started_at, 3)},
+        )
+        gauge(
+            "run_duration_seconds",
+            "Duration of the last run.",
+            {"": report["duration_s"]},
+        )
+        gauge(
+            "peak_rss_bytes",
+            "Peak resident set size of the last run.",
+            {"": report["peak_rss_bytes"]},
+        )
+        gauge(
+            "files",
+            "Files of the last run per status.",
+            {
+                f'{{status="{status}"}}': count
+                for status, count in report["files"].items()
+            },
+        )
+        gauge(
+            "stage_seconds",
+            "Time spent per pipeline stage in the last run, summed over files.",
+            {
+                f'{{stage="{stage}"}}': totals["total_s"]
+                for stage, totals in report["stages"].items()
+            },
+        )
+        gauge(
+            "stage_count",
+            "Number of measurements per pipeline stage in the last run.",
+            {
+                f'{{stage="{stage}"}}': totals["count"]
+                for stage, totals in report["stages"].items()
+            },
+        )
+        for counter, value in sorted(report["counters"].items()):
+            gauge(
+                counter,
+                f"Total {counter.replace('_', ' ')} in the last run.",
+                {"": value},
+            )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _write_atomically(path: str, content: str) -> None:
+        """
+        Writes a file atomically, so collectors never read a partial file.
+
+        Args:
+            path (str): Destination path.
+            content (str): The content.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
@@ -0,0 +1,356 @@
+import asyncio
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+
+
+def run_profiled(path: str, func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Runs a function under cProfile and saves its profile, in a parse pool worker.
+    The function runs unprofiled when another profiler is already active.
+
+    Args:
+        path (str): Path of the .pstats file to write.
+        func (Callable): The function to run.
+        *args: Positional arguments for the function.
+
+    Returns:
+        Any: The value returned by the function.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return func(*args)
+    try:
+        return func(*args)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+class StageProfiler:
+    """
+    Profiles the pipeline stages of a run with cProfile and tracemalloc, and
+    samples the lag of the event loop to catch calls blocking it.
+
+    To stay cheap enough for a production run, only the first `sample_size` runs
+    of each stage are profiled, one at a time: a stage starting while another is
+    profiled, such as an append inside a parse, runs unprofiled. Stages overlap
+    on the event loop, so a profile also covers the tasks that ran while its
+    stage awaited. tracemalloc only traces during a profiled stage, recording the
+    peak traced memory and the allocation sites of the memory still held when
+    the stage ends. Parses in the parse pool are profiled in the worker.
+
+    Event loop lag is the delay of a timer beyond its interval. A watchdog thread
+    records the stack of the event loop thread whenever the loop has not run for
+    longer than the threshold, pointing at the blocking call.
+
+    Attributes:
+        directory (str): Directory the profiles are written to.
+        sample_size (int): Number of runs of each stage that are profiled.
+        lag_threshold (float): Seconds without a loop iteration reported as a
+            blocking call.
+        profiles (Dict[str, cProfile.Profile]): Profile of each stage.
+        samples (Counter): Number of profiled runs per stage.
+        allocations (Dict[str, Counter]): Bytes held at the end of the profiled
+            runs per allocation site, per stage.
+        peaks (Dict[str, int]): Peak traced memory per stage in bytes.
+        worker_profiles (List[str]): Profiles written by parse pool workers.
+        active_stage (Optional[str]): The stage being profiled.
+        lags (Deque[float]): Most recent event loop lag samples in seconds.
+        max_lag (float): Largest event loop lag in seconds.
+        blocking_calls (List[dict]): Stalls of the event loop with the stack of
+            the blocking call.
+        loop_thread_id (Optional[int]): Identifier of the event loop thread.
+        last_tick (float): Time the event loop last ran the lag monitor.
+        monitor_task (Optional[asyncio.Task]): Task sampling the event loop lag.
+        watchdog (Optional[threading.Thread]): Thread detecting stalls.
+        stopping (threading.Event): Signals the watchdog to stop.
+        logger (Logger): Logger instance.
+    """
+
+    LAG_INTERVAL = 0.05
+    MAX_LAG_SAMPLES = 100_000
+    MAX_BLOCKING_CALLS = 50
+    TOP_ALLOCATIONS = 20
+    TRACEBACK_FRAMES = 1
+    WORKER_STAGE = "parse_worker"
+
+    def __init__(self, settings: Settings, logger: LoggerConfig) -> None:
+        """
+        Initializes the StageProfiler with the profile directory and limits from
+        the settings.
+
+        Args:
+            settings (Settings): Application settings.
+            logger (LoggerConfig): Logger configuration.
+        """
+        self.directory: str = settings.profile_dir
+        self.sample_size: int = max(1, settings.profile_sample_size)
+        self.lag_threshold: float = max(0.0, settings.loop_lag_threshold_ms) / 1000
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.samples: Counter = Counter()
+        self.allocations: Dict[str, Counter] = {}
+        self.peaks: Dict[str, int] = {}
+        self.worker_profiles: List[str] = []
+        self.active_stage: Optional[str] = None
+        self.lags: Deque[float] = deque(maxlen=self.MAX_LAG_SAMPLES)
+        self.max_lag: float = 0.0
+        self.blocking_calls: List[Dict[str, Any]] = []
+        self.loop_thread_id: Optional[int] = None
+        self.last_tick: float = 0.0
+        self.monitor_task: Optional[asyncio.Task] = None
+        self.watchdog: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+        self.logger = logger.get_logger(__name__)
+
+    def start(self) -> None:
+        """
+        Starts sampling the event loop lag, discarding the samples of a previous
+        run. Must be called from the event loop.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.profiles = {}
+        self.samples = Counter()
+        self.allocations = {}
+        self.peaks = {}
+        self.worker_profiles = []
+        self.lags.clear()
+        self.max_lag = 0.0
+        self.blocking_calls = []
+        self.loop_thread_id = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self.stopping.clear()
+        self.monitor_task = asyncio.create_task(self._monitor_loop())
+        self.watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self.watchdog.start()
+        self.logger.info(f"Profiling enabled, writing profiles to '{self.directory}'")
+
+    @contextmanager
+    def profile(self, stage: str) -> Iterator[None]:
+        """
+        Profiles a run of a stage, unless the stage has been sampled enough or
+        another stage is being profiled.
+
+        Args:
+            stage (str): Name of the stage.
+
+        Yields:
+            None
+        """
+        if (
+            self.active_stage is not None
+            or self.samples[stage] >= self.sample_size
+            or threading.get_ident() != self.loop_thread_id
+        ):
+            yield
+            return
+        profiler = self.profiles.get(stage) or cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            yield
+            return
+        self.profiles[stage] = profiler
+        self.samples[stage] += 1
+        self.active_stage = stage
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start(self.TRACEBACK_FRAMES)
+        try:
+            yield
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if not tracing:
+                tracemalloc.stop()
+            self.active_stage = None
+            self._record_allocations(stage, snapshot, peak)
+
+    def wrap_worker_call(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Returns the function a parse pool worker runs, profiled in the worker for
+        the first `sample_size` parses.
+
+        Args:
+            func (Callable): The parse function, picklable in process mode.
+
+        Returns:
+            Callable: The function itself, or a picklable wrapper profiling it.
+        """
+        if len(self.worker_profiles) >= self.sample_size:
+            return func
+        path = os.path.join(
+            self.directory, f"{self.WORKER_STAGE}-{len(self.worker_profiles)}.pstats"
+        )
+        self.worker_profiles.append(path)
+        return functools.partial(run_profiled, path, func)
+
+    def _record_allocations(
+        self, stage: str, snapshot: tracemalloc.Snapshot, peak: int
+    ) -> None:
+        """
+        Adds the allocation sites of a profiled run to the totals of its stage.
+
+        Args:
+            stage (str): Name of the stage.
+            snapshot (tracemalloc.Snapshot): Memory held at the end of the run.
+            peak (int): Peak traced memory during the run in bytes.
+        """
+        snapshot = snapshot.filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+        sites = self.allocations.setdefault(stage, Counter())
+        for statistic in snapshot.statistics("lineno"):
+            frame = statistic.traceback[0]
+            sites[f"{frame.filename}:{frame.lineno}"] += statistic.size
+        self.peaks[stage] = max(self.peaks.get(stage, 0), peak)
+
+    async def _monitor_loop(self) -> None:
+        """
+        Samples the event loop lag until stopped.
+        """
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.LAG_INTERVAL)
+            self.last_tick = time.monotonic()
+            lag = max(0.0, self.last_tick - start - self.LAG_INTERVAL)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self) -> None:
+        """
+        Records the stack of the event loop thread while the loop is stalled.
+        Runs in the watchdog thread.
+        """
+        reported_tick = None
+        while not self.stopping.wait(self.LAG_INTERVAL):
+            tick = self.last_tick
+            stalled = time.monotonic() - tick
+            if stalled < self.lag_threshold or tick == reported_tick:
+                continue
+            reported_tick = tick
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.format_stack(frame)
+            if len(self.blocking_calls) < self.MAX_BLOCKING_CALLS:
+                self.blocking_calls.append(
+                    {"stalled_s": round(stalled, 3), "stack": "".join(stack)}
+                )
+            self.logger.warning(
+                f"Event loop blocked for over {stalled * 1000:.0f}ms in "
+                f"{stack[-1].strip().splitlines()[0]}"
+            )
+
+    def get_lag_stats(self) -> Dict[str, Any]:
+        """
+        Returns statistics of the sampled event loop lag.
+
+        Returns:
+            dict: Sample count, mean, median, 99th percentile and maximum lag in
+                seconds, and the blocking calls.
+        """
+        lags = sorted(self.lags)
+        if not lags:
+            return {"samples": 0, "blocking_calls": self.blocking_calls}
+        return {
+            "samples": len(lags),
+            "interval_s": self.LAG_INTERVAL,
+            "mean_s": round(sum(lags) / len(lags), 4),
+            "p50_s": round(lags[len(lags) // 2], 4),
+            "p99_s": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 4),
+            "max_s": round(self.max_lag, 4),
+            "blocking_calls": self.blocking_calls,
+        }
+
+    async def stop(self) -> None:
+        """
+        Stops sampling the event loop lag and writes a .pstats file per stage, the
+        top allocation sites per stage and the event loop lag statistics.
+        """
+        self.stopping.set()
+        if self.monitor_task is not None:
+            pending_lag = time.monotonic() - self.last_tick - self.LAG_INTERVAL
+            if pending_lag > 0:
+                self.lags.append(pending_lag)
+                self.max_lag = max(self.max_lag, pending_lag)
+            self.monitor_task.cancel()
+            try:
+                await self.monitor_task
+            except asyncio.CancelledError:
+                pass
+            self.monitor_task = None
+        if self.watchdog is not None:
+            self.watchdog.join()
+            self.watchdog = None
+        try:
+            await asyncio.to_thread(self._dump)
+        except OSError as e:
+            self.logger.warning(f"Could not save the profiles: {e}")
+
+    def _dump(self) -> None:
+        """
+        Writes the collected profiles and statistics to the profile directory.
+        """
+        for stage, profiler in self.profiles.items():
+            profiler.dump_stats(os.path.join(self.directory, f"{stage}.pstats"))
+        worker_profiles = [
+            path for path in self.worker_profiles if os.path.exists(path)
+        ]
+        if worker_profiles:
+            pstats.Stats(*worker_profiles).dump_stats(
+                os.path.join(self.directory, f"{self.WORKER_STAGE}.pstats")
+            )
+            for path in worker_profiles:
+                os.remove(path)
+        allocations = {
+            stage: {
+                "samples": self.samples[stage],
+                "peak_traced_bytes": self.peaks.get(stage, 0),
+                "top_sites": [
+                    {"site": site, "bytes": size}
+                    for site, size in sites.most_common(self.TOP_ALLOCATIONS)
+                ],
+            }
+            for stage, sites in self.allocations.items()
+        }
+        with open(
+            os.path.join(self.directory, "allocations.json"), "w", encoding="utf-8"
+        ) as f:
+            json.dump(allocations, f, indent=2)
+        lag_stats = self.get_lag_stats()
+        with open(
+            os.path.join(self.directory, "loop_lag.json"), "w", encoding="utf-8"
+        ) as f:
+            json.dump(lag_stats, f, indent=2)
+        self.logger.info(
+            f"Profiles saved to '{self.directory}': "
+            f"{', '.join(sorted(self.profiles)) or 'no stages'}; event loop lag "
+            f"p99 {lag_stats.get('p99_s', 0) * 1000:.0f}ms, "
+            f"max {lag_stats.get('max_s', 0) * 1000:.0f}ms, "
+            f"{len(self.blocking_calls)} blocking calls"
+        )
@@ -0,0 +1,697 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from urllib.parse import quote
+
+import pandas as pd
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.spreadsheet.sinks.sqlite_output_sink import SqliteOutputSink
+from services.spreadsheet.spreadsheet_service import SpreadsheetService
+
+Filter = Tuple[str, str, Any]
+Aggregate = Tuple[str, Optional[str]]
+
+
+class QueryIndexRecorder:
+    """
+    Stands in for the spreadsheet while a file is processed, forwarding its rows
+    to the target and staging them in the query index.
+
+    Attributes:
+        query_index (QueryIndex): The index the rows are staged in.
+        file (dict): The file metadata.
+        target (Any): The spreadsheet, or the recorder standing in for it.
+        origin_column_name (str): Name of the origin column.
+    """
+
+    def __init__(
+        self, query_index: "QueryIndex", file: Dict[str, Any], target: Any
+    ) -> None:
+        """
+        Initializes the QueryIndexRecorder for a file.
+
+        Args:
+            query_index (QueryIndex): The index the rows are staged in.
+            file (dict): The file metadata.
+            target (Any): The spreadsheet, or the recorder standing in for it.
+        """
+        self.query_index = query_index
+        self.file = file
+        self.target = target
+        self.origin_column_name: str = target.origin_column_name
+
+    def add_batch(self, batch: pd.DataFrame) -> None:
+        """
+        Adds a batch of rows to the target and stages it in the index.
+
+        Args:
+            batch (pd.DataFrame): Rows aligned to the output header.
+        """
+        self.target.add_batch(batch)
+        self.query_index.stage(self.file, batch)
+
+
+class QueryIndex:
+    """
+    SQLite copy of the consolidated rows, with an index on every configured column
+    and on the origin column, so lookups, filters and aggregations take
+    milliseconds instead of opening the output.
+
+    The index is updated per origin file: the rows of each file processed in a
+    run are staged while it is parsed, and once the output is saved they replace
+    the rows of that origin, while the origins removed from the output are
+    dropped. When the index does not match the previous output, such as on first
+    use or after a failed update, it is rebuilt from the saved output. Every
+    write, from staging to the final update, runs in a writer thread, so large
+    files and rebuilds do not stall the event loop; once a file is processed,
+    drain waits until at most MAX_PENDING_WRITES writes are queued. A failed
+    write is logged and leaves the index out of sync, to be rebuilt from the
+    output, instead of failing the run.
+
+    Queries take the column names from the index, so they can run in another
+    process on an index opened read-only, even while a run updates the index.
+
+    Attributes:
+        path (str): Path of the index database.
+        header (List[str]): Column names, including the origin column.
+        origin_column_name (str): Name of the origin column.
+        fingerprint (str): Fingerprint of the header.
+        in_sync (bool): Whether the index matched the output when the run began.
+        read_only (bool): Whether the index is only opened for queries.
+        connection (sqlite3.Connection): Connection to the index database.
+        writer (Optional[ThreadPoolExecutor]): Thread staging the rows, unless
+            read-only.
+        pending (List[Future]): Writes submitted to the writer thread and not
+            yet waited for.
+        write_failed (bool): Whether a write of the run failed, so the staged
+            rows are incomplete.
+        logger (Logger): Logger instance.
+    """
+
+    TABLE = "rows"
+    STAGED_ROWS = "staged_rows"
+    STAGED_FILES = "staged_files"
+    FILE_ID = "_file_id"
+    INSERT_BATCH_ROWS = 50_000
+    MAX_PENDING_WRITES = 8
+    OPERATORS = {
+        "=": "=",
+        "!=": "!=",
+        "<": "<",
+        "<=": "<=",
+        ">": ">",
+        ">=": ">=",
+        "~": "LIKE",
+    }
+    AGGREGATES = ("count", "sum", "avg", "min", "max")
+    FILTER_PATTERN = re.compile(r"\s*(.+?)\s*(!=|<=|>=|=|<|>|~)\s*(.*?)\s*")
+    quote = staticmethod(SqliteOutputSink.quote)
+
+    def __init__(
+        self,
+        path: str,
+        settings: Settings,
+        logger: LoggerConfig,
+        read_only: bool = False,
+    ) -> None:
+        """
+        Initializes the QueryIndex and opens its database, creating it if needed
+        unless it is opened read-only.
+
+        Args:
+            path (str): Path of the index database.
+            settings (Settings): Application settings.
+            logger (LoggerConfig): Logger configuration.
+            read_only (bool): Whether to open an existing index for queries only.
+
+        Raises:
+            sqlite3.Error: If a read-only index cannot be opened.
+        """
+        self.path: str = path
+        self.header: List[str] = settings.columns + [settings.origin_column_name]
+        self.origin_column_name: str = settings.origin_column_name
+        self.fingerprint: str = hashlib.sha256(
+            json.dumps(self.header).encode("utf-8")
+        ).hexdigest()
+        self.in_sync: bool = False
+        self.read_only: bool = read_only
+        self.writer: Optional[ThreadPoolExecutor] = None
+        self.pending: List[Future] = []
+        self.write_failed: bool = False
+        self.logger = logger.get_logger(__name__)
+        if read_only:
+            self.connection = sqlite3.connect(
+                f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True
+            )
+            return
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="query-index"
+        )
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        """
+        Returns a value of the meta table.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            Optional[str]: The value, or None if unset.
+        """
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        """
+        Sets a value of the meta table, within the caller's transaction.
+
+        Args:
+            key (str): The key.
+            value (str): The value.
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    @staticmethod
+    def _describe_output(filename: str) -> str:
+        """
+        Describes the version of an output file by its size and modification time.
+
+        Args:
+            filename (str): The output file.
+
+        Returns:
+            str: The description, or an empty string if the file does not exist.
+        """
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return ""
+        return json.dumps([os.path.abspath(filename), stat.st_size, stat.st_mtime_ns])
+
+    async def begin_run(self, output_filename: str) -> None:
+        """
+        Prepares the index for a run in the writer thread: recreates it when the
+        columns changed, discards rows staged by an interrupted run and checks
+        whether it matches the current output.
+
+        Args:
+            output_filename (str): The output the index mirrors.
+        """
+        await self._run(self._begin_run, output_filename)
+
+    def _begin_run(self, output_filename: str) -> None:
+        """
+        Prepares the index for a run. Runs in the writer thread.
+
+        Args:
+            output_filename (str): The output the index mirrors.
+        """
+        self.write_failed = False
+        columns = ", ".join(self.quote(name) for name in self.header)
+        with self.connection:
+            if self._get_meta("fingerprint") != self.fingerprint:
+                self.connection.execute(
+                    f"DROP TABLE IF EXISTS {self.quote(self.TABLE)}"
+                )
+                self.connection.execute("DELETE FROM meta")
+                self._set_meta("fingerprint", self.fingerprint)
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.quote(self.TABLE)} ({columns})"
+            )
+            self.connection.execute(f"DROP TABLE IF EXISTS {self.STAGED_ROWS}")
+            self.connection.execute(f"DROP TABLE IF EXISTS {self.STAGED_FILES}")
+            self.connection.execute(
+                f"CREATE TABLE {self.STAGED_ROWS} ({self.FILE_ID}, {columns})"
+            )
+            self.connection.execute(
+                f"CREATE TABLE {self.STAGED_FILES} (file_id TEXT PRIMARY KEY, origin)"
+            )
+        self._create_indexes()
+        self.in_sync = self._get_meta("output") == self._describe_output(
+            output_filename
+        )
+
+    def _create_indexes(self) -> None:
+        """
+        Creates an index on every column of the rows table.
+        """
+        with self.connection:
+            for i, name in enumerate(self.header):
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_rows_{i} "
+                    f"ON {self.quote(self.TABLE)} ({self.quote(name)})"
+                )
+
+    def _drop_indexes(self) -> None:
+        """
+        Drops the column indexes, so the whole table is reloaded faster.
+        """
+        with self.connection:
+            for i in range(len(self.header)):
+                self.connection.execute(f"DROP INDEX IF EXISTS idx_rows_{i}")
+
+    def record(self, file: Dict[str, Any], target: Any) -> QueryIndexRecorder:
+        """
+        Returns the recorder the rows of a file go through.
+
+        Args:
+            file (dict): The file metadata.
+            target (Any): The spreadsheet, or the recorder standing in for it.
+
+        Returns:
+            QueryIndexRecorder: The recorder standing in for the target.
+        """
+        return QueryIndexRecorder(self, file, target)
+
+    def _submit(self, func: Callable[..., None], *args: Any) -> None:
+        """
+        Queues a write in the writer thread.
+
+        Args:
+            func (Callable[..., None]): The write.
+            *args: Arguments of the write.
+        """
+        self.pending.append(self.writer.submit(self._write, func, *args))
+
+    def _write(self, func: Callable[..., None], *args: Any) -> None:
+        """
+        Runs a queued write, logging its failure. Writes are skipped once one
+        failed, as the staged rows are then incomplete. Runs in the writer thread.
+
+        Args:
+            func (Callable[..., None]): The write.
+            *args: Arguments of the write.
+        """
+        if self.write_failed:
+            return
+        try:
+            func(*args)
+        except Exception as e:
+            self.write_failed = True
+            self.logger.error(
+                f"Error staging rows in the query index, it will be rebuilt from "
+                f"the output: {e}"
+            )
+
+    async def _run(self, func: Callable[..., None], *args: Any) -> None:
+        """
+        Runs a call in the writer thread, after the queued writes, and waits for
+        it.
+
+        Args:
+            func (Callable[..., None]): The call.
+            *args: Arguments of the call.
+        """
+        self.pending = []
+        await asyncio.wrap_future(self.writer.submit(func, *args))
+
+    async def drain(self) -> None:
+        """
+        Waits until at most MAX_PENDING_WRITES writes are queued in the writer
+        thread.
+        """
+        self.pending = [future for future in self.pending if not future.done()]
+        while len(self.pending) > self.MAX_PENDING_WRITES:
+            await asyncio.wrap_future(self.pending.pop(0))
+
+    def stage(self, file: Dict[str, Any], batch: pd.DataFrame) -> None:
+        """
+        Stages a batch of rows of a file until the output is saved. The rows are
+        inserted by the writer thread.
+
+        Args:
+            file (dict): The file metadata.
+            batch (pd.DataFrame): Rows aligned to the output header.
+        """
+        self._submit(self._stage, file["id"], batch)
+
+    def _stage(self, file_id: str, batch: pd.DataFrame) -> None:
+        """
+        Inserts a batch of staged rows. Runs in the writer thread.
+
+        Args:
+            file_id (str): The driveItem ID of the file.
+            batch (pd.DataFrame): Rows aligned to the output header.
+        """
+        batch = batch.astype(object).where(batch.notna(), None)
+        placeholders = ", ".join("?" for _ in range(len(self.header) + 1))
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT INTO {self.STAGED_ROWS} VALUES ({placeholders})",
+                (
+                    (file_id, *map(SqliteOutputSink.to_sql_value, row))
+                    for row in batch.itertuples(index=False, name=None)
+                ),
+            )
+
+    def complete(self, file: Dict[str, Any], success: bool) -> None:
+        """
+        Marks the staged rows of a processed file as ready to replace its origin,
+        or discards them when the file failed. Used as a completion callback of
+        the scheduler; the update runs in the writer thread after the rows.
+
+        Args:
+            file (dict): The file metadata.
+            success (bool): Whether the file was processed successfully.
+        """
+        self._submit(
+            self._complete, file["id"], SpreadsheetService.get_origin(file), success
+        )
+
+    def _complete(self, file_id: str, origin: str, success: bool) -> None:
+        """
+        Marks or discards the staged rows of a file. Runs in the writer thread.
+
+        Args:
+            file_id (str): The driveItem ID of the file.
+            origin (str): The origin of the rows of the file.
+            success (bool): Whether the file was processed successfully.
+        """
+        with self.connection:
+            if success:
+                self.connection.execute(
+                    f"INSERT OR REPLACE INTO {self.STAGED_FILES} VALUES (?, ?)",
+                    (file_id, origin),
+                )
+            else:
+                self.connection.execute(
+                    f"DELETE FROM {self.STAGED_ROWS} WHERE {self.FILE_ID} = ?",
+                    (file_id,),
+                )
+
+    async def finish(
+        self,
+        output_filename: str,
+        removed_origins: Optional[Collection[str]],
+        read_output: Callable[[], Iterable[Sequence[Any]]],
+    ) -> None:
+        """
+        Applies the rows of the run in the writer thread once the output is saved.
+        The staged files replace the rows of their origin and the removed origins
+        are dropped; after a full run the staged files replace every row. An
+        incremental run on an index that did not match the previous output, or
+        whose staging failed, rebuilds it from the saved output instead.
+
+        A failed update is logged and leaves the index out of sync, so the next
+        run rebuilds it, without failing this one.
+
+        Args:
+            output_filename (str): The saved output.
+            removed_origins (Optional[Collection[str]]): Origins dropped from the
+                previous output by an incremental run, or None after a full run.
+            read_output (Callable[[], Iterable[Sequence]]): Reads the rows of the
+                saved output, each fitted to the header.
+        """
+        try:
+            await self._run(self._finish, output_filename, removed_origins, read_output)
+        except Exception as e:
+            self.in_sync = False
+            self.logger.error(
+                f"Error updating the query index, it will be rebuilt from the "
+                f"output on the next run: {e}"
+            )
+
+    def _finish(
+        self,
+        output_filename: str,
+        removed_origins: Optional[Collection[str]],
+        read_output: Callable[[], Iterable[Sequence[Any]]],
+    ) -> None:
+        """
+        Applies the rows of the run. Runs in the writer thread.
+
+        Args:
+            output_filename (str): The saved output.
+            removed_origins (Optional[Collection[str]]): Origins dropped from the
+                previous output by an incremental run, or None after a full run.
+            read_output (Callable[[], Iterable[Sequence]]): Reads the rows of the
+                saved output, each fitted to the header.
+        """
+        if self.write_failed:
+            self.in_sync = False
+            removed_origins = removed_origins or set()
+            self.write_failed = False
+        table = self.quote(self.TABLE)
+        origin = self.quote(self.origin_column_name)
+        columns = ", ".join(self.quote(name) for name in self.header)
+        staged = (
+            f"SELECT {columns} FROM {self.STAGED_ROWS} WHERE {self.FILE_ID} IN "
+            f"(SELECT file_id FROM {self.STAGED_FILES})"
+        )
+        if removed_origins is None or not self.in_sync:
+            self._drop_indexes()
+        with self.connection:
+            if removed_origins is None:
+                self.connection.execute(f"DELETE FROM {table}")
+                self.connection.execute(f"INSERT INTO {table} {staged}")
+            elif self.in_sync:
+                self.connection.executemany(
+                    f"DELETE FROM {table} WHERE {origin} = ?",
+                    ((name,) for name in removed_origins),
+                )
+                self.connection.execute(
+                    f"DELETE FROM {table} WHERE {origin} IN "
+                    f"(SELECT origin FROM {self.STAGED_FILES})"
+                )
+                self.connection.execute(f"INSERT INTO {table} {staged}")
+            else:
+                self.logger.info("Rebuilding the query index from the output")
+                self.connection.execute(f"DELETE FROM {table}")
+                self._insert_rows(read_output())
+            self.connection.execute(f"DELETE FROM {self.STAGED_ROWS}")
+            self.connection.execute(f"DELETE FROM {self.STAGED_FILES}")
+            self._set_meta("output", self._describe_output(output_filename))
+        self._create_indexes()
+        self.in_sync = True
+        row_count = self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        self.logger.info(f"Query index updated with {row_count[0]} rows")
+
+    def _insert_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        """
+        Inserts rows fitted to the header in bulk, within the caller's transaction.
+
+        Args:
+            rows (Iterable[Sequence]): Data values followed by the origin.
+        """
+        placeholders = ", ".join("?" for _ in self.header)
+        insert_sql = f"INSERT INTO {self.quote(self.TABLE)} VALUES ({placeholders})"
+        buffer: List[Tuple[Any, ...]] = []
+        for row in rows:
+            buffer.append(tuple(map(SqliteOutputSink.to_sql_value, row)))
+            if len(buffer) >= self.INSERT_BATCH_ROWS:
+                self.connection.executemany(insert_sql, buffer)
+                buffer = []
+        self.connection.executemany(insert_sql, buffer)
+
+    def get_columns(self) -> List[str]:
+        """
+        Returns the column names of the indexed rows.
+
+        Returns:
+            List[str]: The column names, ending with the origin column.
+
+        Raises:
+            ValueError: If the index holds no rows table yet.
+        """
+        columns = [
+            row[1]
+            for row in self.connection.execute(
+                f"PRAGMA table_info({self.quote(self.TABLE)})"
+            )
+        ]
+        if not columns:
+            raise ValueError(
+                f"The query index '{self.path}' is empty; run the consolidation "
+                "with query_index_file set first"
+            )
+        return columns
+
+    def query(
+        self,
+        where: Sequence[Filter] = (),
+        select: Sequence[str] = (),
+        group_by: Sequence[str] = (),
+        aggregates: Sequence[Aggregate] = (),
+        order_by: Sequence[str] = (),
+        limit: Optional[int] = None,
+    ) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        """
+        Queries the indexed rows.
+
+        Args:
+            where (Sequence[Filter]): Conditions as (column, operator, value)
+                tuples, all of which must hold. Operators are =, !=, <, <=, >, >=
+                and ~ for SQL LIKE patterns. Text values that look like numbers
+                are compared as numbers on columns holding numbers.
+            select (Sequence[str]): Columns to return; all when empty. Ignored when
+                grouping or aggregating.
+            group_by (Sequence[str]): Columns to group the rows by.
+            aggregates (Sequence[Aggregate]): Aggregations as (function, column)
+                tuples, with count, sum, avg, min or max; count takes no column.
+            order_by (Sequence[str]): Result columns to sort by, suffixed with
+                ':desc' for descending order.
+            limit (Optional[int]): Maximum number of rows returned.
+
+        Returns:
+            Tuple[List[str], List[tuple]]: The result column names and rows.
+
+        Raises:
+            ValueError: If a column, operator or aggregation is unknown.
+        """
+        columns = self.get_columns()
+        known = set(columns)
+
+        def check(name: str) -> str:
+            if name not in known:
+                raise ValueError(f"Unknown column: {name}")
+            return self.quote(name)
+
+        if group_by or aggregates:
+            names = list(group_by)
+            expressions = [check(name) for name in group_by]
+            for function, column in aggregates:
+                function = function.lower()
+                if function not in self.AGGREGATES:
+                    raise ValueError(f"Unknown aggregation: {function}")
+                if column is None and function != "count":
+                    raise ValueError(f"The {function} aggregation needs a column")
+                argument = "*" if column is None else check(column)
+                names.append(function if column is None else f"{function}({column})")
+                expressions.append(f"{function.upper()}({argument})")
+        else:
+            names = list(select) or columns
+            expressions = [check(name) for name in names]
+
+        sql = "SELECT " + ", ".join(
+            f"{expression} AS {self.quote(name)}"
+            for expression, name in zip(expressions, names)
+        )
+        sql += f" FROM {self.quote(self.TABLE)}"
+        parameters: List[Any] = []
+        if where:
+            conditions = []
+            for column, operator, value in where:
+                if operator not in self.OPERATORS:
+                    raise ValueError(f"Unknown operator: {operator}")
+                conditions.append(f"{check(column)} {self.OPERATORS[operator]} ?")
+                if isinstance(value, str) and operator != "~":
+                    value = self._coerce(column, value)
+                parameters.append(value)
+            sql += " WHERE " + " AND ".join(conditions)
+        if group_by:
+            sql += " GROUP BY " + ", ".join(self.quote(name) for name in group_by)
+        if order_by:
+            orders = []
+            for order in order_by:
+                name, _, direction = order.rpartition(":")
+                if direction.lower() not in ("asc", "desc"):
+                    name, direction = order, "asc"
+                if name not in names:
+                    raise ValueError(f"Cannot sort by {name}, not in the result")
+                orders.append(f"{self.quote(name)} {direction.upper()}")
+            sql += " ORDER BY " + ", ".join(orders)
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(max(0, limit))
+        return names, self.connection.execute(sql, parameters).fetchall()
+
+    def _coerce(self, column: str, value: str) -> Any:
+        """
+        Converts a condition value to a number when the column holds numbers, so
+        '100' matches 100 while '001' still matches the text '001' elsewhere.
+
+        Args:
+            column (str): The column the value is compared with.
+            value (str): The value as written in the condition.
+
+        Returns:
+            Any: The value as an int or float, or unchanged.
+        """
+        # NULLs sort before numbers and numbers before text, so the smallest
+        # non-NULL value, read from the column index, is a number if any is.
+        row = self.connection.execute(
+            f"SELECT typeof({self.quote(column)}) FROM {self.quote(self.TABLE)} "
+            f"WHERE {self.quote(column)} IS NOT NULL "
+            f"ORDER BY {self.quote(column)} LIMIT 1"
+        ).fetchone()
+        if not row or row[0] not in ("integer", "real"):
+            return value
+        for convert in (int, float):
+            try:
+                return convert(value)
+            except ValueError:
+                pass
+        return value
+
+    @classmethod
+    def parse_filter(cls, expression: str) -> Filter:
+        """
+        Parses a condition such as 'status=open', 'amount>=100' or 'name~%acme%'.
+        Values are kept as text; queries compare them as numbers on columns
+        holding numbers.
+
+        Args:
+            expression (str): The condition.
+
+        Returns:
+            Filter: The (column, operator, value) tuple.
+
+        Raises:
+            ValueError: If the condition is malformed.
+        """
+        match = cls.FILTER_PATTERN.fullmatch(expression)
+        if not match:
+            raise ValueError(f"Invalid condition: {expression}")
+        column, operator, value = match.groups()
+        return column, operator, value
+
+    @classmethod
+    def parse_aggregate(cls, expression: str) -> Aggregate:
+        """
+        Parses an aggregation such as 'count' or 'sum:amount'.
+
+        Args:
+            expression (str): The aggregation.
+
+        Returns:
+            Aggregate: The (function, column) tuple.
+        """
+        function, _, column = expression.partition(":")
+        return function.strip().lower(), column.strip() or None
+
+    def close(self) -> None:
+        """
+        Waits for the writer thread and closes the index database.
+        """
+        if self.writer:
+            self.writer.shutdown(wait=True)
+        self.connection.close()
@@ -1,10 +1,27 @@
-from typing import Any, Dict, Optional
-from urllib.parse import quote
+import asyncio
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+)
+from urllib.parse import quote, unquote
 
 import aiohttp
 
+from auth.authentication import AuthenticationService
 from config.logger_config import LoggerConfig
 from config.settings import Settings
+from services.http.graph_batch_client import GraphBatchClient
+from services.http.retry_policy import RetryPolicy
+from services.spreadsheet.spreadsheet_service import SpreadsheetService
+from services.state.state_store import StateStore
 
 from ..base.base_service import BaseService
 
@@ -16,34 +33,95 @@ class SharePointFolderService(BaseService):
     Attributes:
         sharepoint_host (str): SharePoint host URL.
         sharepoint_site (str): SharePoint site name.
+        drive_name (str): Name of the document library, or an empty string for the
+            default document library of the site.
+        resolution_cache_ttl (int): Seconds resolved site and drive IDs are reused.
+        graph_url (str): Base URL of the Graph API version.
+        state_store (Optional[StateStore]): Store persisting resolved IDs between
+            runs.
+        resolved (Dict[str, dict]): Resolved IDs with their resolution time, keyed
+            by what was resolved.
+        list_page_size (int): Number of items requested per listing page ($top).
+        list_select (str): Item properties requested in listings ($select).
+        list_recursive (bool): Whether listings descend into subfolders.
+        list_max_concurrency (int): Maximum number of folders listed concurrently.
+        batch_client (Optional[GraphBatchClient]): Client grouping concurrent GET
+            requests into Graph $batch requests.
         logger (Logger): Logger instance.
     """
 
+    RESOLUTION_STATE_KEY = "resolution"
+    # Graph only returns the deleted facet marking removed items when selected.
+    DELTA_SELECT = ("deleted",)
+
     def __init__(
-        self, access_token: str, settings: Settings, logger: LoggerConfig
+        self,
+        auth_service: AuthenticationService,
+        session: aiohttp.ClientSession,
+        settings: Settings,
+        logger: LoggerConfig,
+        batch_client: Optional[GraphBatchClient] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        state_store: Optional[StateStore] = None,
     ) -> None:
         """
-        Initializes the SharePointFolderService with access token, settings, and logger.
+        Initializes the SharePointFolderService with authentication service, HTTP
+        session, settings, and logger.
 
         Args:
-            access_token (str): Access token for authentication.
+            auth_service (AuthenticationService): Provides the current access token.
+            session (aiohttp.ClientSession): Shared HTTP client session.
             settings (Settings): Application settings.
             logger (LoggerConfig): Logger configuration.
+            batch_client (Optional[GraphBatchClient]): Client grouping concurrent
+                GET requests into Graph $batch requests.
+            retry_policy (Optional[RetryPolicy]): Policy retrying throttled and
+                transiently failing requests.
+            state_store (Optional[StateStore]): Store persisting resolved IDs
+                between runs.
         """
-        super().__init__(access_token)
+        super().__init__(auth_service, session, retry_policy)
         self.sharepoint_host: str = settings.sharepoint_host
         self.sharepoint_site: str = settings.sharepoint_site
+        self.drive_name: str = settings.drive_name
+        self.resolution_cache_ttl: int = settings.resolution_cache_ttl_s
+        self.graph_url: str = settings.graph_base_url
+        self.state_store = state_store
+        self.resolved: Dict[str, Dict[str, Any]] = dict(
+            (state_store.get(self.RESOLUTION_STATE_KEY) if state_store else None) or {}
+        )
+        self.list_page_size: int = settings.list_page_size
+        self.list_select: str = settings.list_select
+        self.list_recursive: bool = settings.list_recursive
+        self.list_max_concurrency: int = max(1, settings.list_max_concurrency)
+        self.batch_client = batch_client
         self.logger = logger.get_logger(__name__)
 
-    def get_headers(self) -> Dict[str, str]:
+    async def make_request(self, method: str, url: str) -> Optional[Dict[str, Any]]:
         """
-        Returns the headers for the HTTP request.
+        Makes an HTTP request, sending GET requests through the batch client when
+        batching is enabled, so concurrent folder listings share round trips.
+
+        Args:
+            method (str): HTTP method (e.g., 'GET', 'POST').
+            url (str): URL for the request.
+
+        Returns:
+            Optional[dict]: JSON response from the request, or None if it failed.
+        """
+        if self.batch_client and method == "GET":
+            return await self.batch_client.request(method, url)
+        return await super().make_request(method, url)
+
+    async def get_headers(self) -> Dict[str, str]:
+        """
+        Returns the headers for the HTTP request, with the current access token.
 
         Returns:
             dict: Headers for the request.
         """
         return {
-            "Authorization": f"Bearer {self.access_token}",
+            "Authorization": f"Bearer {await self.auth_service.get_access_token()}",
             "Accept": "application/json",
         }
 
@@ -67,18 +145,20 @@ class SharePointFolderService(BaseService):
 
     async def get_site_id(self) -> Optional[str]:
         """
-        Fetches the SharePoint site ID.
+        Fetches the SharePoint site ID, reusing the ID resolved within the
+        resolution cache TTL.
 
         Returns:
             str: SharePoint site ID if found, else None.
         """
-        url = f"https://graph.microsoft.com/v1.0/sites/{self.sharepoint_host}:/sites/{self.sharepoint_site}"
-        site_data = await self.make_request("GET", url)
-        return site_data["id"] if site_data else None
+        return await self._resolve(
+            f"site:{self.sharepoint_host}/{self.sharepoint_site}", self._fetch_site_id
+        )
 
     async def get_drive_id(self, site_id: str) -> Optional[str]:
         """
-        Fetches the drive ID for the specified site ID.
+        Fetches the ID of the configured drive of the site, reusing the ID resolved
+        within the resolution cache TTL.
 
         Args:
             site_id (str): SharePoint site ID.
@@ -86,28 +166,381 @@ class SharePointFolderService(BaseService):
         Returns:
             str: Drive ID if found, else None.
         """
-        url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drives"
+        return await self._resolve(
+            f"drive:{site_id}/{self.drive_name}", lambda: self._fetch_drive_id(site_id)
+        )
+
+    async def get_folder_id(self, drive_id: str, sharepoint_path: str) -> Optional[str]:
+        """
+        Fetches the item ID of a folder of the drive, reusing the ID resolved within
+        the resolution cache TTL.
+
+        Args:
+            drive_id (str): Drive ID.
+            sharepoint_path (str): Path to the SharePoint folder; empty for the
+                drive root.
+
+        Returns:
+            str: Folder item ID if found, else None.
+        """
+        folder = unquote(sharepoint_path).strip("/")
+        return await self._resolve(
+            f"folder:{drive_id}/{folder}",
+            lambda: self._fetch_folder_id(drive_id, folder),
+        )
+
+    async def _fetch_site_id(self) -> Optional[str]:
+        """
+        Requests the SharePoint site ID.
+
+        Returns:
+            Optional[str]: SharePoint site ID if found, else None.
+        """
+        url = f"{self.graph_url}/sites/{self.sharepoint_host}:/sites/{self.sharepoint_site}?$select=id"
+        site_data = await self.make_request("GET", url)
+        return site_data["id"] if site_data else None
+
+    async def _fetch_drive_id(self, site_id: str) -> Optional[str]:
+        """
+        Requests the drive ID, from the default document library of the site when it
+        is the configured drive, and only otherwise from the list of its drives.
+
+        Args:
+            site_id (str): SharePoint site ID.
+
+        Returns:
+            Optional[str]: Drive ID if found, else None.
+        """
+        url = f"{self.graph_url}/sites/{site_id}/drive?$select=id,name"
+        drive = await self.make_request("GET", url)
+        if drive and (not self.drive_name or drive["name"] == self.drive_name):
+            return drive["id"]
+        if not self.drive_name:
+            return None
+        url = f"{self.graph_url}/sites/{site_id}/drives?$select=id,name"
         drives_data = await self.make_request("GET", url)
         if drives_data:
             for drive in drives_data["value"]:
-                if drive["name"] == "Documentos":
+                if drive["name"] == self.drive_name:
                     return drive["id"]
-            self.logger.error("Drive 'Documentos' not found")
+            self.logger.error(f"Drive '{self.drive_name}' not found")
         return None
 
+    async def _fetch_folder_id(self, drive_id: str, folder: str) -> Optional[str]:
+        """
+        Requests the item ID of a folder of the drive.
+
+        Args:
+            drive_id (str): Drive ID.
+            folder (str): Decoded path to the folder; empty for the drive root.
+
+        Returns:
+            Optional[str]: Folder item ID if found, else None.
+        """
+        url = f"{self.graph_url}/drives/{drive_id}/root"
+        if folder:
+            url += f":/{quote(folder)}"
+        item = await self.make_request("GET", f"{url}?$select=id")
+        return item["id"] if item else None
+
+    async def _resolve(
+        self, key: str, fetch: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """
+        Returns a resolved ID from the resolution cache, or fetches and caches it
+        when it is missing or older than the TTL.
+
+        Args:
+            key (str): What is resolved.
+            fetch (Callable[[], Awaitable[Optional[str]]]): Requests the ID.
+
+        Returns:
+            Optional[str]: The ID, or None if it could not be resolved.
+        """
+        now = time.time()
+        entry = self.resolved.get(key)
+        if entry and now - entry["resolved_at"] < self.resolution_cache_ttl:
+            return entry["id"]
+        resolved_id = await fetch()
+        if resolved_id and self.resolution_cache_ttl > 0:
+            self.resolved = {
+                cached_key: cached
+                for cached_key, cached in self.resolved.items()
+                if now - cached["resolved_at"] < self.resolution_cache_ttl
+            }
+            self.resolved[key] = {"id": resolved_id, "resolved_at": now}
+            if self.state_store:
+                self.state_store.set(self.RESOLUTION_STATE_KEY, self.resolved)
+        return resolved_id
+
     async def get_files(
         self, drive_id: str, sharepoint_path: str
     ) -> Optional[Dict[str, Any]]:
         """
-        Fetches the files from the specified SharePoint path.
+        Fetches all the files from the specified SharePoint path.
 
         Args:
             drive_id (str): Drive ID.
             sharepoint_path (str): Path to the SharePoint folder.
 
         Returns:
-            dict: JSON response containing the files.
+            dict: Response-shaped dictionary with the files under the "value" key.
+        """
+        files = [file async for file in self.iter_files(drive_id, sharepoint_path)]
+        return {"value": files}
+
+    async def iter_files(
+        self,
+        drive_id: str,
+        sharepoint_path: str,
+        recursive: Optional[bool] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
         """
+        Streams the files from the specified SharePoint path, following
+        "@odata.nextLink" so no page is lost. Files are yielded as soon as their
+        page arrives.
+
+        Args:
+            drive_id (str): Drive ID.
+            sharepoint_path (str): Path to the SharePoint folder.
+            recursive (Optional[bool]): Whether to descend into subfolders. Defaults
+                to the configured value.
+
+        Yields:
+            dict: File item metadata.
+
+        Raises:
+            RuntimeError: If a listing page or folder could not be fetched.
+        """
+        if recursive is None:
+            recursive = self.list_recursive
         encoded_sharepoint_path = quote(sharepoint_path)
-        url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root:/{encoded_sharepoint_path}:/children"
-        return await self.make_request("GET", url)
+        url = self._with_listing_params(
+            f"{self.graph_url}/drives/{drive_id}/root:/{encoded_sharepoint_path}:/children"
+        )
+        if not recursive:
+            async for item in self._iter_pages(url):
+                if "file" in item:
+                    yield item
+            return
+        async for item in self._iter_tree(drive_id, url):
+            yield item
+
+    async def get_delta_changes(
+        self,
+        drive_id: str,
+        sharepoint_path: str,
+        delta_link: Optional[str] = None,
+        recursive: Optional[bool] = None,
+        folders: Optional[Dict[str, List[str]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetches the changes made under the SharePoint path since the delta link was
+        issued. Without a delta link, every file under the path is returned.
+
+        Delta queries are only supported on the drive root in SharePoint, so the
+        drive-wide changes are filtered down to the configured folder. Delta items
+        carry the ID of their parent but not its path, so items are matched on the
+        ID of the folder and, when recursive, of its subfolders; subfolders that
+        did not change since the delta link are only known from `folders`. Files
+        in subfolders get their path relative to the folder as their origin.
+
+        Args:
+            drive_id (str): Drive ID.
+            sharepoint_path (str): Path to the SharePoint folder.
+            delta_link (Optional[str]): Delta link returned by a previous call.
+            recursive (Optional[bool]): Whether changes in subfolders are included.
+                Defaults to the configured value.
+            folders (Optional[Dict[str, List[str]]]): Parent ID and name of each
+                subfolder, as returned by the call that issued the delta link.
+
+        Returns:
+            dict: Dictionary with the added or changed file items under "files", the
+                IDs of items that were deleted or moved out of the folder under
+                "removed", the parent ID and name of each subfolder under "folders"
+                and the new delta link under "delta_link"; None if the folder could
+                not be resolved or the delta query failed (for example because the
+                delta link expired).
+        """
+        if recursive is None:
+            recursive = self.list_recursive
+        root_id = await self.get_folder_id(drive_id, sharepoint_path)
+        if not root_id:
+            return None
+        url: Optional[str] = delta_link or self._with_listing_params(
+            f"{self.graph_url}/drives/{drive_id}/root/delta", self.DELTA_SELECT
+        )
+        file_items: List[Dict[str, Any]] = []
+        removed: List[str] = []
+        known_folders: Dict[str, List[str]] = (
+            dict(folders or {}) if delta_link and recursive else {}
+        )
+        new_delta_link: Optional[str] = None
+        while url:
+            page = await self.make_request("GET", url)
+            if not page:
+                return None
+            for item in page.get("value", []):
+                if "deleted" in item:
+                    removed.append(item["id"])
+                    known_folders.pop(item["id"], None)
+                elif "file" in item:
+                    file_items.append(item)
+                elif recursive and "folder" in item and item["id"] != root_id:
+                    parent_id = item.get("parentReference", {}).get("id")
+                    known_folders[item["id"]] = [parent_id, item.get("name", "")]
+            url = page.get("@odata.nextLink")
+            new_delta_link = page.get("@odata.deltaLink", new_delta_link)
+
+        # Parents may come after their children, so the relative path of each
+        # folder is only worked out once every page has been read.
+        paths: Dict[str, Optional[str]] = {root_id: ""}
+
+        def get_path(folder_id: str) -> Optional[str]:
+            chain: List[str] = []
+            while folder_id not in paths:
+                if folder_id not in known_folders or folder_id in chain:
+                    paths[folder_id] = None
+                    break
+                chain.append(folder_id)
+                folder_id = known_folders[folder_id][0]
+            for child_id in reversed(chain):
+                parent_path = paths[folder_id]
+                paths[child_id] = (
+                    None
+                    if parent_path is None
+                    else f"{parent_path}{known_folders[child_id][1]}/"
+                )
+                folder_id = child_id
+            return paths[folder_id]
+
+        files: List[Dict[str, Any]] = []
+        for item in file_items:
+            parent_path = get_path(item.get("parentReference", {}).get("id", ""))
+            if parent_path is None:
+                removed.append(item["id"])
+                continue
+            if parent_path:
+                item[SpreadsheetService.ORIGIN_KEY] = f"{parent_path}{item['name']}"
+            files.append(item)
+        return {
+            "files": files,
+            "removed": removed,
+            "folders": {
+                folder_id: folder
+                for folder_id, folder in known_folders.items()
+                if get_path(folder_id) is not None
+            },
+            "delta_link": new_delta_link,
+        }
+
+    async def _iter_tree(
+        self, drive_id: str, root_url: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Walks a folder tree, listing up to `list_max_concurrency` folders at once.
+        Files in subfolders get their path relative to the root folder as their
+        origin.
+
+        Args:
+            drive_id (str): Drive ID.
+            root_url (str): Listing URL of the root folder.
+
+        Yields:
+            dict: File item metadata.
+
+        Raises:
+            RuntimeError: If a folder could not be listed, so an incomplete listing
+                is not taken for the whole tree.
+        """
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.list_page_size)
+        semaphore = asyncio.Semaphore(self.list_max_concurrency)
+        tasks: Set[asyncio.Task] = set()
+        active = 0
+
+        async def walk(url: str, prefix: str) -> None:
+            nonlocal active
+            try:
+                async with semaphore:
+                    async for item in self._iter_pages(url):
+                        if "folder" in item:
+                            spawn(
+                                self._with_listing_params(
+                                    f"{self.graph_url}/drives/{drive_id}/items/{item['id']}/children"
+                                ),
+                                f"{prefix}{item['name']}/",
+                            )
+                        elif "file" in item:
+                            if prefix:
+                                item[SpreadsheetService.ORIGIN_KEY] = (
+                                    f"{prefix}{item['name']}"
+                                )
+                            await results.put(item)
+            except Exception as e:
+                self.logger.error(f"Error listing folder {url}: {e}")
+                await results.put(e)
+            finally:
+                active -= 1
+                if active == 0:
+                    await results.put(None)
+
+        def spawn(url: str, prefix: str = "") -> None:
+            nonlocal active
+            active += 1
+            task = asyncio.create_task(walk(url, prefix))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        spawn(root_url)
+        try:
+            while True:
+                item = await results.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for task in list(tasks):
+                task.cancel()
+
+    async def _iter_pages(self, url: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams the items of a paginated listing, following "@odata.nextLink".
+
+        Args:
+            url (str): URL of the first page.
+
+        Yields:
+            dict: Item metadata.
+
+        Raises:
+            RuntimeError: If a page could not be fetched.
+        """
+        next_url: Optional[str] = url
+        while next_url:
+            page = await self.make_request("GET", next_url)
+            if not page:
+                raise RuntimeError(f"Error fetching listing page {next_url}")
+            for item in page.get("value", []):
+                yield item
+            next_url = page.get("@odata.nextLink")
+
+    def _with_listing_params(self, url: str, select: Sequence[str] = ()) -> str:
+        """
+        Adds the configured $top and $select query parameters to a listing URL.
+
+        Args:
+            url (str): Listing URL.
+            select (Sequence[str]): Properties the listing needs on top of the
+                configured ones.
+
+        Returns:
+            str: Listing URL with query parameters.
+        """
+        params = [f"$top={self.list_page_size}"]
+        if self.list_select:
+            fields = self.list_select.split(",")
+            fields.extend(field for field in select if field not in fields)
+            params.append(f"$select={','.join(fields)}")
+        return f"{url}?{'&'.join(params)}"
@@ -0,0 +1,164 @@
+import math
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from config.logger_config import LoggerConfig
+
+
+class BaseOutputSink(ABC):
+    """
+    Abstract base class for the destinations the consolidated rows are written to.
+
+    Rows are streamed to a temporary file next to the output, which only replaces
+    the output once the sink is closed, so a failed run never leaves a truncated
+    output behind.
+
+    Attributes:
+        header (List[str]): Column names, including the origin column.
+        tmp_path (str): Path of the temporary file being written.
+        row_count (int): Number of data rows written.
+        logger (Logger): Logger instance.
+    """
+
+    def __init__(
+        self, output_filename: str, header: List[str], logger: LoggerConfig
+    ) -> None:
+        """
+        Initializes the sink and reserves its temporary file.
+
+        Args:
+            output_filename (str): Name of the output file.
+            header (List[str]): Column names, including the origin column.
+            logger (LoggerConfig): Logger configuration.
+        """
+        self.header: List[str] = header
+        self.row_count: int = 0
+        self.logger = logger.get_logger(__name__)
+        directory = os.path.dirname(os.path.abspath(output_filename))
+        os.makedirs(directory, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(
+            dir=directory,
+            prefix=f".{os.path.basename(output_filename)}.",
+            suffix=".tmp",
+        )
+        os.close(fd)
+
+    def fit_row(self, row: Sequence[Any]) -> Tuple[Any, ...]:
+        """
+        Fits a row to the header width, keeping the origin in the last column and
+        replacing NaN with None.
+
+        Args:
+            row (Sequence[Any]): Data values followed by the origin.
+
+        Returns:
+            Tuple[Any, ...]: The row with exactly one value per header column.
+        """
+        width = len(self.header) - 1
+        values = list(row[:-1][:width])
+        values.extend([None] * (width - len(values)))
+        values.append(row[-1])
+        return tuple(
+            None if isinstance(value, float) and math.isnan(value) else value
+            for value in values
+        )
+
+    @abstractmethod
+    def write_row(self, row: Sequence[Any]) -> None:
+        """
+        Abstract method to write a data row.
+
+        Args:
+            row (Sequence[Any]): Data values followed by the origin.
+        """
+        pass
+
+    def write_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        """
+        Writes several data rows.
+
+        Args:
+            rows (Iterable[Sequence[Any]]): Rows of data values followed by the origin.
+        """
+        for row in rows:
+            self.write_row(row)
+
+    def write_batch(self, batch: pd.DataFrame) -> None:
+        """
+        Writes a batch of data rows, with missing values such as NaN or pd.NA
+        written as None.
+
+        Args:
+            batch (pd.DataFrame): Rows with one column per header column.
+        """
+        batch = batch.astype(object).where(batch.notna(), None)
+        self.write_rows(batch.itertuples(index=False, name=None))
+
+    def mark(self) -> Optional[Any]:
+        """
+        Returns the current write position, so the rows written after it can be
+        rolled back.
+
+        Returns:
+            Optional[Any]: The position, or None if the sink cannot roll back rows
+                once written.
+        """
+        return None
+
+    def rollback(self, mark: Any) -> None:
+        """
+        Removes the rows written since a position returned by mark.
+
+        Args:
+            mark (Any): The position to roll back to.
+
+        Raises:
+            NotImplementedError: If the sink cannot roll back rows once written.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot roll back rows")
+
+    @abstractmethod
+    def _finalize(self) -> None:
+        """
+        Abstract method to flush and close the temporary file.
+        """
+        pass
+
+    @abstractmethod
+    def read_rows(self, filename: str) -> Iterator[Tuple[Any, ...]]:
+        """
+        Abstract method to read the data rows of an output previously written by
+        this kind of sink.
+
+        Args:
+            filename (str): The previous output file.
+
+        Yields:
+            tuple: Data values followed by the origin.
+        """
+        pass
+
+    def close(self, filename: str) -> None:
+        """
+        Finalizes the temporary file and moves it to the output filename.
+
+        Args:
+            filename (str): Name of the output file.
+        """
+        self._finalize()
+        os.replace(self.tmp_path, filename)
+
+    def abort(self) -> None:
+        """
+        Discards the temporary file without touching the output.
+        """
+        try:
+            self._finalize()
+        except Exception:
+            pass
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
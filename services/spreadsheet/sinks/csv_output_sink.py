@@ -0,0 +1,108 @@
+import csv
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+
+import pandas as pd
+
+from config.logger_config import LoggerConfig
+from services.spreadsheet.sinks.base_output_sink import BaseOutputSink
+
+
+class CsvOutputSink(BaseOutputSink):
+    """
+    Output sink streaming rows to a CSV file.
+
+    Attributes:
+        file (TextIO): The open temporary file.
+        writer (csv.writer): CSV writer over the temporary file.
+    """
+
+    def __init__(
+        self, output_filename: str, header: List[str], logger: LoggerConfig
+    ) -> None:
+        """
+        Initializes the CsvOutputSink and writes the header row.
+
+        Args:
+            output_filename (str): Name of the output file.
+            header (List[str]): Column names, including the origin column.
+            logger (LoggerConfig): Logger configuration.
+        """
+        super().__init__(output_filename, header, logger)
+        self.file = open(self.tmp_path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(header)
+
+    def write_row(self, row: Sequence[Any]) -> None:
+        """
+        Writes a data row.
+
+        Args:
+            row (Sequence[Any]): Data values followed by the origin.
+        """
+        self.writer.writerow(self.fit_row(row))
+        self.row_count += 1
+
+    def write_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        """
+        Writes several data rows in one call.
+
+        Args:
+            rows (Iterable[Sequence[Any]]): Rows of data values followed by the origin.
+        """
+        fitted = [self.fit_row(row) for row in rows]
+        self.writer.writerows(fitted)
+        self.row_count += len(fitted)
+
+    def write_batch(self, batch: pd.DataFrame) -> None:
+        """
+        Writes a batch of data rows with the vectorized pandas CSV writer.
+
+        Args:
+            batch (pd.DataFrame): Rows with one column per header column.
+        """
+        batch.to_csv(self.file, header=False, index=False)
+        self.row_count += len(batch)
+
+    def mark(self) -> Tuple[int, int]:
+        """
+        Returns the current write position.
+
+        Returns:
+            Tuple[int, int]: The number of rows written and the file offset.
+        """
+        self.file.flush()
+        return self.row_count, self.file.tell()
+
+    def rollback(self, mark: Tuple[int, int]) -> None:
+        """
+        Truncates the file back to a position returned by mark.
+
+        Args:
+            mark (Tuple[int, int]): The position to roll back to.
+        """
+        self.row_count, offset = mark
+        self.file.seek(offset)
+        self.file.truncate()
+
+    def _finalize(self) -> None:
+        """
+        Closes the temporary file.
+        """
+        if not self.file.closed:
+            self.file.close()
+
+    def read_rows(self, filename: str) -> Iterator[Tuple[Any, ...]]:
+        """
+        Reads the data rows of a previously written CSV file.
+
+        Args:
+            filename (str): The previous output file.
+
+        Yields:
+            tuple: Data values followed by the origin, empty values as None.
+        """
+        with open(filename, "r", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                yield tuple(value if value != "" else None for value in row)
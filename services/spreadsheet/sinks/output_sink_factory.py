@@ -0,0 +1,85 @@
+import os
+from typing import Dict, List
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.spreadsheet.sinks.base_output_sink import BaseOutputSink
+from services.spreadsheet.sinks.csv_output_sink import CsvOutputSink
+from services.spreadsheet.sinks.parquet_output_sink import ParquetOutputSink
+from services.spreadsheet.sinks.sqlite_output_sink import SqliteOutputSink
+from services.spreadsheet.sinks.xlsx_output_sink import XlsxOutputSink
+
+
+class OutputSinkFactory:
+    """
+    Factory class that creates the output sink matching the configured format.
+
+    Attributes:
+        FORMATS_BY_EXTENSION (Dict[str, str]): Output format implied by each file
+            extension.
+    """
+
+    FORMATS_BY_EXTENSION: Dict[str, str] = {
+        ".xlsx": "xlsx",
+        ".csv": "csv",
+        ".parquet": "parquet",
+        ".db": "sqlite",
+        ".sqlite": "sqlite",
+        ".sqlite3": "sqlite",
+    }
+
+    @classmethod
+    def get_format(cls, settings: Settings) -> str:
+        """
+        Returns the output format, either set explicitly or implied by the
+        extension of the output filename.
+
+        Args:
+            settings (Settings): Application settings.
+
+        Returns:
+            str: The output format ('xlsx', 'csv', 'parquet' or 'sqlite').
+
+        Raises:
+            ValueError: If the format is not supported.
+        """
+        output_format = settings.output_format.lower()
+        if not output_format:
+            extension = os.path.splitext(settings.output_filename)[1].lower()
+            output_format = cls.FORMATS_BY_EXTENSION.get(extension, "xlsx")
+        if output_format not in set(cls.FORMATS_BY_EXTENSION.values()):
+            raise ValueError(f"Unsupported output format: {output_format}")
+        return output_format
+
+    @classmethod
+    def create(
+        cls, settings: Settings, header: List[str], logger: LoggerConfig
+    ) -> BaseOutputSink:
+        """
+        Creates the output sink for the configured format.
+
+        Args:
+            settings (Settings): Application settings.
+            header (List[str]): Column names, including the origin column.
+            logger (LoggerConfig): Logger configuration.
+
+        Returns:
+            BaseOutputSink: The output sink.
+        """
+        output_format = cls.get_format(settings)
+        filename = settings.output_filename
+        if output_format == "csv":
+            return CsvOutputSink(filename, header, logger)
+        if output_format == "parquet":
+            return ParquetOutputSink(
+                filename, header, logger, settings.output_batch_rows
+            )
+        if output_format == "sqlite":
+            return SqliteOutputSink(
+                filename,
+                header,
+                logger,
+                settings.output_table,
+                settings.output_batch_rows,
+            )
+        return XlsxOutputSink(filename, header, logger, settings.output_streaming)
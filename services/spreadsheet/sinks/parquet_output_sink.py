@@ -0,0 +1,281 @@
+import os
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from config.logger_config import LoggerConfig
+from services.spreadsheet.sinks.base_output_sink import BaseOutputSink
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+
+class ParquetOutputSink(BaseOutputSink):
+    """
+    Output sink writing a Parquet file one row group at a time.
+
+    The schema is inferred from the first row group. Integers are stored as doubles,
+    the same way Excel stores numbers, so files mixing whole and fractional values
+    share one schema; columns that are empty or of mixed types are stored as text.
+    A column receiving values that do not fit its type in a later row group is
+    widened to text, rewriting the row groups already written.
+
+    Attributes:
+        row_group_size (int): Number of rows buffered per row group.
+        buffer (List[Tuple[Any, ...]]): Rows waiting to be written.
+        schema (Optional[pa.Schema]): Schema of the file, set by the first row group
+            and widened when later values do not fit it.
+        writer (Optional[pq.ParquetWriter]): Writer over the temporary file.
+    """
+
+    def __init__(
+        self,
+        output_filename: str,
+        header: List[str],
+        logger: LoggerConfig,
+        row_group_size: int = 50000,
+    ) -> None:
+        """
+        Initializes the ParquetOutputSink.
+
+        Args:
+            output_filename (str): Name of the output file.
+            header (List[str]): Column names, including the origin column.
+            logger (LoggerConfig): Logger configuration.
+            row_group_size (int): Number of rows buffered per row group.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        if pa is None:
+            raise ImportError("Parquet output requires the 'pyarrow' package")
+        super().__init__(output_filename, header, logger)
+        self.row_group_size: int = max(1, row_group_size)
+        self.buffer: List[Tuple[Any, ...]] = []
+        self.schema: Optional["pa.Schema"] = None
+        self.writer: Optional["pq.ParquetWriter"] = None
+
+    def write_row(self, row: Sequence[Any]) -> None:
+        """
+        Buffers a data row, writing a row group once the buffer is full.
+
+        Args:
+            row (Sequence[Any]): Data values followed by the origin.
+        """
+        self.buffer.append(self.fit_row(row))
+        self.row_count += 1
+        if len(self.buffer) >= self.row_group_size:
+            self._flush()
+
+    def write_batch(self, batch: pd.DataFrame) -> None:
+        """
+        Writes a batch of data rows as a row group, column by column.
+
+        Args:
+            batch (pd.DataFrame): Rows with one column per header column.
+        """
+        self._flush()
+        if not batch.empty:
+            self._write_columns([batch[column] for column in batch.columns])
+            self.row_count += len(batch)
+
+    def _flush(self) -> None:
+        """
+        Writes the buffered rows as a row group.
+        """
+        if not self.buffer:
+            return
+        columns = list(zip(*self.buffer))
+        self.buffer = []
+        self._write_columns(columns)
+
+    def _write_columns(self, columns: List[Sequence[Any]]) -> None:
+        """
+        Writes column values as a row group, inferring the schema on first use.
+        Columns holding values that do not fit their schema type are widened to
+        text first.
+
+        Args:
+            columns (List[Sequence[Any]]): The values of each header column.
+        """
+        if self.schema is None:
+            self.schema = pa.schema(
+                [
+                    pa.field(name, self._infer_type(values))
+                    for name, values in zip(self.header, columns)
+                ]
+            )
+            self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        arrays: List[Optional["pa.Array"]] = []
+        mismatched: List[str] = []
+        for values, field in zip(columns, self.schema):
+            try:
+                arrays.append(self._to_array(values, field.type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                arrays.append(None)
+                mismatched.append(field.name)
+        if mismatched:
+            self._widen(mismatched)
+            arrays = [
+                array if array is not None else self._to_array(values, pa.string())
+                for array, values in zip(arrays, columns)
+            ]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def _widen(self, names: List[str]) -> None:
+        """
+        Changes the type of columns to text, rewriting the row groups written so
+        far with the new schema.
+
+        Args:
+            names (List[str]): Names of the columns to widen.
+        """
+        self.logger.warning(
+            f"Storing Parquet columns {', '.join(names)} as text: they hold values "
+            "that do not fit the type inferred from the first row group"
+        )
+        self.schema = pa.schema(
+            [
+                pa.field(field.name, pa.string()) if field.name in names else field
+                for field in self.schema
+            ]
+        )
+        self._rewrite(names)
+
+    def _rewrite(self, names: List[str], row_limit: Optional[int] = None) -> None:
+        """
+        Rewrites the row groups written so far with the current schema.
+
+        Args:
+            names (List[str]): Names of the columns converted to text.
+            row_limit (Optional[int]): Number of leading rows kept, or None to keep
+                every row.
+        """
+        self.writer.close()
+        written_path = f"{self.tmp_path}.rewrite"
+        os.replace(self.tmp_path, written_path)
+        try:
+            self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+            parquet_file = pq.ParquetFile(written_path)
+            remaining = row_limit
+            for index in range(parquet_file.num_row_groups):
+                if remaining == 0:
+                    break
+                row_group = parquet_file.read_row_group(index)
+                if remaining is not None:
+                    row_group = row_group.slice(0, remaining)
+                    remaining -= row_group.num_rows
+                arrays = [
+                    (
+                        self._to_array(column.to_pylist(), field.type)
+                        if field.name in names
+                        else column
+                    )
+                    for column, field in zip(row_group.columns, self.schema)
+                ]
+                self.writer.write_table(
+                    pa.Table.from_arrays(arrays, schema=self.schema)
+                )
+        finally:
+            os.remove(written_path)
+
+    @staticmethod
+    def _infer_type(values: Sequence[Any]) -> "pa.DataType":
+        """
+        Infers the Parquet type of a column from its first row group.
+
+        Args:
+            values (Sequence[Any]): The column values.
+
+        Returns:
+            pa.DataType: The inferred type.
+        """
+        try:
+            data_type = pa.array(values, from_pandas=True).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pa.string()
+        if pa.types.is_null(data_type):
+            return pa.string()
+        if pa.types.is_integer(data_type):
+            return pa.float64()
+        return data_type
+
+    @staticmethod
+    def _to_array(values: Sequence[Any], data_type: "pa.DataType") -> "pa.Array":
+        """
+        Converts column values to an array of the schema type.
+
+        Args:
+            values (Sequence[Any]): The column values.
+            data_type (pa.DataType): The schema type.
+
+        Returns:
+            pa.Array: The converted values.
+        """
+        if pa.types.is_string(data_type):
+            values = [None if pd.isna(value) else str(value) for value in values]
+        return pa.array(values, type=data_type, from_pandas=True)
+
+    def mark(self) -> int:
+        """
+        Writes the buffered rows and returns the current write position.
+
+        Returns:
+            int: The number of rows written.
+        """
+        self._flush()
+        return self.row_count
+
+    def rollback(self, mark: int) -> None:
+        """
+        Removes the rows written since a position returned by mark, rewriting the
+        row groups that are kept. The schema is inferred again when no row is
+        kept.
+
+        Args:
+            mark (int): The position to roll back to.
+        """
+        written = self.row_count - len(self.buffer)
+        self.buffer = []
+        self.row_count = mark
+        if written <= mark:
+            return
+        if mark == 0:
+            self.writer.close()
+            self.writer = None
+            self.schema = None
+        else:
+            self._rewrite([], mark)
+
+    def _finalize(self) -> None:
+        """
+        Writes the remaining rows and closes the file.
+        """
+        self._flush()
+        if self.writer is None:
+            self.schema = pa.schema(
+                [pa.field(name, pa.string()) for name in self.header]
+            )
+            self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        self.writer.close()
+
+    def read_rows(self, filename: str) -> Iterator[Tuple[Any, ...]]:
+        """
+        Reads the data rows of a previously written Parquet file.
+
+        Args:
+            filename (str): The previous output file.
+
+        Yields:
+            tuple: Data values followed by the origin.
+        """
+        if pq is None:
+            raise ImportError("Parquet output requires the 'pyarrow' package")
+        parquet_file = pq.ParquetFile(filename)
+        for batch in parquet_file.iter_batches():
+            columns = [column.to_pylist() for column in batch.columns]
+            yield from zip(*columns)
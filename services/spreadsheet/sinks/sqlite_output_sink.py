@@ -0,0 +1,222 @@
+import sqlite3
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.logger_config import LoggerConfig
+from services.spreadsheet.sinks.base_output_sink import BaseOutputSink
+
+
+class SqliteOutputSink(BaseOutputSink):
+    """
+    Output sink writing the rows to a table of a SQLite database, inserting them
+    in bulk with one transaction per batch.
+
+    Attributes:
+        table (str): Name of the table holding the rows.
+        batch_size (int): Number of rows inserted per transaction.
+        buffer (List[Tuple[Any, ...]]): Rows waiting to be inserted.
+        connection (sqlite3.Connection): Connection to the temporary database.
+        insert_sql (str): Parameterized insert statement.
+    """
+
+    # Inferred types of batch columns whose values SQLite stores as they are.
+    NATIVE_TYPES = frozenset(
+        (
+            "empty",
+            "string",
+            "bytes",
+            "integer",
+            "floating",
+            "mixed-integer-float",
+            "boolean",
+        )
+    )
+
+    def __init__(
+        self,
+        output_filename: str,
+        header: List[str],
+        logger: LoggerConfig,
+        table: str = "consolidated",
+        batch_size: int = 50000,
+    ) -> None:
+        """
+        Initializes the SqliteOutputSink and creates the table.
+
+        Args:
+            output_filename (str): Name of the output file.
+            header (List[str]): Column names, including the origin column.
+            logger (LoggerConfig): Logger configuration.
+            table (str): Name of the table holding the rows.
+            batch_size (int): Number of rows inserted per transaction.
+        """
+        super().__init__(output_filename, header, logger)
+        self.table: str = table
+        self.batch_size: int = max(1, batch_size)
+        self.buffer: List[Tuple[Any, ...]] = []
+        self.connection = sqlite3.connect(self.tmp_path)
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        columns = ", ".join(self.quote(name) for name in header)
+        placeholders = ", ".join("?" for _ in header)
+        self.connection.execute(f"CREATE TABLE {self.quote(table)} ({columns})")
+        self.insert_sql: str = (
+            f"INSERT INTO {self.quote(table)} VALUES ({placeholders})"
+        )
+
+    @staticmethod
+    def quote(identifier: str) -> str:
+        """
+        Quotes an SQL identifier.
+
+        Args:
+            identifier (str): The identifier.
+
+        Returns:
+            str: The quoted identifier.
+        """
+        return '"' + str(identifier).replace('"', '""') + '"'
+
+    @staticmethod
+    def to_sql_value(value: Any) -> Any:
+        """
+        Converts a cell value to a type SQLite can store.
+
+        Args:
+            value (Any): The cell value.
+
+        Returns:
+            Any: The value, with dates and times as ISO 8601 text.
+        """
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def to_iso_strings(values: pd.Series) -> pd.Series:
+        """
+        Formats a column of timezone-naive datetimes as ISO 8601 text, the way
+        datetime.isoformat does.
+
+        Args:
+            values (pd.Series): The datetime column.
+
+        Returns:
+            pd.Series: The formatted values, with NaT as None.
+        """
+        array = values.to_numpy(dtype="datetime64[us]")
+        text = np.where(
+            array.astype("datetime64[s]") == array,
+            np.datetime_as_string(array, unit="s"),
+            np.datetime_as_string(array, unit="us"),
+        ).astype(object)
+        text[np.isnat(array)] = None
+        return pd.Series(text, index=values.index)
+
+    def write_row(self, row: Sequence[Any]) -> None:
+        """
+        Buffers a data row, inserting the batch once the buffer is full.
+
+        Args:
+            row (Sequence[Any]): Data values followed by the origin.
+        """
+        self.buffer.append(tuple(self.to_sql_value(v) for v in self.fit_row(row)))
+        self.row_count += 1
+        if len(self.buffer) >= self.batch_size:
+            self._flush()
+
+    def write_batch(self, batch: pd.DataFrame) -> None:
+        """
+        Inserts a batch of data rows straight from its tuples, with missing values
+        such as NaN or pd.NA inserted as NULL, in transactions of `batch_size`
+        rows. Dates and times are stored as ISO 8601 text: datetime columns are
+        formatted in one vectorized step, and only the other columns holding
+        values SQLite cannot store, such as dates mixed with text, are converted
+        value by value.
+
+        Args:
+            batch (pd.DataFrame): Rows with one column per header column.
+        """
+        self._flush()
+        formatted: Dict[int, pd.Series] = {
+            index: self.to_iso_strings(batch.iloc[:, index])
+            for index, dtype in enumerate(batch.dtypes)
+            if pd.api.types.is_datetime64_dtype(dtype)
+        }
+        batch = batch.astype(object).where(batch.notna(), None)
+        for index in range(batch.shape[1]):
+            values = batch.iloc[:, index]
+            if index in formatted:
+                batch.iloc[:, index] = formatted[index]
+            elif pd.api.types.infer_dtype(values, skipna=True) not in self.NATIVE_TYPES:
+                batch.iloc[:, index] = values.map(self.to_sql_value)
+        for start in range(0, len(batch), self.batch_size):
+            with self.connection:
+                self.connection.executemany(
+                    self.insert_sql,
+                    batch.iloc[start : start + self.batch_size].itertuples(
+                        index=False, name=None
+                    ),
+                )
+        self.row_count += len(batch)
+
+    def mark(self) -> int:
+        """
+        Inserts the buffered rows and returns the current write position.
+
+        Returns:
+            int: The number of rows written, which is also the rowid of the last
+                one.
+        """
+        self._flush()
+        return self.row_count
+
+    def rollback(self, mark: int) -> None:
+        """
+        Deletes the rows written since a position returned by mark.
+
+        Args:
+            mark (int): The position to roll back to.
+        """
+        self.buffer = []
+        with self.connection:
+            self.connection.execute(
+                f"DELETE FROM {self.quote(self.table)} WHERE rowid > ?", (mark,)
+            )
+        self.row_count = mark
+
+    def _flush(self) -> None:
+        """
+        Inserts the buffered rows in a single transaction.
+        """
+        if not self.buffer:
+            return
+        with self.connection:
+            self.connection.executemany(self.insert_sql, self.buffer)
+        self.buffer = []
+
+    def _finalize(self) -> None:
+        """
+        Inserts the remaining rows and closes the database.
+        """
+        self._flush()
+        self.connection.close()
+
+    def read_rows(self, filename: str) -> Iterator[Tuple[Any, ...]]:
+        """
+        Reads the data rows of a previously written SQLite database.
+
+        Args:
+            filename (str): The previous output file.
+
+        Yields:
+            tuple: Data values followed by the origin.
+        """
+        connection = sqlite3.connect(filename)
+        try:
+            yield from connection.execute(f"SELECT * FROM {self.quote(self.table)}")
+        finally:
+            connection.close()
@@ -0,0 +1,106 @@
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+from openpyxl.worksheet.worksheet import Worksheet
+
+from config.logger_config import LoggerConfig
+from services.spreadsheet.sinks.base_output_sink import BaseOutputSink
+
+
+class XlsxOutputSink(BaseOutputSink):
+    """
+    Output sink writing an Excel workbook.
+
+    In streaming mode the workbook is write-only: rows are flushed to a temporary
+    file as they are appended, so memory stays flat regardless of the output size.
+
+    Attributes:
+        streaming (bool): Whether the workbook is written in write-only mode.
+        wb (Workbook): The workbook instance.
+        ws (Union[Worksheet, WriteOnlyWorksheet]): The worksheet instance.
+        column_count (int): Width of the widest row written.
+    """
+
+    def __init__(
+        self,
+        output_filename: str,
+        header: List[str],
+        logger: LoggerConfig,
+        streaming: bool = True,
+    ) -> None:
+        """
+        Initializes the XlsxOutputSink and writes the header row.
+
+        Args:
+            output_filename (str): Name of the output file.
+            header (List[str]): Column names, including the origin column.
+            logger (LoggerConfig): Logger configuration.
+            streaming (bool): Whether to write the workbook in write-only mode.
+        """
+        super().__init__(output_filename, header, logger)
+        self.streaming: bool = streaming
+        self.wb: Workbook = Workbook(write_only=streaming)
+        self.ws: Union[Worksheet, WriteOnlyWorksheet] = (
+            self.wb.create_sheet() if streaming else self.wb.active
+        )
+        self.ws.append(header)
+        self.column_count: int = len(header)
+
+    def write_row(self, row: Sequence[Any]) -> None:
+        """
+        Appends a data row to the worksheet.
+
+        Args:
+            row (Sequence[Any]): Data values followed by the origin.
+        """
+        self.ws.append(row)
+        self.row_count += 1
+        if len(row) > self.column_count:
+            self.column_count = len(row)
+
+    def mark(self) -> Optional[int]:
+        """
+        Returns the current write position. A write-only worksheet cannot remove
+        rows once appended, so it has none.
+
+        Returns:
+            Optional[int]: The number of rows written, or None in streaming mode.
+        """
+        return None if self.streaming else self.row_count
+
+    def rollback(self, mark: int) -> None:
+        """
+        Deletes the rows written since a position returned by mark.
+
+        Args:
+            mark (int): The position to roll back to.
+        """
+        self.ws.delete_rows(mark + 2, self.row_count - mark)
+        self.row_count = mark
+
+    def _finalize(self) -> None:
+        """
+        Sets an auto-filter over the header and every data row and saves the workbook.
+        """
+        self.ws.auto_filter.ref = (
+            f"A1:{get_column_letter(self.column_count)}{self.row_count + 1}"
+        )
+        self.wb.save(self.tmp_path)
+
+    def read_rows(self, filename: str) -> Iterator[Tuple[Any, ...]]:
+        """
+        Reads the data rows of a previously written workbook.
+
+        Args:
+            filename (str): The previous output file.
+
+        Yields:
+            tuple: Data values followed by the origin.
+        """
+        wb = load_workbook(filename, read_only=True)
+        try:
+            yield from wb.active.iter_rows(min_row=2, values_only=True)
+        finally:
+            wb.close()
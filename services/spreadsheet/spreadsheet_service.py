@@ -1,53 +1,287 @@
-from typing import Any, List
+import asyncio
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+)
 
-from openpyxl import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
+import pandas as pd
 
 from config.logger_config import LoggerConfig
+from services.spreadsheet.sinks.base_output_sink import BaseOutputSink
+
+
+class SpreadsheetTransaction:
+    """
+    Stands in for the spreadsheet while a file streams its rows in a transaction,
+    adding them to the output as they are parsed.
+
+    Attributes:
+        spreadsheet_service (SpreadsheetService): The spreadsheet rows go to.
+        origin_column_name (str): Name of the origin column.
+    """
+
+    def __init__(self, spreadsheet_service: "SpreadsheetService") -> None:
+        """
+        Initializes the SpreadsheetTransaction.
+
+        Args:
+            spreadsheet_service (SpreadsheetService): The spreadsheet rows go to.
+        """
+        self.spreadsheet_service = spreadsheet_service
+        self.origin_column_name: str = spreadsheet_service.origin_column_name
+
+    def add_batch(self, batch: pd.DataFrame) -> None:
+        """
+        Adds a batch of the file's rows to the spreadsheet.
+
+        Args:
+            batch (pd.DataFrame): Rows with the configured columns followed by the
+                origin column.
+        """
+        self.spreadsheet_service._buffer(batch)
 
 
 class SpreadsheetService:
     """
-    Service class for manipulating spreadsheets.
+    Service class for writing the consolidated rows to the configured output sink.
+
+    It is the single consolidation stage of the pipeline: parsed batches are
+    buffered, concatenated and written to the sink in bulk.
+
+    The origin column holds the name of the file each row came from, or its path
+    relative to the SharePoint folder when it lives in a subfolder, so files of
+    the same name in different subfolders have distinct origins.
+
+    A file streaming its rows does so in a transaction: the sink position is
+    marked when it starts and the sink is truncated back to it if the file fails,
+    so no partial file is left in the output. Transactions run one at a time so a
+    file's rows stay contiguous; batches added by other files meanwhile are held
+    back until the transaction ends. Sinks that cannot truncate keep the rows of
+    the transaction buffered until it ends instead.
 
     Attributes:
-        wb (Workbook): The workbook instance.
-        ws (Worksheet): The active worksheet instance.
+        columns (List[str]): List of column names for the spreadsheet.
+        origin_column_name (str): Name of the origin column.
+        sink (BaseOutputSink): The output sink rows are written to.
+        batch_rows (int): Number of buffered rows that triggers a bulk write.
+        pending_batches (List[pd.DataFrame]): Batches waiting to be written.
+        pending_rows (int): Number of rows in the pending batches.
+        transaction_lock (asyncio.Lock): Lock running one transaction at a time.
+        transaction_open (bool): Whether a transaction is running.
+        hold_pending (bool): Whether pending batches stay buffered until the
+            running transaction ends, as its sink cannot truncate.
+        deferred_batches (List[pd.DataFrame]): Batches added by other files while
+            a transaction runs.
+        saved (bool): Whether the output has been saved.
         logger (Logger): Logger instance.
     """
 
+    ORIGIN_KEY = "origin"
+
     def __init__(
-        self, columns: List[str], origin_column_name: str, logger: LoggerConfig
+        self,
+        columns: List[str],
+        origin_column_name: str,
+        logger: LoggerConfig,
+        sink: BaseOutputSink,
+        batch_rows: int = 50000,
     ) -> None:
         """
-        Initializes the SpreadsheetService with columns, origin column name, and logger.
+        Initializes the SpreadsheetService with columns, origin column name, logger,
+        and output sink.
 
         Args:
             columns (List[str]): List of column names for the spreadsheet.
             origin_column_name (str): Name of the origin column.
             logger (LoggerConfig): Logger configuration.
+            sink (BaseOutputSink): The output sink rows are written to.
+            batch_rows (int): Number of buffered rows that triggers a bulk write.
         """
-        self.wb: Workbook = Workbook()
-        self.ws: Worksheet = self.wb.active
-        self.ws.append(columns + [origin_column_name])
-        self.ws.auto_filter.ref = self.ws.dimensions
+        self.columns: List[str] = columns
+        self.origin_column_name: str = origin_column_name
+        self.sink: BaseOutputSink = sink
+        self.batch_rows: int = max(1, batch_rows)
+        self.pending_batches: List[pd.DataFrame] = []
+        self.pending_rows: int = 0
+        self.transaction_lock = asyncio.Lock()
+        self.transaction_open: bool = False
+        self.hold_pending: bool = False
+        self.deferred_batches: List[pd.DataFrame] = []
+        self.saved: bool = False
         self.logger = logger.get_logger(__name__)
 
-    def append_row(self, row: List[Any]) -> None:
+    @classmethod
+    def get_origin(cls, file: Dict[str, Any]) -> str:
+        """
+        Returns the origin of the rows of a file: the relative path set by the
+        listing under ORIGIN_KEY for files in subfolders, else the file name.
+
+        Args:
+            file (dict): The file metadata.
+
+        Returns:
+            str: The origin.
+        """
+        return file.get(cls.ORIGIN_KEY) or file["name"]
+
+    def append_row(self, row: Sequence[Any]) -> None:
+        """
+        Appends a row to the output.
+
+        Args:
+            row (Sequence[Any]): The row data to append, ending with the origin.
+        """
+        self.sink.write_row(row)
+
+    def append_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        """
+        Appends several rows to the output in one call.
+
+        Args:
+            rows (Iterable[Sequence[Any]]): The rows to append, each ending with the
+                origin.
+        """
+        self.sink.write_rows(rows)
+
+    def add_batch(self, batch: pd.DataFrame) -> None:
+        """
+        Buffers a column-aligned batch, writing the buffered batches in bulk once
+        they reach the batch size. While a transaction runs the batch is held back
+        until it ends.
+
+        Args:
+            batch (pd.DataFrame): Rows with the configured columns followed by the
+                origin column.
+        """
+        if self.transaction_open:
+            self.deferred_batches.append(batch)
+        else:
+            self._buffer(batch)
+
+    def _buffer(self, batch: pd.DataFrame) -> None:
+        """
+        Buffers a column-aligned batch, writing the buffered batches in bulk once
+        they reach the batch size.
+
+        Args:
+            batch (pd.DataFrame): Rows with the configured columns followed by the
+                origin column.
+        """
+        self.pending_batches.append(batch)
+        self.pending_rows += len(batch)
+        if self.pending_rows >= self.batch_rows and not self.hold_pending:
+            self.flush()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[SpreadsheetTransaction]:
+        """
+        Runs a transaction for a file streaming its rows, removing the rows it
+        added if the file fails partway.
+
+        Yields:
+            SpreadsheetTransaction: What the rows of the file are added to.
         """
-        Appends a row to the active worksheet.
+        async with self.transaction_lock:
+            self.flush()
+            mark = self.sink.mark()
+            self.transaction_open = True
+            self.hold_pending = mark is None
+            try:
+                yield SpreadsheetTransaction(self)
+            except BaseException:
+                self.pending_batches = []
+                self.pending_rows = 0
+                if mark is not None:
+                    self.sink.rollback(mark)
+                raise
+            finally:
+                self.transaction_open = False
+                self.hold_pending = False
+                deferred, self.deferred_batches = self.deferred_batches, []
+                for batch in deferred:
+                    self._buffer(batch)
+
+    def flush(self) -> None:
+        """
+        Concatenates the buffered batches and writes them to the sink.
+        """
+        if not self.pending_batches:
+            return
+        batch = (
+            self.pending_batches[0]
+            if len(self.pending_batches) == 1
+            else pd.concat(self.pending_batches, ignore_index=True)
+        )
+        self.pending_batches = []
+        self.pending_rows = 0
+        self.sink.write_batch(batch)
+
+    def load_existing(self, filename: str, exclude_origins: Collection[str]) -> int:
+        """
+        Copies the data rows of a previously saved output into the new output,
+        leaving out rows that came from the excluded origin files.
+
+        Args:
+            filename (str): The previously saved output.
+            exclude_origins (Collection[str]): Origins whose rows are dropped.
+
+        Returns:
+            int: Number of rows copied.
+        """
+        excluded = set(exclude_origins)
+        copied = 0
+        for row in self.iter_saved_rows(filename):
+            if row[-1] in excluded:
+                continue
+            self.append_row(row)
+            copied += 1
+        self.logger.info(f"Merged {copied} unchanged rows from '{filename}'")
+        return copied
+
+    def iter_saved_rows(self, filename: str) -> Iterator[Tuple[Any, ...]]:
+        """
+        Reads the data rows of a previously saved output, fitted to the header.
+
+        The origin is the last value written on each row, so it is taken from the
+        last non-empty cell.
 
         Args:
-            row (List[Any]): The row data to append.
+            filename (str): The previously saved output.
+
+        Yields:
+            tuple: Data values followed by the origin.
         """
-        self.ws.append(row)
+        for row in self.sink.read_rows(filename):
+            end = len(row)
+            while end and row[end - 1] is None:
+                end -= 1
+            if end:
+                yield self.sink.fit_row(row[:end])
 
     def save(self, filename: str) -> None:
         """
-        Saves the workbook to the specified filename.
+        Finalizes the output and saves it to the specified filename.
 
         Args:
-            filename (str): The name of the file to save the workbook as.
+            filename (str): The name of the file to save the output as.
         """
-        self.wb.save(filename)
+        self.flush()
+        self.sink.close(filename)
+        self.saved = True
         self.logger.info(f"Centralized spreadsheet saved as '{filename}'")
+
+    def discard(self) -> None:
+        """
+        Discards an output that was never saved, leaving any previous output intact.
+        """
+        if not self.saved:
+            self.sink.abort()
+            self.saved = True
@@ -0,0 +1,79 @@
+import json
+import os
+from typing import Any, Dict
+
+from config.logger_config import LoggerConfig
+
+
+class StateStore:
+    """
+    Small JSON-file key-value store that persists application state across runs.
+
+    Attributes:
+        path (str): Path to the JSON state file.
+        data (Dict[str, Any]): In-memory copy of the state.
+        logger (Logger): Logger instance.
+    """
+
+    def __init__(self, path: str, logger: LoggerConfig) -> None:
+        """
+        Initializes the StateStore and loads the state file if it exists.
+
+        Args:
+            path (str): Path to the JSON state file.
+            logger (LoggerConfig): Logger configuration.
+        """
+        self.path: str = path
+        self.logger = logger.get_logger(__name__)
+        self.data: Dict[str, Any] = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        """
+        Loads the state file.
+
+        Returns:
+            dict: The stored state, or an empty dictionary if it is missing or invalid.
+        """
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable state file {self.path}: {e}")
+            return {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Returns the value stored under the key.
+
+        Args:
+            key (str): State key.
+            default (Any): Value returned when the key is missing.
+
+        Returns:
+            Any: The stored value or the default.
+        """
+        return self.data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Stores a JSON-serializable value under the key and persists the state.
+
+        Args:
+            key (str): State key.
+            value (Any): Value to store.
+        """
+        self.data[key] = value
+        self.save()
+
+    def save(self) -> None:
+        """
+        Writes the state file atomically.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Set
+
+from config.logger_config import LoggerConfig
+from config.settings import Settings
+from services.sharepoint.sharepoint_service import SharePointFolderService
+from services.spreadsheet.spreadsheet_service import SpreadsheetService
+from services.state.state_store import StateStore
+
+
+class IncrementalSyncService:
+    """
+    Keeps the consolidated spreadsheet up to date using Graph delta queries, so a
+    run only processes the files added, changed or deleted since the last run.
+
+    The delta link is only reused for the same source and output: changing the
+    columns, the origin column or the output format or file runs a full sync, as
+    the previous output was built with a different schema.
+
+    Attributes:
+        sharepoint_service (SharePointFolderService): SharePoint service instance.
+        spreadsheet_service (SpreadsheetService): Spreadsheet service instance.
+        state_store (StateStore): Store holding the delta link between runs.
+        sharepoint_path (str): Path to the SharePoint folder.
+        recursive (bool): Whether files in subfolders are included.
+        output_filename (str): Name of the consolidated output file.
+        output_fingerprint (str): Fingerprint of the output schema and file.
+        has_changes (bool): Whether the last call found anything to update.
+        stale_origins (Optional[Set[str]]): Origins whose rows the last call left
+            out of the previous output, or None after a full sync.
+        pending_state (Optional[Dict[str, Any]]): State to persist once the run
+            has been saved.
+        logger (Logger): Logger instance.
+    """
+
+    STATE_KEY = "delta_sync"
+
+    def __init__(
+        self,
+        sharepoint_service: SharePointFolderService,
+        spreadsheet_service: SpreadsheetService,
+        state_store: StateStore,
+        output: Dict[str, Any],
+        settings: Settings,
+        logger: LoggerConfig,
+    ) -> None:
+        """
+        Initializes the IncrementalSyncService with its collaborating services.
+
+        Args:
+            sharepoint_service (SharePointFolderService): SharePoint service instance.
+            spreadsheet_service (SpreadsheetService): Spreadsheet service instance.
+            state_store (StateStore): Store holding the delta link between runs.
+            output (dict): JSON-serializable description of the output schema and
+                file.
+            settings (Settings): Application settings.
+            logger (LoggerConfig): Logger configuration.
+        """
+        self.sharepoint_service = sharepoint_service
+        self.spreadsheet_service = spreadsheet_service
+        self.state_store = state_store
+        self.sharepoint_path: str = settings.sharepoint_path
+        self.recursive: bool = settings.list_recursive
+        self.output_filename: str = settings.output_filename
+        self.output_fingerprint: str = hashlib.sha256(
+            json.dumps(output, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        self.has_changes: bool = False
+        self.stale_origins: Optional[Set[str]] = None
+        self.pending_state: Optional[Dict[str, Any]] = None
+        self.logger = logger.get_logger(__name__)
+
+    async def get_changed_files(self, drive_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches the files changed since the last committed run and merges the rows
+        of the unchanged files from the previous output into the spreadsheet.
+
+        Falls back to a full synchronization when there is no usable delta link or
+        previous output.
+
+        Args:
+            drive_id (str): Drive ID.
+
+        Returns:
+            Optional[List[dict]]: The added or changed files to process, or None if
+                the changes could not be fetched.
+        """
+        state = self.state_store.get(self.STATE_KEY) or {}
+        same_source = (
+            state.get("drive_id") == drive_id
+            and state.get("sharepoint_path") == self.sharepoint_path
+            and state.get("recursive") == self.recursive
+            and state.get("output_fingerprint") == self.output_fingerprint
+        )
+        if state and not same_source:
+            self.logger.info("Source or output changed, running a full sync")
+        delta_link: Optional[str] = None
+        if same_source and os.path.exists(self.output_filename):
+            delta_link = state.get("delta_link")
+        known: Dict[str, str] = dict(state.get("files", {})) if delta_link else {}
+        folders: Dict[str, List[str]] = state.get("folders", {}) if delta_link else {}
+
+        changes = None
+        if delta_link:
+            changes = await self.sharepoint_service.get_delta_changes(
+                drive_id,
+                self.sharepoint_path,
+                delta_link,
+                self.recursive,
+                folders,
+            )
+            if changes is None:
+                self.logger.warning("Delta link rejected, running a full sync")
+                delta_link = None
+                known = {}
+        if changes is None:
+            changes = await self.sharepoint_service.get_delta_changes(
+                drive_id, self.sharepoint_path, recursive=self.recursive
+            )
+            if changes is None:
+                return None
+
+        stale = {
+            known.pop(item_id) for item_id in changes["removed"] if item_id in known
+        }
+        for file in changes["files"]:
+            if file["id"] in known:
+                stale.add(known[file["id"]])
+            known[file["id"]] = SpreadsheetService.get_origin(file)
+
+        self.has_changes = not delta_link or bool(changes["files"] or stale)
+        self.stale_origins = stale if delta_link else None
+        if delta_link:
+            self.logger.info(
+                f"Incremental sync: {len(changes['files'])} added or changed files, "
+                f"{len(stale)} stale origins"
+            )
+            if self.has_changes:
+                self.spreadsheet_service.load_existing(self.output_filename, stale)
+        else:
+            self.logger.info(f"Full sync: {len(changes['files'])} files")
+
+        self.pending_state = {
+            "drive_id": drive_id,
+            "sharepoint_path": self.sharepoint_path,
+            "recursive": self.recursive,
+            "output_fingerprint": self.output_fingerprint,
+            "delta_link": changes["delta_link"],
+            "files": known,
+            "folders": changes["folders"],
+        }
+        return changes["files"]
+
+    def commit(self) -> None:
+        """
+        Persists the delta link and file index of the run. Call only after the
+        consolidated output has been saved.
+        """
+        if self.pending_state:
+            self.state_store.set(self.STATE_KEY, self.pending_state)
+            self.pending_state = None